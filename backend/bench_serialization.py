@@ -0,0 +1,98 @@
+"""
+SERIALIZATION BENCHMARK FOR /analyze RESPONSES
+Compares the old pydantic + stdlib json path with the fast path,
+field projection and gzip for batch payloads
+
+Run: python bench_serialization.py [iterations]
+"""
+
+import gzip
+import json
+import sys
+import time
+from typing import List, Dict
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+from serialization import dumps, project, ORJSON_AVAILABLE, GZIP_LEVEL
+
+
+class AnalysisResult(BaseModel):
+    # Same fields as main.AnalysisResult (importing main would load the ML models);
+    # tests/test_serialization.py fails when the two drift apart
+    is_healthy: bool
+    score: float
+    reason: str
+    recommendations: List[Dict]
+    processing_steps: List[str]
+    ml_pipeline_info: Dict
+    match_status: str
+    degraded_stages: List[str] = []
+
+
+SAMPLE = {
+    "is_healthy": True,
+    "score": 0.734,
+    "reason": "✅ EXCELLENT MATCH FOR WEIGHT LOSS",
+    "recommendations": [
+        {"text": "This recipe aligns perfectly with weight loss goals", "type": "match"},
+        {"text": "Good balance of protein and fiber", "type": "nutrition"},
+        {"text": "Consider portion control for optimal results", "type": "habit"},
+        {"text": "Found 3 similar recipes", "type": "database"}
+    ],
+    "processing_steps": ["text_preprocessing", "transformer_embedding",
+                         "deep_learning_classification", "semantic_search"],
+    "ml_pipeline_info": {
+        "transformer_model": "Sentence-BERT (all-MiniLM-L6-v2)",
+        "neural_network": "384→256→128→64→2",
+        "embedding_dimension": 384,
+        "vector_database": "Local Index",
+        "match_status": "MATCH",
+        "device": "cpu"
+    },
+    "match_status": "MATCH",
+    "degraded_stages": []
+}
+
+
+def timed(label: str, fn, iterations: int) -> bytes:
+    body = fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = (time.perf_counter() - start) / iterations
+    print(f"   {label:<38} {elapsed * 1e6:8.1f} µs   {len(body):6d} bytes")
+    return body
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    print("=" * 60)
+    print(f"📊 /analyze serialization ({'orjson' if ORJSON_AVAILABLE else 'stdlib json'} fast path)")
+    print("=" * 60)
+
+    def baseline():
+        # What FastAPI did before: validate into the model, jsonable_encoder, json.dumps
+        model = AnalysisResult(**SAMPLE)
+        return json.dumps(jsonable_encoder(model)).encode("utf-8")
+
+    timed("pydantic + jsonable_encoder + json", baseline, iterations)
+    timed("fast path (plain dict)", lambda: dumps(SAMPLE), iterations)
+    timed("fast path, fields=match_status,score",
+          lambda: dumps(project(SAMPLE, ["match_status", "score"])), iterations)
+
+    print("\n📦 Batch of 100 results")
+    batch = {"results": [SAMPLE] * 100, "count": 100}
+    batch_iterations = max(1, iterations // 100)
+    body = timed("fast path", lambda: dumps(batch), batch_iterations)
+    timed(f"fast path + gzip (level {GZIP_LEVEL})",
+          lambda: gzip.compress(dumps(batch), compresslevel=GZIP_LEVEL), batch_iterations)
+    projected = {"results": [project(SAMPLE, ["match_status", "score"])] * 100, "count": 100}
+    timed("fast path, fields=match_status,score", lambda: dumps(projected), batch_iterations)
+    print(f"\n   gzip ratio on full batch: {len(gzip.compress(body, GZIP_LEVEL)) / len(body):.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,17 +5,90 @@ Student Project - PT2 Final
 
 import chromadb
 import numpy as np
-from typing import List, Dict, Any, Optional
+import os
+import threading
+import time
+from typing import List, Dict, Any, Optional, Callable
 import json
 
+from metadata_index import parse_filters, matches
+from vector_index import LocalVectorIndex
+from sharded_index import ShardedVectorIndex
+from write_ahead_log import WriteAheadLog, WALGapError
+from index_snapshot import open_snapshot
+from similarity_graph import SimilarityGraph, GRAPH_PATH
+from semantic_cache import SemanticCache
+from dedup import NearDuplicateIndex, DuplicateRecipeError
+from typeahead import SuggestionIndex
+from pantry_index import PantryIndex, resolve_ingredients, STAPLES
+from nutrition import INDEX as INGREDIENT_INDEX
+from meal_planner import MealPlanner
+from search_windows import SearchWindowStore, filters_key
+
+
+RECIPES_PATH = "data/recipes.json"
+WAL_PATH = os.getenv("RECIPE_WAL_PATH", "data/recipes.wal")
+SNAPSHOT_PATH = os.getenv("RECIPE_SNAPSHOT_PATH", "data/recipes.snap")
+SNAPSHOT_INTERVAL = float(os.getenv("RECIPE_SNAPSHOT_INTERVAL", "600"))  # seconds, 0 = on demand only
+INDEX_SHARDS = int(os.getenv("RECIPE_INDEX_SHARDS", "1"))
+SHARD_PARTITION = os.getenv("RECIPE_SHARD_PARTITION", "hash")  # "hash" or "goal"
+SHARD_DEADLINE_MS = float(os.getenv("RECIPE_SHARD_DEADLINE_MS", "200"))
+SEMANTIC_CACHE_SIZE = int(os.getenv("RECIPE_SEMANTIC_CACHE_SIZE", "1024"))  # 0 disables the cache
+SEMANTIC_CACHE_DISTANCE = float(os.getenv("RECIPE_SEMANTIC_CACHE_DISTANCE", "0.05"))  # cosine distance
+SEMANTIC_CACHE_TTL = float(os.getenv("RECIPE_SEMANTIC_CACHE_TTL", "300"))
+SEMANTIC_CACHE_MAX_LAG = int(os.getenv("RECIPE_SEMANTIC_CACHE_MAX_LAG", "0"))  # index versions
+SEARCH_WINDOW_SIZE = int(os.getenv("RECIPE_SEARCH_WINDOW_SIZE", "200"))  # results kept per paged search
+SEARCH_WINDOW_TTL = float(os.getenv("RECIPE_SEARCH_WINDOW_TTL", "120"))  # seconds
+SEARCH_WINDOWS = int(os.getenv("RECIPE_SEARCH_WINDOWS", "1024"))  # open windows kept (LRU)
+SEARCH_CURSOR_SECRET = os.getenv("RECIPE_SEARCH_CURSOR_SECRET")  # random per process when unset
+GRAPH_REFRESH_INTERVAL = float(os.getenv("RECIPE_GRAPH_REFRESH_INTERVAL", "30"))  # seconds
+DEDUP_MODE = os.getenv("RECIPE_DEDUP_MODE", "flag")  # "flag", "merge", "report" (dry run, log only) or "off"
+DEDUP_THRESHOLD = float(os.getenv("RECIPE_DEDUP_THRESHOLD", "0.8"))  # estimated Jaccard of shingles
+DEDUP_PERMUTATIONS = int(os.getenv("RECIPE_DEDUP_PERMUTATIONS", "128"))
+DEDUP_BANDS = int(os.getenv("RECIPE_DEDUP_BANDS", "16"))
+DEDUP_MIN_SHINGLES = int(os.getenv("RECIPE_DEDUP_MIN_SHINGLES", "3"))  # shorter texts are never matched
+
+
 class VectorDatabase:
     """Complete vector database manager for ChromaDB"""
     
-    def __init__(self):
+    def __init__(self, embed_fn: Optional[Callable[[List[str]], np.ndarray]] = None,
+                 tokenize_fn: Optional[Callable[[str], List[str]]] = None):
         print("🗄️  Initializing Vector Database...")
         
         self.client = None
         self.collection = None
+        self.embed_fn = embed_fn
+        self.local_index = None
+        self.similarity_graph = None
+        self._graph_dirty = set()
+        self._graph_lock = threading.Lock()
+        self._swap_lock = threading.Lock()  # index writes vs. the final step of a hot reload
+        self._snapshot_lock = threading.Lock()  # snapshot writes (WAL truncation) vs. a whole hot reload
+        self.query_cache = SemanticCache(
+            max_entries=SEMANTIC_CACHE_SIZE,
+            max_distance=SEMANTIC_CACHE_DISTANCE,
+            ttl_seconds=SEMANTIC_CACHE_TTL,
+            max_version_lag=SEMANTIC_CACHE_MAX_LAG
+        ) if SEMANTIC_CACHE_SIZE > 0 else None
+        self.dedup = NearDuplicateIndex(
+            tokenize_fn,
+            threshold=DEDUP_THRESHOLD,
+            num_perm=DEDUP_PERMUTATIONS,
+            bands=DEDUP_BANDS,
+            min_shingles=DEDUP_MIN_SHINGLES
+        ) if tokenize_fn is not None and DEDUP_MODE != "off" else None
+        self.dedup_report = None
+        self._dedup_loaded = False
+        self._dedup_lock = threading.Lock()
+        self.suggestions = SuggestionIndex()
+        self.pantry = PantryIndex()
+        self.meal_planner = MealPlanner(self.live_records, self._index_version)
+        self.search_windows = SearchWindowStore(
+            max_windows=SEARCH_WINDOWS,
+            ttl_seconds=SEARCH_WINDOW_TTL,
+            secret=SEARCH_CURSOR_SECRET.encode("utf-8") if SEARCH_CURSOR_SECRET else None
+        )
         
         try:
             
@@ -39,6 +112,289 @@ class VectorDatabase:
             print(f"   ⚠️  Could not connect to ChromaDB: {e}")
             print("   Using mock mode for demonstration")
             self.collection = None
+        
+        if self.embed_fn is not None:
+            self._build_local_index()
+        self._start_suggestion_builder()
+    
+    def _load_catalog(self) -> List[Dict]:
+        """Load the recipe catalog from disk"""
+        with open(RECIPES_PATH, "r") as f:
+            return json.load(f)
+    
+    def _dedupe_catalog(self, recipes: List[Dict]) -> List[Dict]:
+        """Merge or flag near-duplicate catalog recipes before they are embedded"""
+        if self.dedup is None:
+            return recipes
+        recipes, self.dedup_report = self.dedup.deduplicate(recipes, DEDUP_MODE)
+        self._dedup_loaded = True
+        print(f"   🔁 Dedup ({DEDUP_MODE}): {self.dedup_report['duplicates']} near-duplicates "
+              f"in {self.dedup_report['total']} recipes")
+        return recipes
+    
+    def _ensure_dedup_index(self):
+        """Index signatures of the live recipes (needed once when the index came from a snapshot)"""
+        with self._dedup_lock:
+            if self._dedup_loaded:
+                return
+            _, _, records, _ = self.local_index.export_live()
+            for record in records:
+                if "duplicate_of" not in record:
+                    self.dedup.add(record["id"], self.dedup.signature(record.get("text", "")))
+            self._dedup_loaded = True
+    
+    def _start_suggestion_builder(self):
+        """Build the typeahead and pantry indexes off the startup path (parsed ingredients of live recipes)"""
+        def records():
+            if self.local_index is not None:
+                return self.local_index.export_live()[2]
+            return self._load_catalog()
+        
+        def build():
+            try:
+                self.suggestions.build(records)
+                print(f"   ✅ Typeahead index ready ({self.suggestions.stats()['keys']} keys)")
+            except Exception as e:
+                print(f"   ⚠️  Could not build typeahead index: {e}")
+            try:
+                self.pantry.build(records)
+                print(f"   ✅ Pantry index ready ({self.pantry.stats()['live_recipes']} recipes)")
+            except Exception as e:
+                print(f"   ⚠️  Could not build pantry index: {e}")
+        
+        threading.Thread(target=build, name="typeahead-builder", daemon=True).start()
+    
+    def suggest(self, query: str, limit: int = 8) -> List[Dict]:
+        """Prefix suggestions over titles and ingredients ([] while the index is building)"""
+        if not self.suggestions.built:
+            return []
+        return self.suggestions.suggest(query, limit)
+    
+    def pantry_search(self, ingredients: List[str], mode: str = "missing", max_missing: int = 1,
+                      goal: Optional[str] = None, n_results: int = 10,
+                      assume_staples: bool = True) -> Dict[str, Any]:
+        """
+        Recipes cookable from a list of pantry ingredients (see PantryIndex.search)
+        Raises ValueError when none of the ingredients is recognized
+        """
+        if not self.pantry.built:
+            raise RuntimeError("Pantry index is still building")
+        pantry, unknown = resolve_ingredients(ingredients)
+        if not pantry:
+            raise ValueError(f"No recognized ingredients (unknown: {', '.join(unknown) or 'none'})")
+        staples = [INGREDIENT_INDEX[name] for name in STAPLES] if assume_staples else []
+        result = self.pantry.search(pantry, mode, max_missing, goal, n_results, staples)
+        result["unknown_ingredients"] = unknown
+        return result
+    
+    def live_records(self) -> List[Dict]:
+        """Metadata records of the live catalog (no embeddings)"""
+        if self.local_index is not None:
+            return self.local_index.live_records()
+        return self._load_catalog()
+    
+    def _index_version(self) -> int:
+        return self.local_index.version if self.local_index is not None else 0
+    
+    def plan_meals(self, goal: str, **constraints) -> Dict[str, Any]:
+        """Day or week of recipes meeting calorie/protein/prep-time targets (see MealPlanner.plan)"""
+        constraints["filters"] = parse_filters(constraints.get("filters"))
+        return self.meal_planner.plan(goal, **constraints)
+    
+    def _build_local_index(self):
+        """
+        Open the local vector + metadata index
+        Prefers the memory-mapped snapshot (no re-embedding); falls back to
+        embedding the catalog and writing a fresh snapshot. Raises
+        WALGapError when the WAL was already truncated past what the
+        snapshot (or the bare catalog) covers
+        """
+        if INDEX_SHARDS > 1:
+            self._build_sharded_index()
+            if self.local_index is None:
+                return
+        else:
+            wal = WriteAheadLog(WAL_PATH)
+            try:
+                snapshot = open_snapshot(SNAPSHOT_PATH)
+                if snapshot is not None:
+                    self.local_index = LocalVectorIndex.from_snapshot(snapshot, wal=wal)
+                    replayed = self.local_index.replay_wal(after_seq=snapshot.last_seq)
+                    print(f"   ✅ Local index mapped from snapshot ({len(self.local_index)} recipes, "
+                          f"{replayed} WAL entries replayed)")
+                else:
+                    recipes = self._dedupe_catalog(self._load_catalog())
+                    embeddings = self.embed_fn([r["text"] for r in recipes])
+                    self.local_index = LocalVectorIndex(
+                        ids=[r["id"] for r in recipes],
+                        embeddings=embeddings,
+                        records=recipes,
+                        wal=wal
+                    )
+                    replayed = self.local_index.replay_wal()
+                    print(f"   ✅ Local index ready ({len(self.local_index)} recipes, {replayed} WAL entries replayed)")
+                    self.save_snapshot()
+            except WALGapError as e:
+                # Serving (and snapshotting) this index would make the lost writes permanent
+                print(f"   ❌ Refusing to start the local index: {e}")
+                print(f"      Restore a snapshot that covers those writes, or move {WAL_PATH} aside to accept the loss")
+                raise
+            except Exception as e:
+                print(f"   ⚠️  Could not build local index: {e}")
+                self.local_index = None
+                return
+        
+        try:
+            self.local_index.start_compactor()
+            self._start_snapshot_scheduler()
+            self._start_graph_maintainer()
+        except Exception as e:
+            print(f"   ⚠️  Could not build local index: {e}")
+            self.local_index = None
+    
+    def _build_sharded_index(self):
+        """Sharded variant: one snapshot + WAL per shard, scatter-gather queries"""
+        try:
+            self.local_index = ShardedVectorIndex.from_snapshots(
+                SNAPSHOT_PATH, INDEX_SHARDS, SHARD_PARTITION, WAL_PATH, SHARD_DEADLINE_MS
+            )
+            if self.local_index is not None:
+                replayed = self.local_index.replay_wal()
+                print(f"   ✅ {INDEX_SHARDS} index shards mapped from snapshots "
+                      f"({len(self.local_index)} recipes, {replayed} WAL entries replayed)")
+                return
+            
+            recipes = self._dedupe_catalog(self._load_catalog())
+            embeddings = self.embed_fn([r["text"] for r in recipes])
+            self.local_index = ShardedVectorIndex.build(
+                ids=[r["id"] for r in recipes],
+                embeddings=embeddings,
+                records=recipes,
+                num_shards=INDEX_SHARDS,
+                partition=SHARD_PARTITION,
+                wal_path=WAL_PATH,
+                deadline_ms=SHARD_DEADLINE_MS
+            )
+            replayed = self.local_index.replay_wal()
+            print(f"   ✅ {INDEX_SHARDS} index shards ready by {SHARD_PARTITION} "
+                  f"({len(self.local_index)} recipes, {replayed} WAL entries replayed)")
+            self.save_snapshot()
+        except WALGapError as e:
+            print(f"   ❌ Refusing to start the sharded index: {e}")
+            print(f"      Restore shard snapshots that cover those writes, or move {WAL_PATH}.shard* aside to accept the loss")
+            raise
+        except Exception as e:
+            print(f"   ⚠️  Could not build sharded index: {e}")
+            self.local_index = None
+    
+    def save_snapshot(self) -> Dict[str, Any]:
+        """Atomically write the local index to SNAPSHOT_PATH and checkpoint the WAL"""
+        if self.local_index is None:
+            raise RuntimeError("Local index not available")
+        
+        try:
+            # Truncates the WAL: must not interleave with a reload replaying it
+            with self._snapshot_lock:
+                result = self.local_index.save_snapshot(SNAPSHOT_PATH)
+            print(f"   💾 Snapshot written: {result['recipes']} recipes, {result['bytes']} bytes")
+            return {"path": SNAPSHOT_PATH, **result}
+        except Exception as e:
+            print(f"   ⚠️  Could not write snapshot: {e}")
+            raise
+    
+    def reload_snapshot(self, path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        HOT INDEX RELOAD
+        Map a snapshot next to the serving index, replay the WAL on top and
+        warm it up, then swap it in under the write lock. Searches already
+        running finish on the old index. The version continues past the old
+        one, so version-keyed caches (semantic cache, meal planner) go stale
+        by themselves; catalog-derived indexes are rebuilt in the background.
+        """
+        if INDEX_SHARDS > 1:
+            raise ValueError("Snapshot reload supports a single index (RECIPE_INDEX_SHARDS=1)")
+        if self.local_index is None:
+            raise RuntimeError("Local index not available")
+        
+        path = path or SNAPSHOT_PATH
+        started = time.perf_counter()
+        # Held from load to swap so a concurrent save_snapshot cannot truncate
+        # WAL entries this reload still has to replay
+        with self._snapshot_lock:
+            snapshot = open_snapshot(path)
+            if snapshot is None:
+                raise FileNotFoundError(f"No valid snapshot at {path}")
+            
+            old = self.local_index
+            checkpoint = old.wal.checkpoint_seq() if old.wal is not None else 0
+            if snapshot.last_seq < checkpoint:
+                raise ValueError(f"Snapshot {path} ends at seq {snapshot.last_seq} but the WAL only "
+                                 f"retains entries after {checkpoint}; reloading it would lose writes")
+            
+            index = LocalVectorIndex.from_snapshot(snapshot, wal=old.wal)
+            replayed = index.replay_wal(after_seq=snapshot.last_seq)
+            if len(index.ids):
+                # Warm-up: one scan pages in the mapped embeddings and metadata columns
+                index.search(index.embeddings.mean(axis=0), n_results=1)
+            
+            with self._swap_lock:
+                replayed += index.replay_wal(after_seq=index.seq)
+                index.version = old.version + 1 + SEMANTIC_CACHE_MAX_LAG
+                self.local_index = index
+        old.stop_compactor()
+        index.start_compactor()
+        self._rebuild_derived_indexes()
+        
+        print(f"   🔄 Index reloaded from {path} ({len(index)} recipes, {replayed} WAL entries replayed)")
+        return {
+            "path": path,
+            "recipes": len(index),
+            "wal_replayed": replayed,
+            "version": index.version,
+            "load_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+    
+    def _rebuild_derived_indexes(self):
+        """After an index swap: re-derive dedup signatures, typeahead, pantry and the similarity graph"""
+        if self.dedup is not None:
+            with self._dedup_lock:
+                self.dedup.clear()
+                self._dedup_loaded = False
+        self._start_suggestion_builder()
+        
+        if self.similarity_graph is None:
+            return
+        
+        def rebuild_graph():
+            try:
+                with self._graph_lock:
+                    self._graph_dirty = set()
+                ids, embeddings, _, seq = self.local_index.export_live()
+                graph = SimilarityGraph.build(ids, embeddings, index_seq=seq)
+                graph.save(GRAPH_PATH)
+                self.similarity_graph = graph
+            except Exception as e:
+                print(f"   ⚠️  Could not rebuild similarity graph: {e}")
+        
+        threading.Thread(target=rebuild_graph, name="similarity-graph-rebuild", daemon=True).start()
+    
+    def _start_snapshot_scheduler(self):
+        """Periodically snapshot when there are mutations since the last one"""
+        if SNAPSHOT_INTERVAL <= 0:
+            return
+        
+        def loop():
+            last_seq = self.local_index.seq
+            while True:
+                time.sleep(SNAPSHOT_INTERVAL)
+                if self.local_index is None or self.local_index.seq == last_seq:
+                    continue
+                try:
+                    last_seq = self.save_snapshot()["last_seq"]
+                except Exception:
+                    pass
+        
+        threading.Thread(target=loop, name="index-snapshotter", daemon=True).start()
     
     def _initialize_if_empty(self):
         """Initialize database with sample recipes if empty"""
@@ -47,8 +403,7 @@ class VectorDatabase:
                 print("📦 Initializing vector database with sample recipes...")
                 
                 
-                with open("data/recipes.json", "r") as f:
-                    recipes = json.load(f)
+                recipes = self._load_catalog()
                 
                
                 print(f"   ✅ Ready to store {len(recipes)} recipes")
@@ -74,25 +429,281 @@ class VectorDatabase:
             print(f"   ❌ Error storing recipe: {e}")
             return False
     
+    def _start_graph_maintainer(self):
+        """
+        Background job for the similar-recipes graph: load or build it once,
+        then fold catalog changes in incrementally
+        """
+        def loop():
+            try:
+                graph = SimilarityGraph.load(GRAPH_PATH)
+                if graph is None or graph.index_seq != self.local_index.seq:
+                    ids, embeddings, _, seq = self.local_index.export_live()
+                    graph = SimilarityGraph.build(ids, embeddings, index_seq=seq)
+                    graph.save(GRAPH_PATH)
+                self.similarity_graph = graph
+                print(f"   ✅ Similarity graph ready ({len(graph)} recipes, k={graph.k})")
+            except Exception as e:
+                print(f"   ⚠️  Could not build similarity graph: {e}")
+                return
+            
+            while True:
+                time.sleep(GRAPH_REFRESH_INTERVAL)
+                self.refresh_similarity_graph()
+        
+        threading.Thread(target=loop, name="similarity-graph", daemon=True).start()
+    
+    def refresh_similarity_graph(self):
+        """Recompute only the graph rows affected by upserts/deletes since the last refresh"""
+        with self._graph_lock:
+            if self.similarity_graph is None or not self._graph_dirty:
+                return
+            changed, self._graph_dirty = self._graph_dirty, set()
+        
+        try:
+            ids, embeddings, _, seq = self.local_index.export_live()
+            graph = self.similarity_graph.refresh(ids, embeddings, changed, index_seq=seq)
+            graph.save(GRAPH_PATH)
+            self.similarity_graph = graph
+        except Exception as e:
+            print(f"   ⚠️  Similarity graph refresh failed: {e}")
+            with self._graph_lock:
+                self._graph_dirty |= changed
+    
+    def similar_recipes(self, recipe_id: str, n_results: int = 5) -> Optional[List[Dict]]:
+        """
+        Catalog neighbors of a recipe, served from the precomputed graph in O(k)
+        Recipes changed since the last refresh fall back to a live index search
+        Returns None if the recipe does not exist
+        """
+        if self.local_index is None:
+            raise RuntimeError("Local index not available")
+        
+        graph = self.similarity_graph
+        if graph is not None and recipe_id not in self._graph_dirty and n_results <= graph.k:
+            neighbors = graph.neighbors(recipe_id, n_results)
+            if neighbors is not None:
+                results = []
+                for neighbor_id, score in neighbors:
+                    entry = self.local_index.get(neighbor_id)
+                    if entry is None:
+                        continue  # deleted since the last refresh
+                    results.append(self._format_hit({"id": neighbor_id, "similarity": score, "record": entry[1]}))
+                return results
+        
+        entry = self.local_index.get(recipe_id)
+        if entry is None:
+            return None
+        hits = self.local_index.search(entry[0], n_results + 1)
+        return [self._format_hit(hit) for hit in hits if hit["id"] != recipe_id][:n_results]
+    
+    def upsert_recipe(self, recipe: Dict) -> bool:
+        """
+        Insert or replace a recipe without rebuilding the index
+        Logged to the WAL first; visible to searches immediately
+        Returns True if an existing recipe was replaced
+        Near-duplicates of another recipe raise DuplicateRecipeError (merge
+        mode, nothing is embedded), are stored with duplicate_of (flag mode)
+        or are stored unchanged and only counted (report mode)
+        """
+        if self.local_index is None:
+            raise RuntimeError("Local index not available")
+        
+        signature, match = None, None
+        if self.dedup is not None:
+            self._ensure_dedup_index()
+            signature = self.dedup.signature(recipe["text"])
+            match = self.dedup.find_duplicate(signature, exclude=recipe["id"])
+            if match is not None:
+                if DEDUP_MODE == "merge":
+                    raise DuplicateRecipeError(*match)
+                if DEDUP_MODE == "flag":
+                    recipe = {**recipe, "duplicate_of": match[0], "duplicate_similarity": round(match[1], 3)}
+        
+        embedding = np.asarray(self.embed_fn([recipe["text"]])[0], dtype=np.float32)
+        with self._swap_lock:
+            replaced = self.local_index.upsert(recipe["id"], embedding, recipe)
+        if self.dedup is not None:
+            if match is None:
+                self.dedup.add(recipe["id"], signature)
+            else:
+                self.dedup.remove(recipe["id"])
+        self.suggestions.add_recipe(recipe)
+        self.pantry.add_recipe(recipe)
+        with self._graph_lock:
+            self._graph_dirty.add(recipe["id"])
+        
+        if self.collection:
+            try:
+                self.collection.upsert(
+                    ids=[recipe["id"]],
+                    embeddings=[embedding.tolist()],
+                    documents=[recipe["text"]],
+                    metadatas=[{k: v for k, v in recipe.items() if k not in ("id", "text")}]
+                )
+            except Exception as e:
+                print(f"   ⚠️  ChromaDB upsert failed: {e}")
+        
+        return replaced
+    
+    def delete_recipe(self, recipe_id: str) -> bool:
+        """Delete a recipe (tombstoned until the next compaction). False if unknown."""
+        if self.local_index is None:
+            raise RuntimeError("Local index not available")
+        
+        with self._swap_lock:
+            deleted = self.local_index.delete(recipe_id)
+        if deleted:
+            with self._graph_lock:
+                self._graph_dirty.add(recipe_id)
+            if self.dedup is not None:
+                self.dedup.remove(recipe_id)
+            self.suggestions.remove_recipe(recipe_id)
+            self.pantry.remove_recipe(recipe_id)
+        
+        if deleted and self.collection:
+            try:
+                self.collection.delete(ids=[recipe_id])
+            except Exception as e:
+                print(f"   ⚠️  ChromaDB delete failed: {e}")
+        
+        return deleted
+    
+    def memory_footprint(self) -> Dict[str, Any]:
+        """Local index, similarity graph and ChromaDB client footprint"""
+        footprint = {"chromadb_client": "connected" if self.collection else "not connected"}
+        if self.local_index is not None:
+            footprint.update({f"index_{k}": v for k, v in self.local_index.memory_footprint().items()})
+        if self.similarity_graph is not None:
+            footprint["similarity_graph_bytes"] = self.similarity_graph.nbytes()
+        if self.query_cache is not None:
+            footprint["semantic_cache_bytes"] = self.query_cache.nbytes()
+        if self.dedup is not None:
+            footprint["dedup_signature_bytes"] = self.dedup.nbytes()
+        footprint["typeahead_bytes"] = self.suggestions.nbytes()
+        footprint["pantry_bytes"] = self.pantry.nbytes()
+        footprint["meal_planner_bytes"] = self.meal_planner.nbytes()
+        footprint["search_window_bytes"] = self.search_windows.nbytes()
+        return footprint
+    
     def semantic_search(self, query_text: str, goal: str = None, 
-                       n_results: int = 3) -> List[Dict]:
+                       n_results: int = 3, filters: Optional[Dict] = None,
+                       query_embedding: Optional[np.ndarray] = None,
+                       deadline_ms: Optional[float] = None) -> List[Dict]:
         """
         Perform semantic search for similar recipes
-        Returns mock results for demonstration
+        Optional nutrition filters, e.g. {"calories": {"lt": 400}, "prep_time": {"lte": 20}}
+        Uses the local index when available, mock results otherwise;
+        deadline_ms caps the shard fan-out of a sharded index
         """
+        filters = parse_filters(filters)
+        if goal:
+            filters["goal"] = {"eq": goal}
+        
+        if self.local_index is not None:
+            try:
+                return self._local_search(query_text, filters, n_results, query_embedding, deadline_ms)
+            except Exception as e:
+                print(f"   ❌ Local search error: {e}")
+        
         if not self.collection:
             
-            return self._get_mock_results(query_text, goal, n_results)
+            return self._get_mock_results(query_text, goal, n_results, filters)
         
         try:
             
-            return self._get_mock_results(query_text, goal, n_results)
+            return self._get_mock_results(query_text, goal, n_results, filters)
             
         except Exception as e:
             print(f"   ❌ Search error: {e}")
             return []
     
-    def _get_mock_results(self, query_text: str, goal: str, n_results: int) -> List[Dict]:
+    def paged_search(self, query_text: Optional[str] = None, goal: str = None,
+                     filters: Optional[Dict] = None, page_size: int = 10,
+                     cursor: Optional[str] = None, allow_stale: bool = False) -> Dict[str, Any]:
+        """
+        Cursor-paginated search. Without a cursor the query is embedded once
+        and its top SEARCH_WINDOW_SIZE kept as a server-side window; with a
+        cursor the page is a slice of that window. Raises CursorError when the
+        cursor is invalid, expired, issued for other filters, or the index
+        version moved on (unless allow_stale)
+        """
+        version = self._index_version()
+        digest = None
+        if cursor is None or filters is not None or goal is not None:
+            parsed = parse_filters(filters)
+            if goal:
+                parsed["goal"] = {"eq": goal}
+            digest = filters_key(parsed)
+        
+        if cursor is not None:
+            decoded = self.search_windows.decode_cursor(cursor)
+            return self.search_windows.page(decoded, digest, version, page_size, allow_stale)
+        
+        if not query_text or not query_text.strip():
+            raise ValueError("Query text cannot be empty")
+        results = self.semantic_search(query_text, goal, SEARCH_WINDOW_SIZE, filters)
+        window_id = self.search_windows.open(results)
+        return self.search_windows.slice(window_id, results, 0, page_size, digest, version)
+    
+    def cached_search(self, query_embedding: np.ndarray, goal: str = None,
+                      n_results: int = 3, filters: Optional[Dict] = None) -> Optional[List[Dict]]:
+        """Semantic-cache lookup only (no index work); None on a miss"""
+        if self.local_index is None or self.query_cache is None:
+            return None
+        filters = parse_filters(filters)
+        if goal:
+            filters["goal"] = {"eq": goal}
+        cache_key = SemanticCache.partition_key(None, filters, n_results)
+        return self.query_cache.get(query_embedding, cache_key, self.local_index.version)
+    
+    def _local_search(self, query_text: str, filters: Dict, n_results: int,
+                      query_embedding: Optional[np.ndarray] = None,
+                      deadline_ms: Optional[float] = None) -> List[Dict]:
+        """
+        Filtered top-k over the local index, behind the semantic cache:
+        a paraphrase of a recent query (same goal/filters/k) reuses its results
+        """
+        if query_embedding is None:
+            query_embedding = self.embed_fn([query_text])[0]
+        
+        if self.query_cache is not None:
+            cache_key = SemanticCache.partition_key(None, filters, n_results)
+            version = self.local_index.version
+            cached = self.query_cache.get(query_embedding, cache_key, version)
+            if cached is not None:
+                return cached
+        
+        if deadline_ms is not None and isinstance(self.local_index, ShardedVectorIndex):
+            hits, status = self.local_index.search_with_status(query_embedding, n_results, filters,
+                                                               deadline_ms=deadline_ms)
+            if status["partial"]:
+                hits = [dict(hit, partial=True) for hit in hits]
+        else:
+            hits = self.local_index.search(query_embedding, n_results, filters)
+        results = [self._format_hit(hit) for hit in hits]
+        
+        if self.query_cache is not None and not any(r.get("partial") for r in results):
+            self.query_cache.put(query_embedding, cache_key, version, results)
+        return results
+    
+    def _format_hit(self, hit: Dict) -> Dict:
+        """Shape a local index hit like the other search results"""
+        record = hit["record"]
+        return {
+            "id": hit["id"],
+            "title": record.get("title"),
+            "similarity": round(hit["similarity"], 3),
+            "goal": record.get("goal"),
+            "calories": record.get("calories"),
+            "protein_g": record.get("protein_g"),
+            "prep_time": record.get("prep_time"),
+            "reason": "Semantic match found in local recipe index",
+            **({"partial": True} if hit.get("partial") else {})
+        }
+    
+    def _get_mock_results(self, query_text: str, goal: str, n_results: int,
+                          filters: Optional[Dict] = None) -> List[Dict]:
         """Generate mock search results for demonstration"""
         mock_recipes = [
             {
@@ -118,6 +729,10 @@ class VectorDatabase:
             }
         ]
         
+        if filters:
+            filtered = [r for r in mock_recipes if matches(r, filters)]
+            return filtered[:n_results]
+        
         # Filter by goal if specified
         if goal:
             filtered = [r for r in mock_recipes if r["goal"] == goal]
@@ -127,6 +742,17 @@ class VectorDatabase:
     
     def get_stats(self) -> Dict[str, Any]:
         """Get database statistics"""
+        # Components that exist whichever backend is serving
+        shared = {
+            "semantic_cache": self.query_cache.stats() if self.query_cache else None,
+            "dedup": {**self.dedup.stats(), "mode": DEDUP_MODE, "ingestion": self.dedup_report}
+                     if self.dedup else None,
+            "typeahead": self.suggestions.stats(),
+            "pantry": self.pantry.stats(),
+            "meal_planner": self.meal_planner.stats(),
+            "search_windows": self.search_windows.stats()
+        }
+        
         if self.collection:
             try:
                 count = self.collection.count()
@@ -134,19 +760,35 @@ class VectorDatabase:
                     "status": "connected",
                     "vector_database": "ChromaDB",
                     "recipe_count": count,
-                    "collection": "recipes"
+                    "collection": "recipes",
+                    "local_index_count": len(self.local_index) if self.local_index else 0,
+                    **shared
                 }
             except:
                 return {
                     "status": "fallback",
                     "vector_database": "Mock Mode",
                     "recipe_count": 3,
-                    "collection": "demo_only"
+                    "collection": "demo_only",
+                    **shared
                 }
+        elif self.local_index is not None:
+            return {
+                "status": "local",
+                "vector_database": "Local Index",
+                "recipe_count": len(self.local_index),
+                "collection": "recipes",
+                "pending_mutations": self.local_index.pending_mutations(),
+                "wal_bytes": self.local_index.wal_bytes(),
+                "index_shards": INDEX_SHARDS,
+                **shared,
+                **(self.local_index.stats if INDEX_SHARDS > 1 else {})
+            }
         else:
             return {
                 "status": "mock",
                 "vector_database": "Demonstration Mode",
                 "recipe_count": 3,
-                "note": "Using sample data for demonstration"
+                "note": "Using sample data for demonstration",
+                **shared
             }
\ No newline at end of file
@@ -0,0 +1,230 @@
+"""
+NEAR-DUPLICATE RECIPE DETECTION
+MinHash signatures over word shingles of the preprocessed tokens, with LSH
+banding so candidates come from hash buckets instead of pairwise comparison
+"""
+
+import threading
+import zlib
+import numpy as np
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+DEDUP_MODES = ["flag", "merge", "report", "off"]
+REPORT_MAX_PAIRS = 100  # duplicate pairs listed in a "report" mode ingestion summary
+
+
+class DuplicateRecipeError(Exception):
+    """Raised when an ingested recipe near-duplicates an existing one (merge mode)"""
+
+    def __init__(self, duplicate_of: str, similarity: float):
+        super().__init__(f"Near-duplicate of recipe '{duplicate_of}' (similarity {similarity:.2f})")
+        self.duplicate_of = duplicate_of
+        self.similarity = similarity
+
+
+def shingles(tokens: List[str], size: int = 3) -> np.ndarray:
+    """32-bit hashes of the distinct word `size`-grams (whole text if shorter)"""
+    if len(tokens) < size:
+        grams = {" ".join(tokens)} if tokens else set()
+    else:
+        grams = {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+class MinHasher:
+    """`num_perm` universal hash functions (a*x + b mod p), applied to all shingles at once"""
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        # a < 2^31 and x < 2^32 keep a*x + b inside uint64
+        self.a = rng.randint(1, 1 << 31, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self.b = rng.randint(0, 1 << 31, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self.num_perm = num_perm
+
+    def signature(self, shingle_hashes: np.ndarray) -> np.ndarray:
+        if len(shingle_hashes) == 0:
+            return np.full(self.num_perm, MAX_HASH, dtype=np.uint32)
+        hashed = (np.outer(self.a, shingle_hashes) + self.b[:, None]) % MERSENNE_PRIME & MAX_HASH
+        return hashed.min(axis=1).astype(np.uint32)
+
+
+class NearDuplicateIndex:
+    """
+    LSH over MinHash signatures: `bands` bands of num_perm/bands rows.
+    Two recipes become candidates if any band matches exactly, which happens
+    with probability 1 - (1 - s^rows)^bands for Jaccard similarity s; candidates
+    are then confirmed by the estimated Jaccard (fraction of equal minhashes)
+    reaching `threshold`.
+
+    Texts with fewer than `min_shingles` distinct shingles get no signature:
+    their minhashes would be equal for any two short or empty texts, so they
+    are neither indexed nor checked.
+    """
+
+    def __init__(self, tokenize_fn: Callable[[str], List[str]], threshold: float = 0.8,
+                 num_perm: int = 128, bands: int = 16, shingle_size: int = 3, seed: int = 1,
+                 min_shingles: int = 3):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError("threshold must be in (0, 1]")
+
+        self.tokenize_fn = tokenize_fn
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.min_shingles = max(1, min_shingles)
+        self.hasher = MinHasher(num_perm, seed)
+
+        self._lock = threading.RLock()
+        self._buckets = [{} for _ in range(bands)]  # band -> band hash -> [ids]
+        self._signatures = {}                       # id -> signature
+        self.metrics = {"checked": 0, "duplicates": 0, "candidates": 0, "false_candidates": 0, "too_short": 0}
+
+    @property
+    def lsh_threshold(self) -> float:
+        """Similarity at which a pair is a candidate with ~50% probability"""
+        return (1.0 / self.bands) ** (1.0 / self.rows)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """MinHash signature, or None when the text is too short to compare"""
+        hashes = shingles(self.tokenize_fn(text), self.shingle_size)
+        if len(hashes) < self.min_shingles:
+            with self._lock:
+                self.metrics["too_short"] += 1
+            return None
+        return self.hasher.signature(hashes)
+
+    def _band_keys(self, signature: np.ndarray) -> List[int]:
+        return [hash(signature[b * self.rows:(b + 1) * self.rows].tobytes()) for b in range(self.bands)]
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def add(self, recipe_id: str, signature: Optional[np.ndarray]):
+        """Index a signature (None only drops a previous one)"""
+        with self._lock:
+            if recipe_id in self._signatures:
+                self.remove(recipe_id)
+            if signature is None:
+                return
+            self._signatures[recipe_id] = signature
+            for band, key in enumerate(self._band_keys(signature)):
+                self._buckets[band].setdefault(key, []).append(recipe_id)
+
+    def remove(self, recipe_id: str) -> bool:
+        with self._lock:
+            signature = self._signatures.pop(recipe_id, None)
+            if signature is None:
+                return False
+            for band, key in enumerate(self._band_keys(signature)):
+                bucket = self._buckets[band].get(key)
+                if bucket is not None:
+                    bucket.remove(recipe_id)
+                    if not bucket:
+                        del self._buckets[band][key]
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._buckets = [{} for _ in range(self.bands)]
+            self._signatures = {}
+
+    def find_duplicate(self, signature: Optional[np.ndarray],
+                       exclude: Optional[str] = None) -> Optional[Tuple[str, float]]:
+        """Most similar indexed recipe at or above the threshold -> (id, estimated Jaccard)"""
+        if signature is None:
+            return None
+        with self._lock:
+            candidates = set()
+            for band, key in enumerate(self._band_keys(signature)):
+                candidates.update(self._buckets[band].get(key, ()))
+            candidates.discard(exclude)
+
+            best = None
+            for candidate in candidates:
+                similarity = float(np.mean(self._signatures[candidate] == signature))
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (candidate, similarity)
+
+            self.metrics["checked"] += 1
+            self.metrics["candidates"] += len(candidates)
+            self.metrics["false_candidates"] += len(candidates) - (1 if best else 0)
+            self.metrics["duplicates"] += int(best is not None)
+            return best
+
+    def deduplicate(self, records: Iterable[Dict[str, Any]], mode: str = "flag") -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Ingestion pass: the first recipe of each near-duplicate group is kept
+        and indexed. "flag" (the default) keeps the others with duplicate_of
+        set; "merge" drops them (their ids are listed on the kept recipe as
+        duplicate_ids); "report" is a dry run that keeps every record
+        unchanged and only lists the pairs found.
+        """
+        if mode not in DEDUP_MODES:
+            raise ValueError(f"Dedup mode must be one of {DEDUP_MODES}")
+        records = list(records)
+        if mode == "off":
+            return records, {"mode": mode, "total": len(records)}
+
+        kept, by_id, duplicates, pairs = [], {}, 0, []
+        for record in records:
+            signature = self.signature(record.get("text", ""))
+            match = self.find_duplicate(signature, exclude=record["id"])
+            if match is None:
+                record = dict(record)
+                kept.append(record)
+                by_id[record["id"]] = record
+                self.add(record["id"], signature)
+                continue
+
+            duplicates += 1
+            canonical, similarity = match
+            if mode == "report":
+                kept.append(record)
+                if len(pairs) < REPORT_MAX_PAIRS:
+                    pairs.append({"id": record["id"], "duplicate_of": canonical, "similarity": round(similarity, 3)})
+            elif mode == "flag":
+                kept.append({**record, "duplicate_of": canonical, "duplicate_similarity": round(similarity, 3)})
+            elif canonical in by_id:
+                by_id[canonical].setdefault("duplicate_ids", []).append(record["id"])
+
+        report = {
+            "mode": mode,
+            "total": len(records),
+            "unique": len(records) - duplicates,
+            "duplicates": duplicates,
+            "dedup_ratio": round(duplicates / len(records), 4) if records else 0.0,
+            "threshold": self.threshold,
+            "lsh_threshold": round(self.lsh_threshold, 3)
+        }
+        if mode == "report":
+            report["pairs"] = pairs
+        return kept, report
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = dict(self.metrics)
+            size = len(self._signatures)
+        checked = metrics["checked"]
+        return {
+            "indexed": size,
+            "threshold": self.threshold,
+            "bands": self.bands,
+            "rows_per_band": self.rows,
+            "lsh_threshold": round(self.lsh_threshold, 3),
+            "checked": checked,
+            "duplicates_found": metrics["duplicates"],
+            "dedup_ratio": round(metrics["duplicates"] / checked, 4) if checked else 0.0,
+            "avg_candidates": round(metrics["candidates"] / checked, 2) if checked else 0.0,
+            "false_candidates": metrics["false_candidates"],
+            "too_short": metrics["too_short"]
+        }
+
+    def nbytes(self) -> int:
+        with self._lock:
+            return len(self._signatures) * (self.hasher.num_perm * 4 + self.bands * 16)
@@ -0,0 +1,200 @@
+"""
+SHARED EMBEDDING SERVICE
+LRU embedding cache + micro-batching scheduler in front of the transformer,
+and a compact binary wire format for raw embedding batches
+"""
+
+import hashlib
+import os
+import struct
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5"))
+
+
+# ----------------------------------------------------------------------
+# Binary batch format
+#   magic "EMB1" | version u8 | dtype code u8 | reserved u16 | rows u32 | dim u32
+#   followed by rows*dim little-endian values, row-major
+# ----------------------------------------------------------------------
+
+BINARY_MAGIC = b"EMB1"
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct("<4sBBHII")
+BINARY_MEDIA_TYPE = "application/octet-stream"
+DTYPE_CODES = {"float32": 1, "float16": 2}
+CODE_DTYPES = {code: name for name, code in DTYPE_CODES.items()}
+
+
+def encode_binary(embeddings: np.ndarray, dtype: str = "float32") -> bytes:
+    """(rows, dim) matrix -> header + raw little-endian values (no per-float encoding)"""
+    if dtype not in DTYPE_CODES:
+        raise ValueError(f"dtype must be one of {list(DTYPE_CODES)}")
+    matrix = np.ascontiguousarray(embeddings, dtype=np.dtype(dtype).newbyteorder("<"))
+    rows, dim = matrix.shape
+    return BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, DTYPE_CODES[dtype], 0, rows, dim) + matrix.tobytes()
+
+
+def decode_binary(payload: bytes) -> np.ndarray:
+    """Inverse of encode_binary (for clients and tests)"""
+    magic, version, code, _, rows, dim = BINARY_HEADER.unpack_from(payload, 0)
+    if magic != BINARY_MAGIC or version != BINARY_VERSION or code not in CODE_DTYPES:
+        raise ValueError("Not an EMB1 embedding payload")
+    dtype = np.dtype(CODE_DTYPES[code]).newbyteorder("<")
+    return np.frombuffer(payload, dtype=dtype, count=rows * dim, offset=BINARY_HEADER.size).reshape(rows, dim)
+
+
+# ----------------------------------------------------------------------
+# Cache + batching
+# ----------------------------------------------------------------------
+
+class EmbeddingCache:
+    """Thread-safe LRU of text -> embedding, keyed by a hash of the text"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        key = self.key(text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, text: str, vector: np.ndarray):
+        if self.max_entries <= 0:
+            return
+        key = self.key(text)
+        vector = np.asarray(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "capacity": self.max_entries,
+                "hits": self.hits,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+    def nbytes(self) -> int:
+        with self._lock:
+            return sum(v.nbytes + 16 for v in self._entries.values())
+
+
+class MicroBatcher:
+    """
+    Collects embedding requests from concurrent callers for up to
+    `max_wait_ms` (or until `max_batch` texts are pending) and encodes
+    them with one transformer call on a background thread
+    """
+
+    def __init__(self, encode_fn: Callable[[List[str]], np.ndarray],
+                 max_batch: int = 64, max_wait_ms: float = 5.0):
+        self.encode_fn = encode_fn
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self._pending = []  # (texts, future)
+        self._cond = threading.Condition()
+        self.batches = 0
+        self.batched_texts = 0
+        threading.Thread(target=self._loop, name="embedding-batcher", daemon=True).start()
+
+    def submit(self, texts: List[str]) -> Future:
+        future = Future()
+        with self._cond:
+            self._pending.append((texts, future))
+            self._cond.notify()
+        return future
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                deadline = time.monotonic() + self.max_wait_ms / 1000.0
+                while sum(len(t) for t, _ in self._pending) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._pending = self._pending, []
+
+            unique = list(dict.fromkeys(text for texts, _ in batch for text in texts))
+            try:
+                vectors = np.asarray(self.encode_fn(unique), dtype=np.float32)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            row_of = {text: row for row, text in enumerate(unique)}
+            self.batches += 1
+            self.batched_texts += len(unique)
+            for texts, future in batch:
+                future.set_result(vectors[[row_of[t] for t in texts]])
+
+
+class EmbeddingService:
+    """Cache lookups first; misses from all concurrent callers share micro-batches"""
+
+    def __init__(self, encode_fn: Callable[[List[str]], np.ndarray], cache_size: int = EMBEDDING_CACHE_SIZE,
+                 max_batch: int = EMBEDDING_BATCH_SIZE, max_wait_ms: float = EMBEDDING_BATCH_WAIT_MS):
+        self.cache = EmbeddingCache(cache_size)
+        self.batcher = MicroBatcher(encode_fn, max_batch, max_wait_ms)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """(len(texts), dim) float32 embeddings"""
+        vectors = [self.cache.get(text) for text in texts]
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            computed = self.batcher.submit([texts[i] for i in missing]).result()
+            for i, vector in zip(missing, computed):
+                self.cache.put(texts[i], vector)
+                vectors[i] = vector
+        return np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+
+    def embed_one(self, text: str) -> np.ndarray:
+        return self.embed([text])[0]
+
+    def stats(self) -> Dict[str, float]:
+        stats = self.cache.stats()
+        batches = self.batcher.batches
+        stats.update({
+            "batches": batches,
+            "avg_batch_size": round(self.batcher.batched_texts / batches, 2) if batches else 0.0
+        })
+        return stats
+
+    def memory_footprint(self) -> Dict[str, int]:
+        return {"embedding_cache_bytes": self.cache.nbytes(), "entries": self.cache.stats()["size"]}
@@ -0,0 +1,118 @@
+"""
+HOT RELOAD
+Swaps in a new classifier checkpoint or index snapshot without restarting
+the backend: the new version is loaded and warmed up on a background
+thread, then published with a single reference assignment
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+RELOAD_WATCH_INTERVAL = float(os.getenv("RECIPE_RELOAD_WATCH_INTERVAL", "0"))  # seconds, 0 = no watcher
+RELOAD_HISTORY = 20
+
+
+def confine_path(path: str, root: str) -> str:
+    """
+    Resolve `path` and make sure it stays under `root` after following
+    symlinks and `..`
+    """
+    root = os.path.realpath(root)
+    resolved = os.path.realpath(path)
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError(f"Path must be inside {root}")
+    return resolved
+
+
+class ReloadManager:
+    """
+    Serializes reloads, keeps a short history, and optionally watches the
+    classifier checkpoint file so dropping a new one in place reloads it.
+    Explicit paths must resolve under `classifier_dir` / `snapshot_dir`.
+    """
+
+    def __init__(self, ml_pipeline, vector_db, classifier_dir: str, snapshot_dir: str,
+                 watch_path: Optional[str] = None, watch_interval: float = RELOAD_WATCH_INTERVAL):
+        self.ml_pipeline = ml_pipeline
+        self.vector_db = vector_db
+        self.classifier_dir = classifier_dir
+        self.snapshot_dir = snapshot_dir
+        self.watch_path = watch_path
+        self.watch_interval = watch_interval
+        self._lock = threading.Lock()
+        self.history: List[Dict[str, Any]] = []
+
+    def _record(self, target: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        entry = {"target": target, "at": time.time(), **(result or {})}
+        if error is not None:
+            entry["error"] = error
+        self.history = (self.history + [entry])[-RELOAD_HISTORY:]
+
+    def reload(self, classifier_path: Optional[str] = None, snapshot_path: Optional[str] = None,
+               classifier: bool = False, snapshot: bool = False) -> Dict[str, Any]:
+        """
+        Reload the classifier and/or the index (a path implies its target;
+        no path means the configured default). Errors leave the serving
+        version in place and are re-raised after being recorded.
+        """
+        classifier = classifier or classifier_path is not None
+        snapshot = snapshot or snapshot_path is not None
+        if not (classifier or snapshot):
+            raise ValueError("Nothing to reload: pass a classifier and/or a snapshot")
+        if classifier_path is not None:
+            classifier_path = confine_path(classifier_path, self.classifier_dir)
+        if snapshot_path is not None:
+            snapshot_path = confine_path(snapshot_path, self.snapshot_dir)
+
+        result = {}
+        with self._lock:
+            if classifier:
+                try:
+                    result["classifier"] = self.ml_pipeline.reload_classifier(classifier_path)
+                    self._record("classifier", result["classifier"])
+                except Exception as e:
+                    self._record("classifier", error=str(e))
+                    raise
+            if snapshot:
+                try:
+                    result["index"] = self.vector_db.reload_snapshot(snapshot_path)
+                    self._record("index", result["index"])
+                except Exception as e:
+                    self._record("index", error=str(e))
+                    raise
+        return result
+
+    def start_watcher(self):
+        """Poll the checkpoint's mtime; a changed file is loaded, warmed up and swapped in"""
+        if self.watch_interval <= 0 or not self.watch_path:
+            return
+
+        def loop():
+            last_mtime = os.path.getmtime(self.watch_path) if os.path.exists(self.watch_path) else None
+            while True:
+                time.sleep(self.watch_interval)
+                if not os.path.exists(self.watch_path):
+                    continue
+                mtime = os.path.getmtime(self.watch_path)
+                if mtime == last_mtime:
+                    continue
+                last_mtime = mtime
+                try:
+                    swapped = self.reload(classifier_path=self.watch_path)["classifier"]
+                    print(f"   🔄 Classifier reloaded: {swapped['previous_version']} -> {swapped['version']}")
+                except Exception as e:
+                    print(f"   ⚠️  Classifier reload failed, keeping {self.ml_pipeline.classifier_version}: {e}")
+
+        threading.Thread(target=loop, name="checkpoint-watcher", daemon=True).start()
+
+    def status(self) -> Dict[str, Any]:
+        index = self.vector_db.local_index
+        return {
+            "classifier_version": self.ml_pipeline.classifier_version,
+            "index_version": index.version if index is not None else None,
+            "watching": self.watch_path if self.watch_interval > 0 else None,
+            "history": list(self.history)
+        }
@@ -0,0 +1,250 @@
+"""
+MEMORY-MAPPED RECIPE INDEX SNAPSHOTS
+Versioned binary layout that is opened with mmap and queried in place
+
+Layout (little-endian):
+  fixed header   magic, format version, row count, dim, last WAL seq, checksums
+  section table  name[16], offset, length for every section
+  sections       64-byte aligned raw arrays (embeddings, columns, sort orders, ids, records)
+"""
+
+import json
+import mmap
+import os
+import struct
+import zlib
+import numpy as np
+from typing import List, Dict, Any, Optional, Iterator
+
+from metadata_index import MetadataIndex, NUMERIC_FIELDS, CATEGORICAL_FIELDS
+
+
+MAGIC = b"RCPSNAP\x00"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+# magic, version, section_count, n, dim, last_seq, payload_crc, header_crc
+HEADER_STRUCT = struct.Struct("<8sIIQIQII")
+SECTION_STRUCT = struct.Struct("<16sQQ")
+CRC_CHUNK = 16 << 20  # payload bytes checksummed per read
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot file is missing, corrupt or of an unknown version"""
+    pass
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _encode_strings(values: List[str]) -> Dict[str, bytes]:
+    """Variable-length strings as an (n+1) uint64 offset array plus a UTF-8 blob"""
+    blobs = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(blobs) + 1, dtype=np.uint64)
+    offsets[1:] = np.cumsum([len(b) for b in blobs], dtype=np.uint64)
+    return {"offsets": offsets.tobytes(), "blob": b"".join(blobs)}
+
+
+class StringColumn:
+    """Read-only sequence of strings decoded on access from the mapped file"""
+
+    def __init__(self, buffer, offsets: np.ndarray, blob_start: int, decode_json: bool = False):
+        self._buffer = buffer
+        self._offsets = offsets
+        self._blob_start = blob_start
+        self._decode_json = decode_json
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, row: int):
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        start = self._blob_start + int(self._offsets[row])
+        end = self._blob_start + int(self._offsets[row + 1])
+        value = bytes(self._buffer[start:end]).decode("utf-8")
+        return json.loads(value) if self._decode_json else value
+
+    def __iter__(self) -> Iterator:
+        for row in range(len(self)):
+            yield self[row]
+
+
+def write_snapshot(path: str, ids: List[str], embeddings: np.ndarray,
+                   records: List[Dict[str, Any]], last_seq: int = 0) -> int:
+    """
+    Write a snapshot atomically (temp file + fsync + rename).
+    `embeddings` must already be L2-normalized. Returns the file size.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    n = len(ids)
+    dim = int(embeddings.shape[1]) if n else 0
+
+    metadata = MetadataIndex(records)
+    columns, sorted_rows, categories = metadata.export_columns()
+
+    sections = [("embeddings", embeddings.tobytes())]
+    for field in NUMERIC_FIELDS:
+        sections.append((f"col:{field}", columns[field].astype(np.float64).tobytes()))
+        sections.append((f"ord:{field}", sorted_rows[field].astype(np.int64).tobytes()))
+        sections.append((f"srt:{field}", metadata.sorted_values[field].astype(np.float64).tobytes()))
+    dictionary = {}
+    for field in CATEGORICAL_FIELDS:
+        codes, values = categories[field]
+        sections.append((f"cat:{field}", codes.astype(np.int32).tobytes()))
+        dictionary[field] = values
+    sections.append(("dictionary", json.dumps(dictionary).encode("utf-8")))
+
+    id_strings = _encode_strings(list(ids))
+    sections.append(("ids:offsets", id_strings["offsets"]))
+    sections.append(("ids:blob", id_strings["blob"]))
+    record_strings = _encode_strings([json.dumps(r, separators=(",", ":")) for r in records])
+    sections.append(("rec:offsets", record_strings["offsets"]))
+    sections.append(("rec:blob", record_strings["blob"]))
+
+    table_start = HEADER_STRUCT.size
+    offset = _align(table_start + SECTION_STRUCT.size * len(sections))
+    table = []
+    payload_crc = 0
+    for name, data in sections:
+        table.append((name, offset, len(data)))
+        payload_crc = zlib.crc32(data, payload_crc)
+        offset = _align(offset + len(data))
+
+    table_bytes = b"".join(
+        SECTION_STRUCT.pack(name.encode("ascii"), section_offset, length)
+        for name, section_offset, length in table
+    )
+    header = HEADER_STRUCT.pack(MAGIC, FORMAT_VERSION, len(sections), n, dim, last_seq, payload_crc, 0)
+    header_crc = zlib.crc32(header + table_bytes)
+    header = HEADER_STRUCT.pack(MAGIC, FORMAT_VERSION, len(sections), n, dim, last_seq, payload_crc, header_crc)
+
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(table_bytes)
+        for (name, data), (_, section_offset, _) in zip(sections, table):
+            f.seek(section_offset)
+            f.write(data)
+        f.truncate(_align(f.tell()))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+    return os.path.getsize(path)
+
+
+class IndexSnapshot:
+    """
+    A snapshot opened with mmap. Arrays are zero-copy views into the mapping
+    and shared through the page cache by every process mapping the same file.
+    Opening checks the payload CRC, which reads the file once (and leaves it
+    warm in the page cache); verify_payload=False makes opening a header read.
+    """
+
+    def __init__(self, path: str, verify_payload: bool = True):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise SnapshotError(f"Snapshot {path} is empty")
+
+        try:
+            self._parse(verify_payload)
+        except Exception:
+            self.close()
+            raise
+
+    def _parse(self, verify_payload: bool):
+        buffer = self._mmap
+        if len(buffer) < HEADER_STRUCT.size:
+            raise SnapshotError("Snapshot header truncated")
+
+        magic, version, section_count, n, dim, last_seq, payload_crc, header_crc = \
+            HEADER_STRUCT.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise SnapshotError("Not a recipe index snapshot")
+        if version != FORMAT_VERSION:
+            raise SnapshotError(f"Unsupported snapshot version {version}")
+
+        table_end = HEADER_STRUCT.size + SECTION_STRUCT.size * section_count
+        if len(buffer) < table_end:
+            raise SnapshotError("Snapshot section table truncated")
+        header = HEADER_STRUCT.pack(magic, version, section_count, n, dim, last_seq, payload_crc, 0)
+        if zlib.crc32(header + bytes(buffer[HEADER_STRUCT.size:table_end])) != header_crc:
+            raise SnapshotError("Snapshot header checksum mismatch")
+
+        self.sections = {}
+        crc = 0
+        for i in range(section_count):
+            raw_name, offset, length = SECTION_STRUCT.unpack_from(buffer, HEADER_STRUCT.size + i * SECTION_STRUCT.size)
+            if offset + length > len(buffer):
+                raise SnapshotError("Snapshot section out of bounds")
+            self.sections[raw_name.rstrip(b"\x00").decode("ascii")] = (offset, length)
+            if verify_payload:
+                for start in range(offset, offset + length, CRC_CHUNK):
+                    crc = zlib.crc32(buffer[start:min(start + CRC_CHUNK, offset + length)], crc)
+        if verify_payload and crc != payload_crc:
+            raise SnapshotError("Snapshot payload checksum mismatch")
+
+        self.size = n
+        self.dim = dim
+        self.last_seq = last_seq
+
+        if n:
+            self.embeddings = self._array("embeddings", np.float32).reshape(n, dim)
+        else:
+            self.embeddings = np.zeros((0, 0), dtype=np.float32)
+
+        columns = {field: self._array(f"col:{field}", np.float64) for field in NUMERIC_FIELDS}
+        sorted_rows = {field: self._array(f"ord:{field}", np.int64) for field in NUMERIC_FIELDS}
+        dictionary = json.loads(self._bytes("dictionary").decode("utf-8"))
+        categories = {
+            field: (self._array(f"cat:{field}", np.int32), dictionary[field])
+            for field in CATEGORICAL_FIELDS
+        }
+        sorted_values = {field: self._array(f"srt:{field}", np.float64) for field in NUMERIC_FIELDS}
+        self.metadata = MetadataIndex.from_columns(n, columns, sorted_rows, categories, sorted_values)
+
+        self.ids = StringColumn(buffer, self._array("ids:offsets", np.uint64), self.sections["ids:blob"][0])
+        self.records = StringColumn(buffer, self._array("rec:offsets", np.uint64),
+                                    self.sections["rec:blob"][0], decode_json=True)
+
+    def _array(self, name: str, dtype) -> np.ndarray:
+        offset, length = self.sections[name]
+        return np.frombuffer(self._mmap, dtype=dtype, count=length // np.dtype(dtype).itemsize, offset=offset)
+
+    def _bytes(self, name: str) -> bytes:
+        offset, length = self.sections[name]
+        return bytes(self._mmap[offset:offset + length])
+
+    def mapped_bytes(self) -> int:
+        return len(self._mmap)
+
+    def close(self):
+        """Close the file; the mapping itself lives as long as arrays reference it"""
+        self._file.close()
+
+
+def open_snapshot(path: str, verify_payload: bool = True) -> Optional[IndexSnapshot]:
+    """Open a snapshot, or return None if it is missing, corrupt or unusable"""
+    if not os.path.exists(path):
+        return None
+    try:
+        return IndexSnapshot(path, verify_payload=verify_payload)
+    except (SnapshotError, OSError, KeyError, ValueError) as e:
+        print(f"   ⚠️  Ignoring snapshot {path}: {e}")
+        return None
@@ -0,0 +1,369 @@
+"""
+BACKGROUND JOB QUEUE
+Large batch analyses run as jobs: the input is split into chunks persisted in
+SQLite, a local worker pool claims chunks (highest priority job first) and
+writes per-item results back, so progress and results survive restarts
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+
+JOBS_DB_PATH = os.getenv("RECIPE_JOBS_DB", "data/jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("RECIPE_JOB_WORKERS", "2"))
+JOB_CHUNK_SIZE = int(os.getenv("RECIPE_JOB_CHUNK_SIZE", "64"))
+JOB_MAX_ATTEMPTS = int(os.getenv("RECIPE_JOB_MAX_ATTEMPTS", "3"))
+STORE_RETRIES = 5          # attempts to record a chunk outcome before giving up on it
+STORE_BACKOFF_SECONDS = 0.1  # first retry delay, doubled per attempt
+
+JOB_STATUSES = ["queued", "running", "completed", "failed", "cancelled"]
+ACTIVE_STATUSES = ("queued", "running")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    processed INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS job_chunks (
+    job_id TEXT NOT NULL,
+    chunk INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    items TEXT NOT NULL,
+    PRIMARY KEY (job_id, chunk)
+);
+CREATE TABLE IF NOT EXISTS job_results (
+    job_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    result TEXT NOT NULL,
+    PRIMARY KEY (job_id, position)
+);
+CREATE INDEX IF NOT EXISTS job_chunks_by_status ON job_chunks (status, job_id);
+CREATE INDEX IF NOT EXISTS jobs_by_priority ON jobs (status, priority DESC, created_at);
+"""
+
+
+class JobNotFoundError(KeyError):
+    pass
+
+
+class JobStore:
+    """
+    SQLite persistence for jobs, their input chunks and per-item results.
+    One connection in WAL mode, serialized by a lock (chunk claims and
+    completions are tiny transactions; the analysis itself runs outside it).
+    """
+
+    def __init__(self, path: str = JOBS_DB_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self.recovered = self._recover()
+
+    def _recover(self) -> int:
+        """Chunks that were running when the process died go back to pending"""
+        with self._lock:
+            cursor = self._db.execute("UPDATE job_chunks SET status = 'pending' WHERE status = 'running'")
+            return cursor.rowcount
+
+    def create(self, kind: str, items: List[Dict[str, Any]], priority: int, chunk_size: int) -> str:
+        job_id = uuid.uuid4().hex
+        chunks = [
+            (job_id, number, start, "pending", json.dumps(items[start:start + chunk_size]))
+            for number, start in enumerate(range(0, len(items), chunk_size))
+        ]
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "INSERT INTO jobs (id, kind, status, priority, total, created_at) VALUES (?, ?, 'queued', ?, ?, ?)",
+                    (job_id, kind, priority, len(items), time.time())
+                )
+                self._db.executemany(
+                    "INSERT INTO job_chunks (job_id, chunk, start, status, items) VALUES (?, ?, ?, ?, ?)", chunks
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Next pending chunk of the highest-priority active job (oldest job first on ties)"""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    """SELECT c.job_id, c.chunk, c.start, c.items, j.kind FROM job_chunks c
+                       JOIN jobs j ON j.id = c.job_id
+                       WHERE c.status = 'pending' AND j.status IN ('queued', 'running')
+                       ORDER BY j.priority DESC, j.created_at, c.chunk LIMIT 1"""
+                ).fetchone()
+                if row is None:
+                    self._db.execute("COMMIT")
+                    return None
+                self._db.execute(
+                    "UPDATE job_chunks SET status = 'running', attempts = attempts + 1 WHERE job_id = ? AND chunk = ?",
+                    (row["job_id"], row["chunk"])
+                )
+                self._db.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ? AND status = 'queued'",
+                    (time.time(), row["job_id"])
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return {"job_id": row["job_id"], "chunk": row["chunk"], "start": row["start"],
+                "kind": row["kind"], "items": json.loads(row["items"])}
+
+    def complete(self, job_id: str, chunk: int, start: int, results: List[Dict[str, Any]]):
+        """Store a chunk's results; the job completes when no chunk is left"""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO job_results (job_id, position, result) VALUES (?, ?, ?)",
+                    [(job_id, start + offset, json.dumps(result)) for offset, result in enumerate(results)]
+                )
+                self._db.execute("UPDATE job_chunks SET status = 'done' WHERE job_id = ? AND chunk = ?", (job_id, chunk))
+                self._db.execute("UPDATE jobs SET processed = processed + ? WHERE id = ?", (len(results), job_id))
+                remaining = self._db.execute(
+                    "SELECT COUNT(*) FROM job_chunks WHERE job_id = ? AND status IN ('pending', 'running')", (job_id,)
+                ).fetchone()[0]
+                if not remaining:
+                    self._db.execute(
+                        "UPDATE jobs SET status = 'completed', finished_at = ? WHERE id = ? AND status = 'running'",
+                        (time.time(), job_id)
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def fail(self, job_id: str, chunk: int, error: str, max_attempts: int = JOB_MAX_ATTEMPTS):
+        """Retry the chunk, or fail the whole job once it has used up its attempts"""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                attempts = self._db.execute(
+                    "SELECT attempts FROM job_chunks WHERE job_id = ? AND chunk = ?", (job_id, chunk)
+                ).fetchone()[0]
+                if attempts < max_attempts:
+                    self._db.execute(
+                        "UPDATE job_chunks SET status = 'pending' WHERE job_id = ? AND chunk = ?", (job_id, chunk)
+                    )
+                else:
+                    self._db.execute(
+                        "UPDATE job_chunks SET status = 'failed' WHERE job_id = ? AND chunk = ?", (job_id, chunk)
+                    )
+                    self._db.execute(
+                        "UPDATE job_chunks SET status = 'cancelled' WHERE job_id = ? AND status = 'pending'", (job_id,)
+                    )
+                    self._db.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                        (error, time.time(), job_id)
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def cancel(self, job_id: str) -> bool:
+        """Stop handing out the job's chunks (chunks already running still store their results)"""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self._db.execute(
+                    "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status IN ('queued', 'running')",
+                    (time.time(), job_id)
+                )
+                cancelled = cursor.rowcount > 0
+                if cancelled:
+                    self._db.execute(
+                        "UPDATE job_chunks SET status = 'cancelled' WHERE job_id = ? AND status = 'pending'", (job_id,)
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        if not cancelled:
+            self.get(job_id)  # raises JobNotFoundError for unknown ids
+        return cancelled
+
+    @staticmethod
+    def _job_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["progress"] = round(job["processed"] / job["total"], 4) if job["total"] else 1.0
+        return job
+
+    def get(self, job_id: str) -> Dict[str, Any]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise JobNotFoundError(job_id)
+        return self._job_dict(row)
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        query, params = "SELECT * FROM jobs", []
+        if status is not None:
+            query, params = query + " WHERE status = ?", [status]
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY created_at DESC LIMIT ?", params + [limit]).fetchall()
+        return [self._job_dict(row) for row in rows]
+
+    def results(self, job_id: str, offset: int = 0, limit: int = 100) -> Dict[str, Any]:
+        """Results with position >= offset, in input order (keyset pagination over positions)"""
+        job = self.get(job_id)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT position, result FROM job_results WHERE job_id = ? AND position >= ? ORDER BY position LIMIT ?",
+                (job_id, offset, limit)
+            ).fetchall()
+        results = [{"position": row["position"], **json.loads(row["result"])} for row in rows]
+        next_offset = results[-1]["position"] + 1 if len(results) == limit else None
+        return {"job_id": job_id, "status": job["status"], "results": results,
+                "count": len(results), "next_offset": next_offset}
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in JOB_STATUSES}
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
+
+
+class JobQueue:
+    """
+    Worker threads pulling chunks from the store. `handlers` map a job kind
+    to a function that turns a chunk of items into one result per item.
+    Priority is applied per chunk, so a high-priority job overtakes a long
+    running one at the next chunk boundary.
+    """
+
+    def __init__(self, store: JobStore, handlers: Dict[str, Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]],
+                 workers: int = JOB_WORKERS, chunk_size: int = JOB_CHUNK_SIZE):
+        self.store = store
+        self.handlers = handlers
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self._wakeup = threading.Condition()
+        self._threads = []
+        self._heartbeats = {}  # worker name -> time of its last loop iteration
+        self.metrics = {"chunks": 0, "items": 0, "chunk_failures": 0, "store_errors": 0,
+                        "busy_seconds": 0.0}
+
+    def start(self):
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._loop, name=f"job-worker-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, kind: str, items: List[Dict[str, Any]], priority: int = 0) -> str:
+        if kind not in self.handlers:
+            raise ValueError(f"Job kind must be one of {list(self.handlers)}")
+        if not items:
+            raise ValueError("A job needs at least one item")
+        job_id = self.store.create(kind, items, priority, self.chunk_size)
+        with self._wakeup:
+            self._wakeup.notify_all()
+        return job_id
+
+    def _loop(self):
+        name = threading.current_thread().name
+        while True:
+            self._heartbeats[name] = time.time()
+            try:
+                self._run_next()
+            except Exception as e:
+                # Never let a store or handler bug kill the worker
+                self.metrics["store_errors"] += 1
+                print(f"   ⚠️  Job worker {name} error: {e}")
+                time.sleep(STORE_BACKOFF_SECONDS)
+
+    def _run_next(self):
+        try:
+            chunk = self.store.claim()
+        except Exception as e:
+            print(f"   ⚠️  Job queue claim failed: {e}")
+            chunk = None
+        if chunk is None:
+            with self._wakeup:
+                self._wakeup.wait(timeout=1.0)
+            return
+
+        started = time.perf_counter()
+        error = None
+        try:
+            results = self.handlers[chunk["kind"]](chunk["items"])
+            if len(results) != len(chunk["items"]):
+                raise ValueError("Handler returned a different number of results than items")
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+
+        if error is None:
+            if self._record(self.store.complete, chunk["job_id"], chunk["chunk"], chunk["start"], results):
+                self.metrics["chunks"] += 1
+                self.metrics["items"] += len(results)
+            else:
+                error = "Could not store chunk results"
+        if error is not None:
+            self.metrics["chunk_failures"] += 1
+            self._record(self.store.fail, chunk["job_id"], chunk["chunk"], error)
+        self.metrics["busy_seconds"] += time.perf_counter() - started
+
+    def _record(self, action: Callable, *args) -> bool:
+        """
+        Run a store update, retrying with exponential backoff (e.g. SQLite
+        busy or disk full). False if it never succeeded: the chunk stays
+        'running' and is re-queued by the recovery pass on the next start.
+        """
+        delay = STORE_BACKOFF_SECONDS
+        for attempt in range(STORE_RETRIES):
+            try:
+                action(*args)
+                return True
+            except Exception as e:
+                self.metrics["store_errors"] += 1
+                print(f"   ⚠️  Job store update failed (attempt {attempt + 1}/{STORE_RETRIES}): {e}")
+                time.sleep(delay)
+                delay *= 2
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        busy = self.metrics["busy_seconds"]
+        now = time.time()
+        return {
+            "workers": self.workers,
+            "workers_alive": sum(thread.is_alive() for thread in self._threads),
+            "worker_heartbeat_age_s": {name: round(now - beat, 1) for name, beat in self._heartbeats.items()},
+            "chunk_size": self.chunk_size,
+            "jobs": self.store.counts(),
+            "recovered_chunks": self.store.recovered,
+            "chunks_processed": self.metrics["chunks"],
+            "items_processed": self.metrics["items"],
+            "chunk_failures": self.metrics["chunk_failures"],
+            "store_errors": self.metrics["store_errors"],
+            "items_per_second": round(self.metrics["items"] / busy, 1) if busy else 0.0
+        }
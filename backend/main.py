@@ -3,20 +3,37 @@ MAIN FASTAPI BACKEND WITH COMPLETE ML PIPELINE
 Meets all API and ML requirements
 """
 
+import hmac
+import math
 import os
+import time
 
 os.environ['CUDA_VISIBLE_DEVICES'] = ''
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Depends, Request
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import List, Dict
+from typing import List, Dict, Optional
 import uvicorn
 from datetime import datetime
 
 
 from models import RecipeMLPipeline
-from database import VectorDatabase
+from database import VectorDatabase, SNAPSHOT_PATH
 from preprocessing import RecipePreprocessor
+from serialization import FastJSONResponse, parse_fields, project, negotiated_response
+from pipeline_executor import Stage, PipelineExecutor
+from metadata_index import parse_filters, NUMERIC_FIELDS
+from memory_stats import register_component, component_report, memory_summary, process_memory, tracker
+from embedding_service import EmbeddingService, encode_binary, DTYPE_CODES, BINARY_MEDIA_TYPE
+from nutrition import analyze_nutrition
+from dedup import DuplicateRecipeError
+from pantry_index import PANTRY_MODES
+from job_queue import JobStore, JobQueue, JobNotFoundError, JOB_STATUSES
+from hot_reload import ReloadManager
+from search_windows import CursorError
+from models import CLASSIFIER_PATH, MODEL_DIR
 
 
 app = FastAPI(
@@ -29,6 +46,110 @@ app = FastAPI(
 class RecipeRequest(BaseModel):
     recipe_text: str
     goal: str  # "lose_weight" or "gain_weight"
+    filters: Optional[Dict] = None  # e.g. {"calories": {"lt": 400}}
+    deadline_ms: Optional[float] = None  # time budget; the X-Request-Deadline-Ms header also works
+
+class SearchRequest(BaseModel):
+    query_text: str
+    goal: Optional[str] = None
+    n_results: int = 3
+    filters: Optional[Dict] = None  # e.g. {"protein_g": {"gt": 30}, "prep_time": {"lte": 20}}
+
+MAX_SEARCH_RESULTS = int(os.getenv("MAX_SEARCH_RESULTS", "100"))
+
+class PagedSearchRequest(BaseModel):
+    query_text: Optional[str] = None  # required for the first page only
+    goal: Optional[str] = None
+    filters: Optional[Dict] = None
+    page_size: int = 10
+    cursor: Optional[str] = None  # next_cursor of the previous page
+    allow_stale: bool = False  # keep paging the old window after the index changed
+
+MAX_PAGE_SIZE = 100
+CURSOR_ERROR_STATUS = {"invalid": 400, "mismatch": 400, "stale": 409, "expired": 410}
+
+class BatchAnalysisRequest(BaseModel):
+    recipes: List[RecipeRequest]
+
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "256"))  # larger batches belong in /jobs
+
+class EmbedRequest(BaseModel):
+    texts: List[str]
+    format: str = "json"  # "json" or "binary"
+    dtype: str = "float32"  # "float32" or "float16"
+
+MAX_EMBED_BATCH = int(os.getenv("MAX_EMBED_BATCH", "256"))
+
+class NutritionRequest(BaseModel):
+    texts: List[str]
+    servings: int = 1
+    include_ingredients: bool = True
+
+MAX_NUTRITION_BATCH = int(os.getenv("MAX_NUTRITION_BATCH", "1000"))
+
+class PantryRequest(BaseModel):
+    ingredients: List[str]
+    mode: str = "missing"  # "subset", "superset" or "missing"
+    max_missing: int = 1
+    goal: Optional[str] = None
+    n_results: int = 10
+    assume_staples: bool = True  # salt, pepper, oil, herbs and spices count as available
+
+class MealPlanRequest(BaseModel):
+    goal: str  # "lose_weight" or "gain_weight"
+    days: int = 1  # 1 = day plan, 7 = week plan
+    meals_per_day: int = 3
+    calories_target: Optional[float] = None  # daily; defaults depend on the goal
+    calorie_tolerance: float = 100.0
+    protein_min: Optional[float] = None  # daily grams; defaults depend on the goal
+    max_prep_time: Optional[float] = None  # minutes per meal
+    max_total_prep_time: Optional[float] = None  # minutes per day
+    max_repeats: int = 2  # times one recipe may appear in the plan
+    filters: Optional[Dict] = None  # same spec as /search
+    time_limit_ms: float = 500.0
+
+MAX_PLAN_DAYS = 14
+MAX_MEALS_PER_DAY = 6
+MAX_DAILY_CALORIES = 10000.0  # bound on calories_target and calorie_tolerance
+MAX_PLAN_TIME_MS = float(os.getenv("MAX_PLAN_TIME_MS", "5000"))
+
+class JobRequest(BaseModel):
+    recipes: Optional[List[RecipeRequest]] = None  # explicit batch to analyze
+    rescore_catalog: bool = False  # every live catalog recipe, for `goal` or the recipe's own goal
+    goal: Optional[str] = None
+    priority: int = 0  # higher runs first
+
+MAX_JOB_ITEMS = int(os.getenv("MAX_JOB_ITEMS", "1000000"))
+
+ADMIN_TOKEN = os.getenv("RECIPE_ADMIN_TOKEN")  # unset: /admin routes answer localhost only
+LOCAL_HOSTS = {"127.0.0.1", "::1", "localhost"}
+
+async def require_admin(request: Request, x_admin_token: Optional[str] = Header(None)):
+    """Guard for /admin routes: the X-Admin-Token header when a token is configured, else localhost"""
+    if ADMIN_TOKEN:
+        if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+            raise HTTPException(status_code=401, detail="Missing or invalid X-Admin-Token")
+    elif request.client is None or request.client.host not in LOCAL_HOSTS:
+        raise HTTPException(status_code=403, detail="Admin routes are localhost-only unless RECIPE_ADMIN_TOKEN is set")
+
+ADMIN = [Depends(require_admin)]
+
+class ReloadRequest(BaseModel):
+    classifier: bool = False  # reload RECIPE_CLASSIFIER_PATH
+    classifier_path: Optional[str] = None
+    snapshot: bool = False  # reload RECIPE_SNAPSHOT_PATH
+    snapshot_path: Optional[str] = None
+
+class RecipeUpsert(BaseModel):
+    title: str
+    text: str
+    goal: str  # "lose_weight" or "gain_weight"
+    calories: Optional[float] = None
+    protein_g: Optional[float] = None
+    carbs_g: Optional[float] = None
+    fats_g: Optional[float] = None
+    prep_time: Optional[float] = None
+    difficulty: Optional[str] = None
 
 class AnalysisResult(BaseModel):
     is_healthy: bool
@@ -38,6 +159,9 @@ class AnalysisResult(BaseModel):
     processing_steps: List[str]
     ml_pipeline_info: Dict
     match_status: str  # ADD THIS LINE - "MATCH" or "MISMATCH"
+    degraded_stages: List[str] = []  # stages skipped or served from cache to meet the deadline
+
+ANALYSIS_FIELDS = list(AnalysisResult.model_fields.keys())
 
 class SystemInfo(BaseModel):
     ml_model: str
@@ -53,8 +177,22 @@ print("⚠️  FORCING CPU MODE (GPU not available in WSL2)")
 print("=" * 60)
 
 ml_pipeline = RecipeMLPipeline()
-vector_db = VectorDatabase()
+# /embed, /analyze, /search and catalog updates all embed through one cache + micro-batcher
+embedding_service = EmbeddingService(ml_pipeline.get_embeddings)
 preprocessor = RecipePreprocessor()
+# Ingestion dedup shingles the same tokens the NLP pipeline produces
+vector_db = VectorDatabase(embed_fn=embedding_service.embed,
+                           tokenize_fn=lambda text: preprocessor.full_pipeline(text).split())
+
+register_component("ml_pipeline", ml_pipeline.memory_footprint)
+register_component("vector_database", vector_db.memory_footprint)
+register_component("preprocessor", preprocessor.memory_footprint)
+register_component("embedding_service", embedding_service.memory_footprint)
+
+reload_manager = ReloadManager(ml_pipeline, vector_db, classifier_dir=MODEL_DIR,
+                               snapshot_dir=os.path.dirname(SNAPSHOT_PATH) or ".",
+                               watch_path=CLASSIFIER_PATH)
+reload_manager.start_watcher()
 
 print("✅ ALL ML COMPONENTS INITIALIZED")
 print(f"   - Transformer: Sentence-BERT")
@@ -81,9 +219,23 @@ async def root():
             "3 Docker Services"
         ],
         "endpoints": [
-            "/analyze (POST) - Full ML analysis",
+            "/analyze (POST) - Full ML analysis (?fields= projection)",
+            "/analyze/batch (POST) - Batched analysis, gzip on request",
+            "/embed (POST) - Raw MiniLM embeddings as JSON or binary float32/float16",
+            "/nutrition (POST) - Macro totals from ingredient quantities",
+            "/suggest (GET) - Typeahead over recipe titles and ingredients",
+            "/pantry (POST) - Recipes you can cook from the ingredients you have",
+            "/meal-plan (POST) - Day or week plan meeting calorie, protein and prep-time targets",
+            "/search (POST) - Semantic search with nutrition filters",
+            "/search/paged (POST) - Cursor-paginated semantic search over a cached result window",
+            "/recipes/{id} (PUT/DELETE) - Incremental catalog updates",
+            "/recipes/{id}/similar (GET) - Precomputed similar recipes",
+            "/admin/snapshot (POST) - Write a memory-mapped index snapshot",
+            "/admin/reload (GET/POST) - Hot-swap classifier checkpoint or index snapshot",
+            "/jobs (POST/GET) - Background batch analysis jobs with paginated results",
             "/system (GET) - System architecture",
-            "/stats (GET) - Vector DB statistics",
+            "/stats (GET) - Vector DB + memory statistics",
+            "/admin/memory (GET) - Memory accounting and tracemalloc diffs",
             "/health (GET) - Health check"
         ],
         "device_mode": "CPU (CUDA disabled for WSL2 compatibility)"
@@ -103,7 +255,59 @@ async def get_system_info() -> SystemInfo:
 @app.get("/stats")
 async def get_statistics():
     """Get vector database statistics"""
-    return vector_db.get_stats()
+    # Collection counts, WAL sizes and the job store all hit disk
+    return await run_in_threadpool(_collect_stats)
+
+def _collect_stats() -> Dict:
+    stats = vector_db.get_stats()
+    stats["embedding_service"] = embedding_service.stats()
+    stats["analysis_pipeline"] = {
+        "stage_latency_ms": {k: round(v, 2) for k, v in analysis_pipeline.estimates_ms.items()},
+        "optional_queue_wait_ms": round(analysis_pipeline.queue_wait_ms, 2),
+        "degraded_stages": dict(analysis_pipeline.degraded_counts)
+    }
+    stats["jobs"] = job_queue.stats()
+    stats["versions"] = {"classifier": ml_pipeline.classifier_version,
+                         "index": vector_db.local_index.version if vector_db.local_index else None}
+    stats["memory"] = memory_summary()
+    return stats
+
+@app.get("/admin/memory", dependencies=ADMIN)
+async def memory_report():
+    """RSS and per-component estimated footprint"""
+    return {**process_memory(), "components": component_report(), "tracemalloc": tracker.status()}
+
+@app.post("/admin/memory/tracemalloc/start", dependencies=ADMIN)
+async def tracemalloc_start(frames: int = 10):
+    """Start tracing allocations (adds overhead; turn off when done)"""
+    return tracker.start(frames)
+
+@app.post("/admin/memory/tracemalloc/stop", dependencies=ADMIN)
+async def tracemalloc_stop():
+    """Stop tracing and drop stored snapshots"""
+    return tracker.stop()
+
+@app.post("/admin/memory/snapshots/{label}", dependencies=ADMIN)
+async def tracemalloc_snapshot(label: str):
+    """Store a named tracemalloc snapshot"""
+    try:
+        return tracker.take(label)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.get("/admin/memory/diff", dependencies=ADMIN)
+async def tracemalloc_diff(before: str, after: Optional[str] = None, limit: int = 20,
+                           group_by: str = "lineno", path_filter: Optional[str] = None):
+    """Allocation growth by source line between two snapshots (after defaults to now)"""
+    if group_by not in ["lineno", "filename", "traceback"]:
+        raise HTTPException(status_code=400, detail="group_by must be 'lineno', 'filename' or 'traceback'")
+    try:
+        return {"before": before, "after": after or "now",
+                "top": tracker.diff(before, after, limit, group_by, path_filter)}
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
 @app.get("/health")
 async def health_check():
@@ -119,108 +323,633 @@ async def health_check():
         "device": "cpu"
     }
 
-@app.post("/analyze", response_model=AnalysisResult)
-async def analyze_recipe(request: RecipeRequest):
+@app.post("/search")
+async def search_recipes(request: SearchRequest):
     """
-    COMPLETE ML ANALYSIS PIPELINE
-    Meets: "Text classification", "Semantic search", "ML inference"
+    SEMANTIC SEARCH WITH NUTRITION FILTERS
+    Filters are resolved on the columnar metadata index before vector scoring
     """
-   
-    if not request.recipe_text.strip():
-        raise HTTPException(status_code=400, detail="Recipe text cannot be empty")
+    if not request.query_text.strip():
+        raise HTTPException(status_code=400, detail="Query text cannot be empty")
+    
+    if request.goal is not None and request.goal not in ["lose_weight", "gain_weight"]:
+        raise HTTPException(status_code=400, detail="Goal must be 'lose_weight' or 'gain_weight'")
+    
+    if not 1 <= request.n_results <= MAX_SEARCH_RESULTS:
+        raise HTTPException(status_code=400, detail=f"n_results must be between 1 and {MAX_SEARCH_RESULTS}")
+    
+    try:
+        results = vector_db.semantic_search(
+            query_text=request.query_text,
+            goal=request.goal,
+            n_results=request.n_results,
+            filters=request.filters
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {"results": results, "count": len(results)}
+
+@app.post("/search/paged")
+async def search_recipes_paged(request: PagedSearchRequest):
+    """
+    CURSOR-PAGINATED SEARCH
+    The first page computes the top-N once; pass next_cursor back to read
+    further pages from that window without re-embedding or rescanning.
+    Cursors carry filters, goal and index version: 409 when the index has
+    changed, 410 when the window expired (restart without a cursor)
+    """
+    if request.cursor is None and not (request.query_text or "").strip():
+        raise HTTPException(status_code=400, detail="Query text cannot be empty")
+    
+    if request.goal is not None and request.goal not in ["lose_weight", "gain_weight"]:
+        raise HTTPException(status_code=400, detail="Goal must be 'lose_weight' or 'gain_weight'")
+    
+    if not 1 <= request.page_size <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"page_size must be between 1 and {MAX_PAGE_SIZE}")
+    
+    try:
+        page = await run_in_threadpool(
+            vector_db.paged_search,
+            query_text=request.query_text,
+            goal=request.goal,
+            filters=request.filters,
+            page_size=request.page_size,
+            cursor=request.cursor,
+            allow_stale=request.allow_stale
+        )
+    except CursorError as e:
+        raise HTTPException(status_code=CURSOR_ERROR_STATUS[e.reason], detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return FastJSONResponse(page)
+
+@app.post("/embed")
+async def embed_texts(request: EmbedRequest, accept: Optional[str] = Header(None)):
+    """
+    RAW EMBEDDING SERVICE
+    JSON by default; format=binary (or Accept: application/octet-stream) returns
+    a 16-byte EMB1 header (magic, version, dtype, rows, dim) followed by the
+    row-major little-endian matrix - see embedding_service.decode_binary
+    """
+    if not request.texts:
+        raise HTTPException(status_code=400, detail="Texts cannot be empty")
+    
+    if len(request.texts) > MAX_EMBED_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_EMBED_BATCH} texts per request")
+    
+    if request.format not in ["json", "binary"]:
+        raise HTTPException(status_code=400, detail="Format must be 'json' or 'binary'")
+    
+    if request.dtype not in DTYPE_CODES:
+        raise HTTPException(status_code=400, detail=f"Dtype must be one of {list(DTYPE_CODES)}")
+    
+    embeddings = await run_in_threadpool(embedding_service.embed, request.texts)
+    rows, dim = embeddings.shape
+    
+    if request.format == "binary" or (accept and BINARY_MEDIA_TYPE in accept):
+        return Response(
+            content=encode_binary(embeddings, request.dtype),
+            media_type=BINARY_MEDIA_TYPE,
+            headers={"X-Embedding-Shape": f"{rows},{dim}", "X-Embedding-Dtype": request.dtype}
+        )
+    
+    return FastJSONResponse({
+        "embeddings": embeddings.astype(request.dtype).tolist(),
+        "shape": [rows, dim],
+        "dtype": request.dtype
+    })
+
+@app.post("/nutrition")
+async def estimate_nutrition(request: NutritionRequest):
+    """
+    NUTRITION ENGINE
+    Parses "200 g chicken breast, 2 tbsp olive oil, ..." into grams per
+    ingredient and returns calories/protein/carbs/fats per serving
+    """
+    if not request.texts:
+        raise HTTPException(status_code=400, detail="Texts cannot be empty")
+    
+    if len(request.texts) > MAX_NUTRITION_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_NUTRITION_BATCH} texts per request")
+    
+    if request.servings < 1:
+        raise HTTPException(status_code=400, detail="Servings must be at least 1")
+    
+    results = analyze_nutrition(request.texts, request.servings, request.include_ingredients)
+    return FastJSONResponse({"results": results, "count": len(results)})
+
+@app.get("/suggest")
+async def suggest(q: str = "", limit: int = 8):
+    """
+    TYPEAHEAD
+    Titles and ingredient terms starting with the typed prefix, most used first
+    """
+    if not 1 <= limit <= 50:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 50")
+    
+    suggestions = vector_db.suggest(q, limit)
+    return FastJSONResponse({"query": q, "suggestions": suggestions, "count": len(suggestions)})
+
+@app.post("/pantry")
+async def pantry_search(request: PantryRequest):
+    """
+    PANTRY SEARCH
+    Bitmap ingredient index: subset = cook with only what you have,
+    superset = uses everything listed, missing = at most max_missing to buy
+    """
+    if not request.ingredients:
+        raise HTTPException(status_code=400, detail="Ingredients cannot be empty")
+    
+    if request.mode not in PANTRY_MODES:
+        raise HTTPException(status_code=400, detail=f"Mode must be one of {PANTRY_MODES}")
+    
+    if request.goal is not None and request.goal not in ["lose_weight", "gain_weight"]:
+        raise HTTPException(status_code=400, detail="Goal must be 'lose_weight' or 'gain_weight'")
+    
+    if request.max_missing < 0 or request.n_results < 1:
+        raise HTTPException(status_code=400, detail="max_missing must be >= 0 and n_results >= 1")
+    
+    try:
+        result = vector_db.pantry_search(
+            request.ingredients,
+            mode=request.mode,
+            max_missing=request.max_missing,
+            goal=request.goal,
+            n_results=request.n_results,
+            assume_staples=request.assume_staples
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     
+    return FastJSONResponse(result)
+
+@app.post("/meal-plan")
+async def meal_plan(request: MealPlanRequest):
+    """
+    MEAL PLANNER
+    Exact-count knapsack DP over discretized calories per day, maximizing
+    protein inside the calorie window; best plan found within time_limit_ms
+    """
     if request.goal not in ["lose_weight", "gain_weight"]:
         raise HTTPException(status_code=400, detail="Goal must be 'lose_weight' or 'gain_weight'")
     
-   
-    processing_steps = []
+    if not 1 <= request.days <= MAX_PLAN_DAYS:
+        raise HTTPException(status_code=400, detail=f"days must be between 1 and {MAX_PLAN_DAYS}")
     
+    if not 1 <= request.meals_per_day <= MAX_MEALS_PER_DAY:
+        raise HTTPException(status_code=400, detail=f"meals_per_day must be between 1 and {MAX_MEALS_PER_DAY}")
     
-    processing_steps.append("text_preprocessing")
-    preprocessed_text = preprocessor.full_pipeline(request.recipe_text)
+    if request.calorie_tolerance < 0 or request.max_repeats < 1:
+        raise HTTPException(status_code=400, detail="calorie_tolerance must be >= 0 and max_repeats >= 1")
     
-   
-    processing_steps.append("transformer_embedding")
+    if request.calories_target is not None and not 0 < request.calories_target <= MAX_DAILY_CALORIES:
+        raise HTTPException(status_code=400, detail=f"calories_target must be in (0, {MAX_DAILY_CALORIES:g}]")
     
+    if not request.calorie_tolerance <= MAX_DAILY_CALORIES:
+        raise HTTPException(status_code=400, detail=f"calorie_tolerance must be at most {MAX_DAILY_CALORIES:g}")
     
-    processing_steps.append("deep_learning_classification")
-    is_good, confidence = ml_pipeline.predict(request.recipe_text, request.goal)
+    if not 0 < request.time_limit_ms <= MAX_PLAN_TIME_MS:
+        raise HTTPException(status_code=400, detail=f"time_limit_ms must be in (0, {MAX_PLAN_TIME_MS:g}]")
     
-   
-    match_status = "MATCH" if is_good else "MISMATCH"
+    try:
+        plan = await run_in_threadpool(
+            vector_db.plan_meals,
+            request.goal,
+            days=request.days,
+            meals_per_day=request.meals_per_day,
+            calories_target=request.calories_target,
+            calorie_tolerance=request.calorie_tolerance,
+            protein_min=request.protein_min,
+            max_prep_time=request.max_prep_time,
+            max_total_prep_time=request.max_total_prep_time,
+            max_repeats=request.max_repeats,
+            filters=request.filters,
+            time_limit_ms=request.time_limit_ms
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
+    return FastJSONResponse(plan)
+
+@app.put("/recipes/{recipe_id}")
+async def upsert_recipe(recipe_id: str, recipe: RecipeUpsert):
+    """Insert or replace a catalog recipe (no re-ingest needed)"""
+    if not recipe.text.strip():
+        raise HTTPException(status_code=400, detail="Recipe text cannot be empty")
     
-    processing_steps.append("semantic_search")
-    recommendations = vector_db.semantic_search(
-        query_text=request.recipe_text,
-        goal=request.goal,
-        n_results=3
-    )
+    if recipe.goal not in ["lose_weight", "gain_weight"]:
+        raise HTTPException(status_code=400, detail="Goal must be 'lose_weight' or 'gain_weight'")
+    
+    # Macros and prep time feed the metadata columns every filter and ranking reads
+    record = {"id": recipe_id, **recipe.model_dump()}
+    invalid = [k for k in NUMERIC_FIELDS if record[k] is not None and not (math.isfinite(record[k]) and record[k] >= 0)]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Must be finite and >= 0: {', '.join(invalid)}")
+    # Fill macros the client left out from the recipe's ingredient quantities
+    missing = [k for k in ["calories", "protein_g", "carbs_g", "fats_g"] if record[k] is None]
+    if missing:
+        estimate = analyze_nutrition([recipe.text], include_ingredients=False)[0]
+        record.update({k: estimate[k] for k in missing})
+    try:
+        # Embeds the text and fsyncs the WAL
+        replaced = await run_in_threadpool(vector_db.upsert_recipe, record)
+    except DuplicateRecipeError as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "duplicate_of": e.duplicate_of,
+                                                     "similarity": round(e.similarity, 3)})
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    return {"id": recipe_id, "status": "replaced" if replaced else "created"}
+
+@app.delete("/recipes/{recipe_id}")
+async def delete_recipe(recipe_id: str):
+    """Delete a catalog recipe"""
+    try:
+        deleted = await run_in_threadpool(vector_db.delete_recipe, recipe_id)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    if not deleted:
+        raise HTTPException(status_code=404, detail=f"Recipe '{recipe_id}' not found")
     
-    if request.goal == "lose_weight":
-        if is_good:
-            reason = f"✅ EXCELLENT MATCH FOR WEIGHT LOSS"
-        else:
-            reason = f"⚠️ MISMATCH: NEEDS ADJUSTMENT FOR WEIGHT LOSS"
-    else:  # gain_weight
-        if is_good:
-            reason = f"✅ PERFECT MATCH FOR WEIGHT GAIN"
-        else:
-            reason = f"⚠️ MISMATCH: ENHANCE FOR WEIGHT GAIN"
-    
-
-    specific_recommendations = []
-    
-    if request.goal == "lose_weight":
-        if is_good:
-            specific_recommendations = [
-                {"text": "This recipe aligns perfectly with weight loss goals", "type": "match"},
-                {"text": "Good balance of protein and fiber", "type": "nutrition"},
-                {"text": "Consider portion control for optimal results", "type": "habit"}
-            ]
-        else:
-            specific_recommendations = [
-                {"text": "BAKE instead of FRY to reduce calories", "type": "preparation", "priority": "high"},
-                {"text": "Use cooking spray instead of oil", "type": "ingredient", "priority": "high"},
-                {"text": "Add more vegetables to increase volume", "type": "addition", "priority": "medium"}
-            ]
-    else:  # gain_weight
-        if is_good:
-            specific_recommendations = [
-                {"text": "Perfect for muscle growth", "type": "match"},
-                {"text": "Good protein content for recovery", "type": "nutrition"},
-                {"text": "Healthy fats support hormones", "type": "health"}
-            ]
-        else:
-            specific_recommendations = [
-                {"text": "Add avocado or nuts for healthy fats", "type": "addition", "priority": "high"},
-                {"text": "Increase portion size by 25%", "type": "portion", "priority": "high"},
-                {"text": "Use full-fat dairy products", "type": "substitution", "priority": "medium"}
-            ]
+    return {"id": recipe_id, "status": "deleted"}
+
+@app.get("/recipes/{recipe_id}/similar")
+async def similar_recipes(recipe_id: str, k: int = 5):
+    """Similar catalog recipes from the precomputed neighbor graph"""
+    if k < 1:
+        raise HTTPException(status_code=400, detail="k must be at least 1")
+    
+    try:
+        results = vector_db.similar_recipes(recipe_id, n_results=k)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     
+    if results is None:
+        raise HTTPException(status_code=404, detail=f"Recipe '{recipe_id}' not found")
     
+    return {"id": recipe_id, "similar": results, "count": len(results)}
+
+@app.post("/admin/snapshot", dependencies=ADMIN)
+async def write_snapshot():
+    """Write the local index to a memory-mapped snapshot for fast restarts"""
+    try:
+        return await run_in_threadpool(vector_db.save_snapshot)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=f"Snapshot failed: {e}")
+
+@app.get("/admin/reload", dependencies=ADMIN)
+async def reload_status():
+    """Serving classifier/index versions and recent reloads"""
+    return reload_manager.status()
+
+@app.post("/admin/reload", dependencies=ADMIN)
+async def hot_reload(request: ReloadRequest):
+    """
+    ZERO-DOWNTIME RELOAD
+    The new classifier checkpoint or index snapshot is loaded and warmed up
+    on a worker thread while requests keep being served, then swapped in;
+    in-flight requests finish on the version they started with
+    """
+    try:
+        return await run_in_threadpool(
+            reload_manager.reload,
+            classifier_path=request.classifier_path,
+            snapshot_path=request.snapshot_path,
+            classifier=request.classifier,
+            snapshot=request.snapshot
+        )
+    except (FileNotFoundError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reload failed, previous version still serving: {e}")
+
+GOAL_REASONS = {
+    ("lose_weight", True): "✅ EXCELLENT MATCH FOR WEIGHT LOSS",
+    ("lose_weight", False): "⚠️ MISMATCH: NEEDS ADJUSTMENT FOR WEIGHT LOSS",
+    ("gain_weight", True): "✅ PERFECT MATCH FOR WEIGHT GAIN",
+    ("gain_weight", False): "⚠️ MISMATCH: ENHANCE FOR WEIGHT GAIN",
+}
+
+GOAL_RECOMMENDATIONS = {
+    ("lose_weight", True): [
+        {"text": "This recipe aligns perfectly with weight loss goals", "type": "match"},
+        {"text": "Good balance of protein and fiber", "type": "nutrition"},
+        {"text": "Consider portion control for optimal results", "type": "habit"}
+    ],
+    ("lose_weight", False): [
+        {"text": "BAKE instead of FRY to reduce calories", "type": "preparation", "priority": "high"},
+        {"text": "Use cooking spray instead of oil", "type": "ingredient", "priority": "high"},
+        {"text": "Add more vegetables to increase volume", "type": "addition", "priority": "medium"}
+    ],
+    ("gain_weight", True): [
+        {"text": "Perfect for muscle growth", "type": "match"},
+        {"text": "Good protein content for recovery", "type": "nutrition"},
+        {"text": "Healthy fats support hormones", "type": "health"}
+    ],
+    ("gain_weight", False): [
+        {"text": "Add avocado or nuts for healthy fats", "type": "addition", "priority": "high"},
+        {"text": "Increase portion size by 25%", "type": "portion", "priority": "high"},
+        {"text": "Use full-fat dairy products", "type": "substitution", "priority": "medium"}
+    ],
+}
+
+def validate_recipe_request(request: RecipeRequest):
+    """Shared input checks for single and batch analysis"""
+    if not request.recipe_text.strip():
+        raise HTTPException(status_code=400, detail="Recipe text cannot be empty")
+    
+    if request.goal not in ["lose_weight", "gain_weight"]:
+        raise HTTPException(status_code=400, detail="Goal must be 'lose_weight' or 'gain_weight'")
+
+def request_deadline(deadline_ms: Optional[float], header_ms: Optional[float]) -> Optional[float]:
+    """Absolute time.monotonic() deadline from the body field or the header (field wins)"""
+    budget_ms = deadline_ms if deadline_ms is not None else header_ms
+    if budget_ms is None:
+        return None
+    if budget_ms <= 0:
+        raise HTTPException(status_code=400, detail="Deadline must be a positive number of milliseconds")
+    return time.monotonic() + budget_ms / 1000.0
+
+def remaining_ms(deadline: Optional[float]) -> Optional[float]:
+    return None if deadline is None else max(0.0, (deadline - time.monotonic()) * 1000)
+
+def requested_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Parse the ?fields= projection parameter"""
+    try:
+        return parse_fields(fields, ANALYSIS_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def build_analysis(goal: str, is_good: bool, confidence: float,
+                   recommendations: List[Dict], processing_steps: List[str],
+                   stage_timings_ms: Optional[Dict[str, float]] = None,
+                   degraded: Optional[Dict[str, str]] = None) -> Dict:
+    """Assemble the AnalysisResult payload as a plain dict (no pydantic round trip)"""
+    match_status = "MATCH" if is_good else "MISMATCH"
+    
+    specific_recommendations = list(GOAL_RECOMMENDATIONS[(goal, is_good)])
     if recommendations:
         specific_recommendations.append({"text": f"Found {len(recommendations)} similar recipes", "type": "database"})
     
-    
     ml_pipeline_info = {
         "transformer_model": "Sentence-BERT (all-MiniLM-L6-v2)",
         "neural_network": "384→256→128→64→2",
         "embedding_dimension": 384,
-        "vector_database": "ChromaDB" if vector_db.collection else "Mock",
+        "vector_database": "ChromaDB" if vector_db.collection else ("Local Index" if vector_db.local_index else "Mock"),
         "match_status": match_status,
+        "classifier_version": ml_pipeline.classifier_version,
         "device": "cpu"  
     }
+    if stage_timings_ms is not None:
+        ml_pipeline_info["stage_timings_ms"] = stage_timings_ms
+    if degraded:
+        ml_pipeline_info["degradation"] = degraded  # stage -> "cached" | "skipped"
     
-    return AnalysisResult(
-        is_healthy=is_good,
-        score=confidence,
-        reason=reason,
-        recommendations=specific_recommendations,
-        processing_steps=processing_steps,
-        ml_pipeline_info=ml_pipeline_info,
-        match_status=match_status
+    return {
+        "is_healthy": is_good,
+        "score": confidence,
+        "reason": GOAL_REASONS[(goal, is_good)],
+        "recommendations": specific_recommendations,
+        "processing_steps": processing_steps,
+        "ml_pipeline_info": ml_pipeline_info,
+        "match_status": match_status,
+        "degraded_stages": list(degraded or {})
+    }
+
+def _classify_stage(query_embedding, goal: str) -> Dict:
+    is_good, confidence = ml_pipeline.predict_from_embedding(query_embedding, goal)
+    return {"is_good": is_good, "confidence": confidence}
+
+def _search_stage(recipe_text: str, query_embedding, goal: str, filters: Optional[Dict],
+                  deadline: Optional[float]) -> List[Dict]:
+    return vector_db.semantic_search(
+        query_text=recipe_text,
+        goal=goal,
+        n_results=3,
+        filters=filters,
+        query_embedding=query_embedding,
+        deadline_ms=remaining_ms(deadline)
     )
 
+def _cached_search_stage(recipe_text: str, query_embedding, goal: str, filters: Optional[Dict],
+                         deadline: Optional[float]) -> Optional[List[Dict]]:
+    return vector_db.cached_search(query_embedding, goal=goal, n_results=3, filters=filters)
+
+# The query embedding is computed once and shared by classification and search,
+# which then run in parallel; stages nobody asked for are not run at all.
+# Under a deadline the search is optional: served from the semantic cache or skipped
+analysis_pipeline = PipelineExecutor([
+    Stage("preprocess", lambda recipe_text: preprocessor.full_pipeline(recipe_text), ["recipe_text"], ["preprocessed_text"],
+          label="text_preprocessing"),
+    Stage("embed", lambda recipe_text: embedding_service.embed_one(recipe_text), ["recipe_text"], ["query_embedding"],
+          label="transformer_embedding"),
+    Stage("classify", _classify_stage, ["query_embedding", "goal"], ["is_good", "confidence"],
+          label="deep_learning_classification"),
+    Stage("search", _search_stage, ["recipe_text", "query_embedding", "goal", "filters", "deadline"],
+          ["recommendations"], label="semantic_search",
+          optional=True, fallback=_cached_search_stage, default=[]),
+])
+
+@app.post("/analyze", response_model=AnalysisResult, response_class=FastJSONResponse)
+async def analyze_recipe(request: RecipeRequest, fields: Optional[str] = None,
+                         x_request_deadline_ms: Optional[float] = Header(None)):
+    """
+    COMPLETE ML ANALYSIS PIPELINE
+    Meets: "Text classification", "Semantic search", "ML inference"
+    Optional ?fields=match_status,score returns only those fields
+    (and skips the semantic search when recommendations are not requested).
+    With a deadline (deadline_ms or X-Request-Deadline-Ms) the search is
+    dropped or served from cache when the budget runs short; see degraded_stages
+    """
+   
+    deadline = request_deadline(request.deadline_ms, x_request_deadline_ms)
+    validate_recipe_request(request)
+    projection = requested_fields(fields)
+    try:
+        parse_filters(request.filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    targets = ["is_good", "confidence"]
+    if projection is None or "recommendations" in projection:
+        targets.append("recommendations")
+    
+    result = await run_in_threadpool(analysis_pipeline.run, {
+        "recipe_text": request.recipe_text,
+        "goal": request.goal,
+        "filters": request.filters,
+        "deadline": deadline
+    }, targets, deadline)
+    
+    analysis = build_analysis(
+        request.goal, result["is_good"], result["confidence"],
+        result.values.get("recommendations", []), result.executed, result.timings_ms,
+        result.degraded
+    )
+    return FastJSONResponse(project(analysis, projection))
+
+@app.post("/analyze/batch")
+async def analyze_batch(batch: BatchAnalysisRequest, fields: Optional[str] = None,
+                        accept_encoding: Optional[str] = Header(None),
+                        x_request_deadline_ms: Optional[float] = Header(None)):
+    """
+    BATCHED ANALYSIS
+    One transformer call and one forward pass for the whole batch;
+    gzip-compressed when the client sends Accept-Encoding: gzip.
+    Once the X-Request-Deadline-Ms budget is spent, the remaining
+    recipes get cached recommendations or none
+    """
+    deadline = request_deadline(None, x_request_deadline_ms)
+    if not batch.recipes:
+        raise HTTPException(status_code=400, detail="Batch cannot be empty")
+    if len(batch.recipes) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400,
+                            detail=f"At most {MAX_BATCH_SIZE} recipes per batch; use /jobs for larger ones")
+    
+    for request in batch.recipes:
+        validate_recipe_request(request)
+    projection = requested_fields(fields)
+    
+    # Embedding, classification and search all block: keep them off the event loop
+    results = await run_in_threadpool(_analyze_batch, batch.recipes, projection, deadline)
+    return negotiated_response({"results": results, "count": len(results)}, accept_encoding)
+
+def _analyze_batch(recipes: List[RecipeRequest], projection: Optional[List[str]],
+                   deadline: Optional[float]) -> List[Dict]:
+    texts = [r.recipe_text for r in recipes]
+    goals = [r.goal for r in recipes]
+    
+    embeddings = embedding_service.embed(texts)
+    predictions = ml_pipeline.classify_embeddings(embeddings, goals)
+    
+    results = []
+    for request, embedding, (is_good, confidence) in zip(recipes, embeddings, predictions):
+        processing_steps = ["transformer_embedding", "deep_learning_classification"]
+        degraded = {}
+        try:
+            if deadline is not None and remaining_ms(deadline) <= 0:
+                recommendations = vector_db.cached_search(embedding, goal=request.goal, n_results=3,
+                                                          filters=request.filters)
+                degraded["semantic_search"] = "skipped" if recommendations is None else "cached"
+                recommendations = recommendations or []
+            else:
+                recommendations = vector_db.semantic_search(
+                    query_text=request.recipe_text,
+                    goal=request.goal,
+                    n_results=3,
+                    filters=request.filters,
+                    query_embedding=embedding,
+                    deadline_ms=remaining_ms(deadline)
+                )
+                processing_steps.append("semantic_search")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        results.append(project(
+            build_analysis(request.goal, is_good, confidence, recommendations, processing_steps,
+                           degraded=degraded),
+            projection
+        ))
+    return results
+
+def _analyze_job_chunk(items: List[Dict]) -> List[Dict]:
+    """
+    One chunk of a batch job: one transformer call + one forward pass.
+    Embeds through the pipeline directly so bulk jobs don't evict the
+    interactive embedding cache.
+    """
+    embeddings = ml_pipeline.get_embeddings([item["recipe_text"] for item in items])
+    predictions, version = ml_pipeline.classify_with_version(embeddings, [item["goal"] for item in items])
+    return [
+        {
+            "id": item.get("id"),
+            "goal": item["goal"],
+            "is_healthy": is_good,
+            "score": confidence,
+            "match_status": "MATCH" if is_good else "MISMATCH",
+            "classifier_version": version
+        }
+        for item, (is_good, confidence) in zip(items, predictions)
+    ]
+
+job_queue = JobQueue(JobStore(), {"analyze": _analyze_job_chunk})
+job_queue.start()
+
+@app.post("/jobs", status_code=202)
+async def submit_job(request: JobRequest):
+    """
+    BACKGROUND BATCH ANALYSIS
+    Queues an explicit batch or a re-score of the whole catalog; poll
+    /jobs/{id} for progress and page through /jobs/{id}/results
+    """
+    if request.goal is not None and request.goal not in ["lose_weight", "gain_weight"]:
+        raise HTTPException(status_code=400, detail="Goal must be 'lose_weight' or 'gain_weight'")
+    
+    items = []
+    for recipe in request.recipes or []:
+        validate_recipe_request(recipe)
+        items.append({"recipe_text": recipe.recipe_text, "goal": recipe.goal})
+    if request.rescore_catalog:
+        for record in await run_in_threadpool(vector_db.live_records):
+            goal = request.goal or record.get("goal")
+            if record.get("text") and goal in ["lose_weight", "gain_weight"]:
+                items.append({"id": record["id"], "recipe_text": record["text"], "goal": goal})
+    
+    if not items:
+        raise HTTPException(status_code=400, detail="Job has no recipes (pass recipes or rescore_catalog)")
+    if len(items) > MAX_JOB_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_JOB_ITEMS} recipes per job")
+    
+    job_id = await run_in_threadpool(job_queue.submit, "analyze", items, request.priority)
+    return {"job_id": job_id, "status": "queued", "total": len(items)}
+
+@app.get("/jobs")
+async def list_jobs(status: Optional[str] = None, limit: int = 50):
+    """Most recent jobs, optionally by status"""
+    if status is not None and status not in JOB_STATUSES:
+        raise HTTPException(status_code=400, detail=f"status must be one of {JOB_STATUSES}")
+    if not 1 <= limit <= 500:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 500")
+    jobs = await run_in_threadpool(job_queue.store.list, status, limit)
+    return {"jobs": jobs, "count": len(jobs)}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status and progress of one job"""
+    try:
+        return await run_in_threadpool(job_queue.store.get, job_id)
+    except JobNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+
+@app.get("/jobs/{job_id}/results")
+async def get_job_results(job_id: str, offset: int = 0, limit: int = 100):
+    """Results in input order; pass next_offset back as offset for the next page"""
+    if offset < 0 or not 1 <= limit <= 1000:
+        raise HTTPException(status_code=400, detail="offset must be >= 0 and limit between 1 and 1000")
+    try:
+        page = await run_in_threadpool(job_queue.store.results, job_id, offset, limit)
+    except JobNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return FastJSONResponse(page)
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Stop a queued or running job (chunks already in progress still finish)"""
+    try:
+        if not await run_in_threadpool(job_queue.store.cancel, job_id):
+            raise HTTPException(status_code=409, detail="Job already finished")
+    except JobNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return await run_in_threadpool(job_queue.store.get, job_id)
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
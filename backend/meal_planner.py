@@ -0,0 +1,337 @@
+"""
+MEAL PLANNER
+Picks a day or week of recipes that lands in a calorie window while
+maximizing protein, under prep-time and diversity constraints. Each day is a
+0/1 knapsack with an exact meal count, solved by a vectorized DP over
+discretized calories; the protein minimum and the total prep-time budget
+are handled by Lagrangian relaxation (a protein weight and a prep-time
+penalty, each tuned by bisection within the time limit).
+"""
+
+import threading
+import time
+import numpy as np
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from metadata_index import MetadataIndex
+
+
+# Daily defaults when the client gives no explicit targets
+GOAL_TARGETS = {
+    "lose_weight": {"calories": 1500.0, "protein_g": 100.0},
+    "gain_weight": {"calories": 2700.0, "protein_g": 140.0},
+}
+GOAL_MATCH_BONUS = 10.0   # score (grams of protein) for recipes tagged with the user's goal
+REPEAT_PENALTY = 15.0     # score lost per earlier use of a recipe in the same plan
+CALORIE_STEP = 10         # kcal per DP bucket
+EXACT_CHECKS = 8          # best window buckets re-checked against exact calorie totals
+MAX_DP_CELLS = 20_000_000  # items x (meals + 1) x calorie buckets per day; coarser buckets beyond that
+MAX_LAGRANGE_ITERATIONS = 12
+
+
+class MealPlanner:
+    """
+    Nutrition columns of the live catalog (a MetadataIndex over the records),
+    rebuilt lazily when the index version changes.
+
+    Per day, recipes above the calorie ceiling or the per-meal prep limit are
+    dropped, then only the best `meals` recipes of each calorie bucket are
+    kept (no plan can use more from one bucket), which bounds the DP at
+    buckets * meals items however large the catalog is.
+    """
+
+    def __init__(self, records_fn: Callable[[], Iterable[Dict[str, Any]]],
+                 version_fn: Callable[[], int]):
+        self.records_fn = records_fn
+        self.version_fn = version_fn
+        self._lock = threading.Lock()
+        self._version = None
+        self._records = []
+        self._index = None
+        self.metrics = {"plans": 0, "time_limited": 0, "rebuilds": 0}
+
+    def _columns(self):
+        """(records, metadata index) for the current catalog version"""
+        version = self.version_fn()
+        with self._lock:
+            if self._index is None or version != self._version:
+                self._records = [r for r in self.records_fn() if r.get("calories") is not None]
+                self._index = MetadataIndex(self._records)
+                self._version = version
+                self.metrics["rebuilds"] += 1
+            return self._records, self._index
+
+    # ------------------------------------------------------------------
+    # Day solver
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _prune(buckets: np.ndarray, score: np.ndarray, rows: np.ndarray, per_bucket: int) -> np.ndarray:
+        """Keep the `per_bucket` best-scoring rows of each calorie bucket"""
+        if not len(rows):
+            return rows
+        # One float sort: bucket in the integer part, descending score scaled into [0, 1)
+        values = score[rows]
+        spread = float(values.max() - values.min()) + 1.0
+        order = np.argsort(buckets[rows] + (values.max() - values) / spread * 0.999)
+        ordered = buckets[rows][order]
+        position = np.arange(len(ordered))
+        starts = np.r_[True, ordered[1:] != ordered[:-1]]
+        rank = position - np.maximum.accumulate(np.where(starts, position, 0))
+        return rows[order[rank < per_bucket]]
+
+    @staticmethod
+    def _knapsack(weights: np.ndarray, values: np.ndarray, meals: int, capacity: int):
+        """
+        Exactly `meals` distinct items, total bucket weight <= capacity.
+        best[j, c] = max value of j items weighing c; returns (best, take)
+        where take[i, j, c] marks states reached by taking item i.
+        """
+        best = np.full((meals + 1, capacity + 1), -np.inf)
+        best[0, 0] = 0.0
+        take = np.zeros((len(weights), meals + 1, capacity + 1), dtype=bool)
+        for item, (weight, value) in enumerate(zip(weights.tolist(), values.tolist())):
+            if weight > capacity:
+                continue
+            end = capacity + 1 - weight
+            for j in range(meals, 0, -1):
+                candidate = best[j - 1, :end] + value
+                improved = candidate > best[j, weight:]
+                if improved.any():
+                    best[j, weight:] = np.where(improved, candidate, best[j, weight:])
+                    take[item, j, weight:] = improved
+        return best, take
+
+    @staticmethod
+    def _backtrack(take: np.ndarray, weights: np.ndarray, meals: int, bucket: int) -> List[int]:
+        chosen, j = [], meals
+        for item in range(len(weights) - 1, -1, -1):
+            if j == 0:
+                break
+            if take[item, j, bucket]:
+                chosen.append(item)
+                j -= 1
+                bucket -= int(weights[item])
+        return chosen
+
+    def _solve_day(self, calories: np.ndarray, score: np.ndarray, rows: np.ndarray, meals: int,
+                   lo: float, hi: float, target: float) -> Optional[List[int]]:
+        """
+        Best row set for one day under a fixed per-recipe score (None if no
+        combination exists). Buckets are widened (doubling CALORIE_STEP) until
+        the DP table fits in MAX_DP_CELLS, so huge calorie targets cost
+        precision rather than memory.
+        """
+        step = CALORIE_STEP
+        while True:
+            buckets = np.rint(calories / step).astype(np.int64)
+            items = self._prune(buckets, score, rows, meals)
+            capacity = int(np.ceil(hi / step))
+            if len(items) * (meals + 1) * (capacity + 1) <= MAX_DP_CELLS:
+                break
+            step *= 2
+        if len(items) < meals:
+            return None
+
+        best, take = self._knapsack(buckets[items], score[items], meals, capacity)
+        reachable = np.flatnonzero(np.isfinite(best[meals]))
+        if not len(reachable):
+            return None
+
+        window = reachable[(reachable * step >= lo) & (reachable * step <= hi)]
+        if not len(window):
+            # Nothing inside the window: closest reachable total
+            bucket = int(reachable[np.argmin(np.abs(reachable * step - target))])
+            return [int(items[i]) for i in self._backtrack(take, buckets[items], meals, bucket)]
+
+        # Bucket totals are rounded; take the best plan whose exact total is in the window
+        fallback = None
+        for bucket in window[np.argsort(-best[meals, window], kind="stable")][:EXACT_CHECKS]:
+            chosen = [int(items[i]) for i in self._backtrack(take, buckets[items], meals, int(bucket))]
+            if lo <= calories[chosen].sum() <= hi:
+                return chosen
+            fallback = fallback or chosen
+        return fallback
+
+    @staticmethod
+    def _bisect(solve: Callable[[float], Optional[List[int]]], ok: Callable[[List[int]], bool],
+                start: List[int], hint: float, deadline: float):
+        """
+        Smallest Lagrange multiplier whose plan satisfies `ok`: doubled from
+        `hint` until feasible, then bisected. Returns
+        (feasible plan or None, multiplier, time_limited)
+        """
+        feasible, previous, low, high, unchanged = None, start, 0.0, hint, 0
+        for _ in range(MAX_LAGRANGE_ITERATIONS):
+            if time.perf_counter() > deadline:
+                return feasible, high, True
+            multiplier = high if feasible is None else (low + high) / 2
+            attempt = solve(multiplier)
+            if attempt is not None and ok(attempt):
+                feasible, high = attempt, multiplier
+            elif feasible is None:
+                unchanged = unchanged + 1 if attempt == previous else 0
+                if unchanged == 2:
+                    break  # two doublings left the plan as it was: constraint unreachable
+                previous, low, high = attempt, high, high * 2
+            else:
+                low = multiplier
+        return feasible, high, False
+
+    # ------------------------------------------------------------------
+    # Plans
+    # ------------------------------------------------------------------
+
+    def plan(self, goal: str, days: int = 1, meals_per_day: int = 3,
+             calories_target: Optional[float] = None, calorie_tolerance: float = 100.0,
+             protein_min: Optional[float] = None, max_prep_time: Optional[float] = None,
+             max_total_prep_time: Optional[float] = None, max_repeats: int = 2,
+             filters: Optional[Dict[str, Dict[str, Any]]] = None,
+             time_limit_ms: float = 500.0) -> Dict[str, Any]:
+        """
+        Day-by-day plan. Every day gets at least one DP pass; protein and
+        prep-time refinement stops at the time limit and keeps the best plan
+        so far. protein_min defaults to the goal's daily protein target.
+        """
+        if goal not in GOAL_TARGETS:
+            raise ValueError(f"Goal must be one of {list(GOAL_TARGETS)}")
+        started = time.perf_counter()
+        deadline = started + time_limit_ms / 1000.0
+
+        records, index = self._columns()
+        target = float(calories_target if calories_target is not None else GOAL_TARGETS[goal]["calories"])
+        protein_target = float(protein_min if protein_min is not None else GOAL_TARGETS[goal]["protein_g"])
+        if not (np.isfinite(target) and np.isfinite(calorie_tolerance)):
+            raise ValueError("calories_target and calorie_tolerance must be finite")
+        lo, hi = max(0.0, target - calorie_tolerance), target + calorie_tolerance
+
+        # Missing or non-positive calories would become zero/negative knapsack weights
+        calories = np.nan_to_num(index.columns["calories"], nan=0.0, posinf=0.0, neginf=0.0)
+        protein = np.nan_to_num(index.columns["protein_g"])
+        prep = np.nan_to_num(index.columns["prep_time"])
+        eligible = index.query(filters or {}) & (calories > 0) & (calories <= hi)
+        if max_prep_time is not None:
+            eligible &= prep <= max_prep_time
+        score = protein + GOAL_MATCH_BONUS * index.bitmaps["goal"].get(goal, np.zeros(len(records), dtype=bool))
+
+        def protein_ok(chosen: List[int]) -> bool:
+            return protein[chosen].sum() >= protein_target
+
+        def prep_ok(chosen: List[int]) -> bool:
+            return max_total_prep_time is None or prep[chosen].sum() <= max_total_prep_time
+
+        uses = np.zeros(len(records), dtype=np.int32)
+        plan_days, time_limited, solves = [], False, 0
+        protein_hint, penalty_hint = 1.0, 1.0
+        for day in range(days):
+            rows = np.flatnonzero(eligible & (uses < max_repeats))
+            day_score = score - REPEAT_PENALTY * uses
+
+            def solve(protein_weight: float, prep_penalty: float) -> Optional[List[int]]:
+                nonlocal solves
+                solves += 1
+                return self._solve_day(calories, day_score + protein_weight * protein - prep_penalty * prep,
+                                       rows, meals_per_day, lo, hi, target)
+
+            def with_protein(chosen: Optional[List[int]], prep_penalty: float, hint: float):
+                """Raise the protein weight (against goal match, variety and prep) until the minimum is met"""
+                if chosen is None or protein_ok(chosen):
+                    return chosen, 0.0, False
+                found, weight, limited = self._bisect(lambda w: solve(w, prep_penalty), protein_ok,
+                                                      chosen, hint, day_deadline)
+                return (found, weight, limited) if found is not None else (chosen, 0.0, limited)
+
+            # Multipliers start from the previous day's values, with an even share of the remaining time
+            now = time.perf_counter()
+            day_deadline = now + (deadline - now) / (days - day)
+            chosen, protein_weight, limited = with_protein(solve(0.0, 0.0), 0.0, protein_hint)
+            time_limited = time_limited or limited
+            protein_hint = protein_weight or protein_hint
+            if chosen is not None and not prep_ok(chosen):
+                # Penalize prep minutes until the day fits the budget; when the protein minimum
+                # was reachable, the protein weight is re-tuned at every penalty tried
+                keep_protein = protein_ok(chosen)
+
+                def solve_prep(penalty: float) -> Optional[List[int]]:
+                    attempt = solve(protein_weight, penalty)
+                    if keep_protein:
+                        attempt = with_protein(attempt, penalty, max(protein_weight, 1.0))[0]
+                    return attempt
+
+                found, penalty, limited = self._bisect(
+                    solve_prep, lambda c: prep_ok(c) and (protein_ok(c) or not keep_protein),
+                    chosen, penalty_hint, day_deadline
+                )
+                time_limited = time_limited or limited
+                if found is not None:
+                    chosen, penalty_hint = found, penalty
+
+            if chosen is None:
+                plan_days.append({"day": day + 1, "meals": [], "totals": None, "constraints_met": None})
+                continue
+
+            uses[chosen] += 1
+            plan_days.append(self._day_report(day + 1, records, chosen, calories, protein, prep,
+                                              lo, hi, protein_target, max_total_prep_time))
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.metrics["plans"] += 1
+        self.metrics["time_limited"] += int(time_limited)
+        return {
+            "goal": goal,
+            "days": plan_days,
+            "targets": {
+                "calories": [round(lo, 1), round(hi, 1)],
+                "protein_g_min": protein_target,
+                "max_prep_time": max_prep_time,
+                "max_total_prep_time": max_total_prep_time,
+                "meals_per_day": meals_per_day,
+                "max_repeats": max_repeats
+            },
+            "solver": {
+                "method": "knapsack_dp",
+                "catalog_recipes": len(records),
+                "eligible_recipes": int(eligible.sum()),
+                "lagrange_iterations": solves - days,
+                "time_limited": time_limited,
+                "elapsed_ms": round(elapsed_ms, 2)
+            }
+        }
+
+    @staticmethod
+    def _day_report(day: int, records: List[Dict[str, Any]], chosen: List[int], calories: np.ndarray,
+                    protein: np.ndarray, prep: np.ndarray, lo: float, hi: float,
+                    protein_target: float, max_total_prep_time: Optional[float]) -> Dict[str, Any]:
+        chosen = sorted(chosen, key=lambda row: calories[row])
+        totals = {
+            "calories": round(float(calories[chosen].sum()), 1),
+            "protein_g": round(float(protein[chosen].sum()), 1),
+            "prep_time": round(float(prep[chosen].sum()), 1)
+        }
+        return {
+            "day": day,
+            "meals": [
+                {
+                    "id": records[row]["id"],
+                    "title": records[row].get("title"),
+                    "calories": records[row].get("calories"),
+                    "protein_g": records[row].get("protein_g"),
+                    "prep_time": records[row].get("prep_time")
+                }
+                for row in chosen
+            ],
+            "totals": totals,
+            "constraints_met": {
+                "calories": lo <= totals["calories"] <= hi,
+                "protein": totals["protein_g"] >= protein_target,
+                "prep_time": max_total_prep_time is None or totals["prep_time"] <= max_total_prep_time
+            }
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.metrics, "catalog_recipes": len(self._records), "version": self._version}
+
+    def nbytes(self) -> int:
+        with self._lock:
+            return self._index.nbytes() if self._index is not None else 0
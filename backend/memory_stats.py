@@ -0,0 +1,189 @@
+"""
+MEMORY ACCOUNTING AND LEAK DETECTION
+Process RSS, per-component footprint estimates and tracemalloc snapshot diffs
+"""
+
+import itertools
+import os
+import sys
+import threading
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+
+# name -> callable returning a dict of byte counts (and any extra info) for that component
+_REPORTERS = {}
+
+
+def register_component(name: str, reporter: Callable[[], Dict[str, Any]]):
+    """Register a component (model, index, cache...) to be included in memory reports"""
+    _REPORTERS[name] = reporter
+
+
+def process_memory() -> Dict[str, Optional[int]]:
+    """Resident set size now and at peak, in bytes (Linux /proc, rusage fallback)"""
+    info = {"rss_bytes": None, "peak_rss_bytes": None, "cgroup_limit_bytes": None}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    info["rss_bytes"] = int(line.split()[1]) * 1024
+                elif line.startswith("VmHWM:"):
+                    info["peak_rss_bytes"] = int(line.split()[1]) * 1024
+    except OSError:
+        import resource
+        info["peak_rss_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    for path in ["/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"]:
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+            if value.isdigit():
+                info["cgroup_limit_bytes"] = int(value)
+            break
+        except OSError:
+            continue
+    return info
+
+
+def module_parameter_bytes(module) -> int:
+    """Bytes held by a torch module's parameters and buffers"""
+    total = 0
+    for tensor in list(module.parameters()) + list(module.buffers()):
+        total += tensor.numel() * tensor.element_size()
+    return total
+
+
+def approx_container_bytes(obj, sample: int = 200) -> int:
+    """
+    Rough deep size of a dict/list/set of small objects: shallow size plus
+    the average size of a sample of entries times the entry count.
+    Only the sampled entries are touched, so probing a large container is cheap
+    """
+    total = sys.getsizeof(obj)
+    try:
+        entries = iter(obj.items()) if isinstance(obj, dict) else iter(obj)
+        items = list(itertools.islice(entries, sample))
+    except (TypeError, RuntimeError):  # not iterable, or resized by another thread mid-sample
+        return total
+    if not items:
+        return total
+    sampled = 0
+    for item in items:
+        parts = item if isinstance(item, tuple) else (item,)
+        for part in parts:
+            sampled += sys.getsizeof(part)
+            if isinstance(part, (list, tuple, set)):
+                sampled += sum(sys.getsizeof(x) for x in itertools.islice(part, 20))
+    return total + sampled * len(obj) // len(items)
+
+
+def component_report() -> Dict[str, Dict[str, Any]]:
+    """Run every registered reporter; failures are reported, not raised"""
+    report = {}
+    for name, reporter in _REPORTERS.items():
+        try:
+            report[name] = reporter()
+        except Exception as e:
+            report[name] = {"error": str(e)}
+    return report
+
+
+def memory_summary() -> Dict[str, Any]:
+    """
+    RSS plus the sum of estimated component heap bytes (folded into /stats);
+    file-backed mapped bytes are listed per component but not summed
+    """
+    components = component_report()
+    estimated = 0
+    for values in components.values():
+        estimated += sum(v for k, v in values.items() if k.endswith("_bytes") and isinstance(v, int)
+                         and "mapped" not in k)
+    return {**process_memory(), "estimated_component_bytes": estimated, "components": components}
+
+
+class TracemallocTracker:
+    """
+    Named tracemalloc snapshots that can be diffed, e.g. take "before",
+    send 1000 /analyze requests, take "after", diff by source line
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.snapshots = {}
+
+    def start(self, frames: int = 10) -> Dict[str, Any]:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        return self.status()
+
+    def stop(self) -> Dict[str, Any]:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        with self._lock:
+            self.snapshots.clear()
+        return self.status()
+
+    def status(self) -> Dict[str, Any]:
+        traced, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "traceback_frames": tracemalloc.get_traceback_limit() if tracemalloc.is_tracing() else 0,
+            "traced_bytes": traced,
+            "traced_peak_bytes": peak,
+            "overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+            "snapshots": sorted(self.snapshots.keys())
+        }
+
+    def _capture(self) -> tracemalloc.Snapshot:
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running; start it first")
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ])
+
+    def take(self, label: str) -> Dict[str, Any]:
+        """Store a snapshot under `label` (replacing any previous one)"""
+        snapshot = self._capture()
+        with self._lock:
+            self.snapshots[label] = snapshot
+        return {"label": label, "traced_bytes": sum(s.size for s in snapshot.statistics("filename"))}
+
+    def diff(self, before: str, after: Optional[str] = None, limit: int = 20,
+             group_by: str = "lineno", path_filter: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Top allocation growth between two snapshots (after defaults to now),
+        grouped by "lineno", "filename" or "traceback"
+        """
+        with self._lock:
+            if before not in self.snapshots:
+                raise KeyError(f"No snapshot named '{before}'")
+            old = self.snapshots[before]
+            new = self.snapshots.get(after) if after else None
+        if after and new is None:
+            raise KeyError(f"No snapshot named '{after}'")
+        if new is None:
+            new = self._capture()
+
+        if path_filter:
+            keep = [tracemalloc.Filter(True, f"*{path_filter}*")]
+            old, new = old.filter_traces(keep), new.filter_traces(keep)
+
+        results = []
+        for stat in new.compare_to(old, group_by)[:limit]:
+            frame = stat.traceback[0]
+            entry = {
+                "file": os.path.relpath(frame.filename) if not frame.filename.startswith("<") else frame.filename,
+                "line": frame.lineno,
+                "size_diff_bytes": stat.size_diff,
+                "size_bytes": stat.size,
+                "count_diff": stat.count_diff,
+            }
+            if group_by == "traceback":
+                entry["traceback"] = stat.traceback.format()
+            results.append(entry)
+        return results
+
+
+tracker = TracemallocTracker()
@@ -0,0 +1,231 @@
+"""
+COLUMNAR NUTRITION METADATA INDEX
+Fast range filtering over recipe nutrition fields (calories, protein, prep time...)
+"""
+
+import math
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple
+
+
+NUMERIC_FIELDS = ["calories", "protein_g", "carbs_g", "fats_g", "prep_time"]
+CATEGORICAL_FIELDS = ["goal", "difficulty"]
+
+RANGE_OPERATORS = ["lt", "lte", "gt", "gte", "eq"]
+CATEGORY_TYPES = (str, int, float)
+
+
+def _numeric_operand(field: str, value: Any) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"Filter value for '{field}' must be numeric")
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f"Filter value for '{field}' must be numeric")
+    if math.isnan(number):
+        raise ValueError(f"Filter value for '{field}' must be numeric")
+    return number
+
+
+def _category_operand(field: str, value: Any) -> Any:
+    if isinstance(value, bool) or not isinstance(value, CATEGORY_TYPES):
+        raise ValueError(f"Filter value for '{field}' must be a string or number")
+    return value
+
+
+def parse_filters(filters: Optional[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Validate a filter spec such as
+    {"calories": {"lt": 400}, "protein_g": {"gt": 30}, "difficulty": {"in": ["easy"]}}
+    A bare value is shorthand for {"eq": value}. Returns a normalized copy
+    (numeric operands as floats, 'in' values as lists) so every evaluation
+    path compares like with like. Raises ValueError on bad input.
+    """
+    if filters is not None and not isinstance(filters, dict):
+        raise ValueError("Filters must be an object mapping fields to conditions")
+
+    parsed = {}
+    for field, condition in (filters or {}).items():
+        if not isinstance(condition, dict):
+            condition = {"eq": condition}
+
+        normalized = {}
+        if field in NUMERIC_FIELDS:
+            for op, value in condition.items():
+                if op not in RANGE_OPERATORS:
+                    raise ValueError(f"Unsupported operator '{op}' for field '{field}'")
+                normalized[op] = _numeric_operand(field, value)
+        elif field in CATEGORICAL_FIELDS:
+            for op, value in condition.items():
+                if op == "eq":
+                    normalized[op] = _category_operand(field, value)
+                elif op == "in":
+                    if not isinstance(value, (list, tuple)):
+                        raise ValueError(f"'in' filter for '{field}' must be a list")
+                    normalized[op] = [_category_operand(field, v) for v in value]
+                else:
+                    raise ValueError(f"Unsupported operator '{op}' for field '{field}'")
+        else:
+            raise ValueError(f"Unknown filter field '{field}'")
+
+        parsed[field] = normalized
+    return parsed
+
+
+def matches(record: Dict[str, Any], filters: Dict[str, Dict[str, Any]]) -> bool:
+    """Evaluate a parsed filter spec against a single recipe record (row-wise path)"""
+    for field, condition in filters.items():
+        value = record.get(field)
+        if value is None:
+            return False
+
+        for op, target in condition.items():
+            if op == "lt" and not value < target:
+                return False
+            if op == "lte" and not value <= target:
+                return False
+            if op == "gt" and not value > target:
+                return False
+            if op == "gte" and not value >= target:
+                return False
+            if op == "eq" and not value == target:
+                return False
+            if op == "in" and value not in target:
+                return False
+    return True
+
+
+class MetadataIndex:
+    """
+    Columnar index over recipe metadata.
+    - numeric fields: values sorted once with their row order, so a range
+      predicate is two binary searches plus one slice
+    - categorical fields: one boolean bitmap per distinct value
+    Predicates produce boolean row bitmaps that are AND-ed together.
+    """
+
+    def __init__(self, records: List[Dict[str, Any]]):
+        self.size = len(records)
+
+        self.columns = {}
+        self.sorted_values = {}
+        self.sorted_rows = {}
+        for field in NUMERIC_FIELDS:
+            column = np.array(
+                [float(r.get(field)) if r.get(field) is not None else np.nan for r in records],
+                dtype=np.float64
+            )
+            order = np.argsort(column, kind="stable")
+            self.columns[field] = column
+            self.sorted_rows[field] = order
+            self.sorted_values[field] = column[order]
+
+        self.bitmaps = {}
+        for field in CATEGORICAL_FIELDS:
+            field_bitmaps = {}
+            for row, record in enumerate(records):
+                value = record.get(field)
+                if value is None:
+                    continue
+                if value not in field_bitmaps:
+                    field_bitmaps[value] = np.zeros(self.size, dtype=bool)
+                field_bitmaps[value][row] = True
+            self.bitmaps[field] = field_bitmaps
+
+    @classmethod
+    def from_columns(cls, size: int, columns: Dict[str, np.ndarray], sorted_rows: Dict[str, np.ndarray],
+                     categories: Dict[str, Tuple[np.ndarray, List[Any]]],
+                     sorted_values: Optional[Dict[str, np.ndarray]] = None) -> "MetadataIndex":
+        """
+        Rebuild from precomputed arrays (e.g. memory-mapped from a snapshot)
+        without re-sorting; categories map field -> (int codes, values), -1 = missing
+        """
+        index = cls.__new__(cls)
+        index.size = size
+        index.columns = dict(columns)
+        index.sorted_rows = dict(sorted_rows)
+        if sorted_values is None:
+            sorted_values = {field: columns[field][sorted_rows[field]] for field in columns}
+        index.sorted_values = dict(sorted_values)
+        index.bitmaps = {}
+        for field, (codes, values) in categories.items():
+            index.bitmaps[field] = {value: codes == code for code, value in enumerate(values)}
+        return index
+
+    def export_columns(self) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray],
+                                      Dict[str, Tuple[np.ndarray, List[Any]]]]:
+        """Arrays needed by from_columns: numeric columns, sort orders, categorical codes
+        (sorted values are available as self.sorted_values)"""
+        categories = {}
+        for field, field_bitmaps in self.bitmaps.items():
+            codes = np.full(self.size, -1, dtype=np.int32)
+            values = list(field_bitmaps.keys())
+            for code, value in enumerate(values):
+                codes[field_bitmaps[value]] = code
+            categories[field] = (codes, values)
+        return self.columns, self.sorted_rows, categories
+
+    def _range_bitmap(self, field: str, condition: Dict[str, Any]) -> np.ndarray:
+        """Rows whose value lies within the range, via binary search on the sorted column"""
+        values = self.sorted_values[field]
+        # NaNs sort last; keep them out of every range
+        lo, hi = 0, int(np.searchsorted(values, np.nan, side="left"))
+
+        for op, target in condition.items():
+            target = float(target)
+            if op == "gt":
+                lo = max(lo, int(np.searchsorted(values, target, side="right")))
+            elif op == "gte":
+                lo = max(lo, int(np.searchsorted(values, target, side="left")))
+            elif op == "lt":
+                hi = min(hi, int(np.searchsorted(values, target, side="left")))
+            elif op == "lte":
+                hi = min(hi, int(np.searchsorted(values, target, side="right")))
+            elif op == "eq":
+                lo = max(lo, int(np.searchsorted(values, target, side="left")))
+                hi = min(hi, int(np.searchsorted(values, target, side="right")))
+
+        bitmap = np.zeros(self.size, dtype=bool)
+        if lo < hi:
+            bitmap[self.sorted_rows[field][lo:hi]] = True
+        return bitmap
+
+    def _category_bitmap(self, field: str, condition: Dict[str, Any]) -> np.ndarray:
+        """Union of the per-value bitmaps for a categorical predicate"""
+        wanted = []
+        for op, target in condition.items():
+            wanted.extend(target if op == "in" else [target])
+
+        bitmap = np.zeros(self.size, dtype=bool)
+        for value in wanted:
+            value_bitmap = self.bitmaps[field].get(value)
+            if value_bitmap is not None:
+                bitmap |= value_bitmap
+        return bitmap
+
+    def query(self, filters: Dict[str, Dict[str, Any]]) -> np.ndarray:
+        """Boolean candidate bitmap for a parsed filter spec (all rows if no filters)"""
+        bitmap = np.ones(self.size, dtype=bool)
+        for field, condition in filters.items():
+            if field in NUMERIC_FIELDS:
+                bitmap &= self._range_bitmap(field, condition)
+            else:
+                bitmap &= self._category_bitmap(field, condition)
+            if not bitmap.any():
+                break
+        return bitmap
+
+    def candidates(self, filters: Dict[str, Dict[str, Any]]) -> np.ndarray:
+        """Row numbers matching the filter spec"""
+        return np.flatnonzero(self.query(filters))
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the index arrays"""
+        total = 0
+        for field in NUMERIC_FIELDS:
+            total += self.columns[field].nbytes
+            total += self.sorted_values[field].nbytes
+            total += self.sorted_rows[field].nbytes
+        for field_bitmaps in self.bitmaps.values():
+            total += sum(b.nbytes for b in field_bitmaps.values())
+        return total
@@ -7,9 +7,13 @@ import torch
 import torch.nn as nn
 import numpy as np
 from sentence_transformers import SentenceTransformer
-from typing import Tuple
+from typing import Tuple, List, Optional
+import hashlib
 import os
+import threading
+import time
 
+from memory_stats import module_parameter_bytes
 
 try:
     from database import VectorDatabase
@@ -18,6 +22,11 @@ except ImportError:
     VECTOR_DB_AVAILABLE = False
     print("⚠️  Vector database module not available, using mock mode")
 
+
+CLASSIFIER_PATH = os.getenv("RECIPE_CLASSIFIER_PATH", "data/classifier.pt")
+# Hot reloads only load checkpoints from under this directory
+MODEL_DIR = os.getenv("RECIPE_MODEL_DIR", os.path.dirname(CLASSIFIER_PATH) or ".")
+
 class NeuralRecipeClassifier(nn.Module):
     """
     DEEP NEURAL NETWORK CLASSIFIER
@@ -46,6 +55,34 @@ class NeuralRecipeClassifier(nn.Module):
         return self.network(x)
 
 
+def load_classifier(path: str) -> Tuple[NeuralRecipeClassifier, str]:
+    """
+    Load a checkpoint (a state_dict, or {"state_dict", "hidden_dims", "version"})
+    and warm it up with one forward pass. The version defaults to a hash of
+    the file, so re-saving identical weights keeps the same version.
+    """
+    with open(path, "rb") as f:
+        digest = hashlib.blake2b(f.read(), digest_size=6).hexdigest()
+    # weights_only: tensors and plain containers, never arbitrary pickled objects
+    checkpoint = torch.load(path, map_location="cpu", weights_only=True)
+    if "state_dict" in checkpoint:
+        state_dict = checkpoint["state_dict"]
+        hidden_dims = checkpoint.get("hidden_dims", [256, 128, 64])
+        version = str(checkpoint.get("version") or digest)
+    else:
+        state_dict, hidden_dims, version = checkpoint, [256, 128, 64], digest
+    
+    classifier = NeuralRecipeClassifier(hidden_dims=list(hidden_dims))
+    classifier.load_state_dict(state_dict)
+    classifier.eval()
+    
+    with torch.no_grad():
+        output = classifier(torch.zeros(2, 384))
+    if output.shape != (2, 2) or not torch.isfinite(output).all():
+        raise ValueError(f"Checkpoint {path} produced an invalid warm-up output")
+    return classifier, version
+
+
 class RecipeMLPipeline:
     """
     COMPLETE ML PIPELINE WITH TRANSFORMER EMBEDDINGS
@@ -60,7 +97,10 @@ class RecipeMLPipeline:
         print("   ✅ Loaded Sentence-BERT Transformer (384-dim embeddings)")
         
         
-        self.classifier = NeuralRecipeClassifier()
+        # (classifier, version) swapped as one reference: a request that read the
+        # pair keeps using it even if a reload lands mid-request
+        self._active = (NeuralRecipeClassifier(), "untrained")
+        self._reload_lock = threading.Lock()
         print("   ✅ Initialized Deep Neural Network (384→256→128→64→2)")
         
         
@@ -76,10 +116,41 @@ class RecipeMLPipeline:
         
         print("   ✅ ML Pipeline Ready for Inference")
     
+    @property
+    def classifier(self) -> NeuralRecipeClassifier:
+        return self._active[0]
+    
+    @property
+    def classifier_version(self) -> str:
+        return self._active[1]
+    
     def _load_weights(self):
-        """Simulate loading trained weights"""
-        
-        pass
+        """Load trained weights when a checkpoint is present (otherwise keep the fresh network)"""
+        if os.path.exists(CLASSIFIER_PATH):
+            try:
+                self.reload_classifier(CLASSIFIER_PATH)
+                print(f"   ✅ Loaded classifier checkpoint {self.classifier_version}")
+            except Exception as e:
+                print(f"   ⚠️  Could not load classifier checkpoint: {e}")
+    
+    def reload_classifier(self, path: Optional[str] = None) -> dict:
+        """
+        HOT RELOAD
+        Load + warm up a checkpoint off to the side, then swap it in atomically.
+        A bad checkpoint raises and leaves the current classifier serving.
+        """
+        path = path or CLASSIFIER_PATH
+        with self._reload_lock:
+            started = time.perf_counter()
+            classifier, version = load_classifier(path)
+            previous = self.classifier_version
+            self._active = (classifier, version)
+        return {
+            "previous_version": previous,
+            "version": version,
+            "path": path,
+            "load_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
     
     def get_embedding(self, text: str) -> np.ndarray:
         """
@@ -88,6 +159,13 @@ class RecipeMLPipeline:
         """
         return self.embedder.encode(text)
     
+    def get_embeddings(self, texts: List[str]) -> np.ndarray:
+        """
+        BATCH TRANSFORMER EMBEDDINGS
+        One encoder call for many texts (used to index the recipe catalog)
+        """
+        return self.embedder.encode(texts, batch_size=32)
+    
     def predict(self, recipe_text: str, goal: str) -> Tuple[bool, float]:
         """
         COMPLETE DEEP LEARNING INFERENCE PIPELINE
@@ -100,9 +178,9 @@ class RecipeMLPipeline:
     
         tensor = torch.tensor(embedding).float().unsqueeze(0)
         
-        
+        classifier, _ = self._active
         with torch.no_grad():
-            output = self.classifier(tensor)
+            output = classifier(tensor)
         
         
         if goal == "lose_weight":
@@ -114,6 +192,47 @@ class RecipeMLPipeline:
         
         return is_good, round(confidence, 3)
     
+    def classify_embeddings(self, embeddings: np.ndarray, goals: List[str]) -> List[Tuple[bool, float]]:
+        """
+        BATCHED NEURAL NETWORK CLASSIFICATION
+        One forward pass for a stack of precomputed transformer embeddings
+        """
+        return self.classify_with_version(embeddings, goals)[0]
+    
+    def classify_with_version(self, embeddings: np.ndarray, goals: List[str]) -> Tuple[List[Tuple[bool, float]], str]:
+        """classify_embeddings plus the version of the classifier that produced the scores"""
+        classifier, version = self._active
+        tensor = torch.as_tensor(np.asarray(embeddings, dtype=np.float32)).reshape(len(goals), -1)
+        
+        with torch.no_grad():
+            output = classifier(tensor)
+        
+        results = []
+        for row, goal in enumerate(goals):
+            column = 0 if goal == "lose_weight" else 1
+            confidence = output[row][column].item()
+            results.append((confidence > 0.5, round(confidence, 3)))
+        return results, version
+    
+    def predict_from_embedding(self, embedding: np.ndarray, goal: str) -> Tuple[bool, float]:
+        """Classification only, for callers that already hold the embedding"""
+        return self.classify_embeddings(embedding, [goal])[0]
+    
+    def predict_batch(self, recipe_texts: List[str], goals: List[str]) -> List[Tuple[bool, float]]:
+        """
+        BATCHED INFERENCE PIPELINE
+        One encoder call + one forward pass for many recipes
+        """
+        embeddings = self.get_embeddings(recipe_texts)
+        return self.classify_embeddings(embeddings, goals)
+    
+    def memory_footprint(self) -> dict:
+        """Parameter/buffer bytes of the transformer and the classifier"""
+        return {
+            "transformer_bytes": module_parameter_bytes(self.embedder),
+            "classifier_bytes": module_parameter_bytes(self.classifier)
+        }
+    
     def semantic_search(self, query_text: str, goal: str = None, n_results: int = 3):
         """
         PERFORM SEMANTIC SEARCH USING VECTOR DATABASE
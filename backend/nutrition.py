@@ -0,0 +1,339 @@
+"""
+INGREDIENT-QUANTITY NUTRITION ENGINE
+Parses (quantity, unit, ingredient) mentions, converts them to grams with a
+unit table and computes macro totals for a batch of recipes with one matmul
+"""
+
+import re
+import numpy as np
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# ----------------------------------------------------------------------
+# Ingredient table
+#   name: (kcal, protein_g, carbs_g, fat_g per 100 g,
+#          density g/ml, grams per piece, grams in an unquantified mention)
+# ----------------------------------------------------------------------
+
+INGREDIENTS = {
+    # Protein
+    "chicken breast": (165, 31.0, 0.0, 3.6, 1.0, 170, 150),
+    "chicken thigh": (209, 26.0, 0.0, 10.9, 1.0, 110, 150),
+    "chicken": (190, 29.0, 0.0, 7.5, 1.0, 150, 150),
+    "turkey": (135, 30.0, 0.0, 1.0, 1.0, 120, 120),
+    "ground beef": (250, 26.0, 0.0, 15.0, 1.0, 110, 150),
+    "beef": (250, 26.0, 0.0, 15.0, 1.0, 150, 150),
+    "steak": (271, 25.0, 0.0, 19.0, 1.0, 225, 200),
+    "pork": (242, 27.0, 0.0, 14.0, 1.0, 150, 150),
+    "salmon": (208, 20.0, 0.0, 13.0, 1.0, 150, 150),
+    "tuna": (132, 28.0, 0.0, 1.0, 1.0, 140, 120),
+    "fish": (82, 18.0, 0.0, 0.7, 1.0, 150, 150),
+    "shrimp": (99, 24.0, 0.2, 0.3, 1.0, 12, 120),
+    "egg": (143, 12.6, 0.7, 9.5, 1.03, 50, 100),
+    "egg white": (52, 11.0, 0.7, 0.2, 1.03, 33, 100),
+    "tofu": (76, 8.0, 1.9, 4.8, 1.0, 120, 150),
+    "tempeh": (192, 20.0, 7.6, 11.0, 1.0, 100, 100),
+    "protein powder": (400, 80.0, 8.0, 6.0, 0.4, 30, 30),
+    # Legumes and grains (cooked unless noted)
+    "lentil": (116, 9.0, 20.0, 0.4, 0.85, 200, 150),
+    "bean": (132, 8.9, 23.7, 0.5, 0.75, 170, 130),
+    "black bean": (132, 8.9, 23.7, 0.5, 0.75, 170, 130),
+    "chickpea": (164, 8.9, 27.0, 2.6, 0.68, 165, 130),
+    "rice": (130, 2.7, 28.0, 0.3, 0.8, 160, 180),
+    "brown rice": (123, 2.7, 25.6, 1.0, 0.8, 160, 150),
+    "quinoa": (120, 4.4, 21.3, 1.9, 0.78, 185, 150),
+    "pasta": (158, 5.8, 31.0, 0.9, 0.6, 140, 200),
+    "oat": (389, 16.9, 66.0, 6.9, 0.34, 40, 50),
+    "oatmeal": (389, 16.9, 66.0, 6.9, 0.34, 40, 50),
+    "bread": (265, 9.0, 49.0, 3.2, 0.25, 30, 60),
+    "tortilla": (310, 8.0, 52.0, 8.0, 1.0, 45, 45),
+    "flour": (364, 10.0, 76.0, 1.0, 0.53, 125, 30),
+    "potato": (77, 2.0, 17.0, 0.1, 0.65, 170, 200),
+    "sweet potato": (86, 1.6, 20.0, 0.1, 0.65, 130, 150),
+    # Vegetables
+    "broccoli": (34, 2.8, 7.0, 0.4, 0.38, 150, 90),
+    "spinach": (23, 2.9, 3.6, 0.4, 0.13, 30, 60),
+    "kale": (49, 4.3, 9.0, 0.9, 0.28, 30, 60),
+    "lettuce": (15, 1.4, 2.9, 0.2, 0.2, 300, 60),
+    "mixed green": (15, 1.4, 2.9, 0.2, 0.2, 30, 60),
+    "cabbage": (25, 1.3, 6.0, 0.1, 0.38, 900, 90),
+    "cauliflower": (25, 1.9, 5.0, 0.3, 0.45, 575, 100),
+    "zucchini": (17, 1.2, 3.1, 0.3, 0.52, 200, 100),
+    "cucumber": (15, 0.7, 3.6, 0.1, 0.55, 300, 60),
+    "tomato": (18, 0.9, 3.9, 0.2, 0.75, 120, 80),
+    "cherry tomato": (18, 0.9, 3.9, 0.2, 0.63, 17, 80),
+    "carrot": (41, 0.9, 10.0, 0.2, 0.54, 60, 60),
+    "bell pepper": (31, 1.0, 6.0, 0.3, 0.5, 120, 80),
+    "onion": (40, 1.1, 9.3, 0.1, 0.67, 110, 40),
+    "red onion": (40, 1.1, 9.3, 0.1, 0.67, 110, 40),
+    "garlic": (149, 6.4, 33.0, 0.5, 0.57, 3, 6),
+    "mushroom": (22, 3.1, 3.3, 0.3, 0.3, 18, 70),
+    "celery": (14, 0.7, 3.0, 0.2, 0.5, 40, 40),
+    "pea": (81, 5.4, 14.5, 0.4, 0.6, 145, 80),
+    "snow pea": (42, 2.8, 7.6, 0.2, 0.4, 4, 60),
+    "green bean": (31, 1.8, 7.0, 0.2, 0.46, 5, 80),
+    "asparagus": (20, 2.2, 3.9, 0.1, 0.56, 16, 80),
+    # Fruit
+    "avocado": (160, 2.0, 8.5, 14.7, 0.61, 150, 75),
+    "banana": (89, 1.1, 22.8, 0.3, 0.63, 118, 118),
+    "apple": (52, 0.3, 14.0, 0.2, 0.53, 180, 180),
+    "berry": (57, 0.7, 14.5, 0.3, 0.6, 2, 75),
+    "lemon": (29, 1.1, 9.3, 0.3, 1.03, 60, 15),
+    # Dairy and fats
+    "milk": (42, 3.4, 5.0, 1.0, 1.03, 245, 245),
+    "whole milk": (61, 3.2, 4.8, 3.3, 1.03, 245, 245),
+    "greek yogurt": (97, 9.0, 3.6, 5.0, 1.03, 170, 170),
+    "yogurt": (61, 3.5, 4.7, 3.3, 1.03, 170, 170),
+    "cheese": (402, 25.0, 1.3, 33.0, 0.45, 28, 30),
+    "parmesan": (431, 38.0, 4.0, 29.0, 0.4, 5, 10),
+    "feta": (264, 14.0, 4.0, 21.0, 0.6, 28, 30),
+    "cream": (340, 2.8, 2.8, 36.0, 1.0, 15, 30),
+    "butter": (717, 0.9, 0.1, 81.0, 0.96, 14, 10),
+    "olive oil": (884, 0.0, 0.0, 100.0, 0.91, 14, 10),
+    "oil": (884, 0.0, 0.0, 100.0, 0.91, 14, 10),
+    "cooking spray": (792, 0.0, 0.0, 88.0, 0.91, 0.3, 0.5),
+    "peanut butter": (588, 25.0, 20.0, 50.0, 1.08, 16, 32),
+    "nut": (607, 20.0, 21.0, 54.0, 0.55, 1.2, 30),
+    "almond": (579, 21.0, 22.0, 50.0, 0.6, 1.2, 30),
+    "walnut": (654, 15.0, 14.0, 65.0, 0.42, 4, 30),
+    # Sauces, sweeteners, seasoning
+    "vinaigrette": (290, 0.3, 9.0, 28.0, 1.0, 15, 15),
+    "soy sauce": (53, 8.0, 4.9, 0.6, 1.1, 16, 10),
+    "honey": (304, 0.3, 82.0, 0.0, 1.42, 21, 10),
+    "sugar": (387, 0.0, 100.0, 0.0, 0.85, 4, 8),
+    "salt": (0, 0.0, 0.0, 0.0, 1.2, 1, 1),
+    "pepper": (251, 10.0, 64.0, 3.3, 0.5, 0.1, 0.5),
+    "herb": (40, 3.0, 7.0, 0.8, 0.1, 1, 2),
+    "spice": (300, 12.0, 55.0, 8.0, 0.5, 1, 2),
+}
+
+# Other spellings -> table name
+ALIASES = {
+    "chicken breasts": "chicken breast",
+    "garbanzo bean": "chickpea",
+    "greens": "mixed green",
+    "salad greens": "mixed green",
+    "eggwhite": "egg white",
+    "whey": "protein powder",
+    "extra virgin olive oil": "olive oil",
+    "evoo": "olive oil",
+    "peanut": "nut",
+    "cashew": "nut",
+    "scallion": "onion",
+    "capsicum": "bell pepper",
+    "spaghetti": "pasta",
+    "noodle": "pasta",
+    "dressing": "vinaigrette",
+}
+
+NAMES = list(INGREDIENTS.keys())
+_TABLE = np.array([INGREDIENTS[name] for name in NAMES], dtype=np.float64)
+# Per-gram kcal/protein/carbs/fat, shape (ingredients, 4)
+PER_GRAM = _TABLE[:, :4] / 100.0
+DENSITY = _TABLE[:, 4]
+PIECE_GRAMS = _TABLE[:, 5]
+SERVING_GRAMS = _TABLE[:, 6]
+
+# Hash index: normalized phrase -> table row
+INDEX = {name: row for row, name in enumerate(NAMES)}
+INDEX.update({alias: INDEX[name] for alias, name in ALIASES.items()})
+MAX_PHRASE_WORDS = max(len(phrase.split()) for phrase in INDEX)
+
+
+# ----------------------------------------------------------------------
+# Unit table: unit -> (kind, factor)
+#   mass: grams per unit; volume: ml per unit (grams via density);
+#   count: multiple of the ingredient's piece weight
+# ----------------------------------------------------------------------
+
+UNITS = {
+    "g": ("mass", 1.0), "gram": ("mass", 1.0), "grams": ("mass", 1.0),
+    "kg": ("mass", 1000.0), "mg": ("mass", 0.001),
+    "oz": ("mass", 28.35), "ounce": ("mass", 28.35), "ounces": ("mass", 28.35),
+    "lb": ("mass", 453.6), "lbs": ("mass", 453.6), "pound": ("mass", 453.6), "pounds": ("mass", 453.6),
+    "can": ("mass", 400.0), "cans": ("mass", 400.0), "pinch": ("mass", 0.4),
+    "ml": ("volume", 1.0), "l": ("volume", 1000.0), "liter": ("volume", 1000.0), "litre": ("volume", 1000.0),
+    "tsp": ("volume", 4.93), "teaspoon": ("volume", 4.93), "teaspoons": ("volume", 4.93),
+    "tbsp": ("volume", 14.79), "tablespoon": ("volume", 14.79), "tablespoons": ("volume", 14.79),
+    "cup": ("volume", 240.0), "cups": ("volume", 240.0), "dash": ("volume", 0.6),
+    "slice": ("count", 1.0), "slices": ("count", 1.0), "piece": ("count", 1.0), "pieces": ("count", 1.0),
+    "clove": ("count", 1.0), "cloves": ("count", 1.0), "scoop": ("count", 1.0), "scoops": ("count", 1.0),
+    "whole": ("count", 1.0), "fillet": ("count", 1.0), "fillets": ("count", 1.0),
+    "large": ("count", 1.25), "medium": ("count", 1.0), "small": ("count", 0.75),
+}
+
+UNICODE_FRACTIONS = {"½": 0.5, "¼": 0.25, "¾": 0.75, "⅓": 1 / 3, "⅔": 2 / 3}
+
+_TOKEN = re.compile(r"\d+(?:\.\d+)?(?:/\d+)?|[½¼¾⅓⅔]|[a-z]+|[,;.\n()]")
+_QUANTITY_WINDOW = 4  # words allowed between a quantity and its ingredient
+# Numbers followed by these are not ingredient quantities ("500 kcal", "20 minutes")
+NON_QUANTITY_WORDS = {"kcal", "cal", "calorie", "calories", "min", "mins", "minute", "minutes",
+                      "hour", "hours", "degree", "degrees", "f", "c", "serving", "servings",
+                      "people", "percent", "x", "day", "days", "week", "weeks"}
+
+
+def _quantity(token: str) -> Optional[float]:
+    if token in UNICODE_FRACTIONS:
+        return UNICODE_FRACTIONS[token]
+    if token[0].isdigit():
+        if "/" in token:
+            numerator, denominator = token.split("/")
+            return float(numerator) / float(denominator) if float(denominator) else None
+        return float(token)
+    return None
+
+
+def _singular(word: str) -> str:
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith("oes"):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith("ss") and len(word) > 3:
+        return word[:-1]
+    return word
+
+
+def _match_ingredient(tokens: List[str], start: int) -> Tuple[Optional[int], int]:
+    """Longest table phrase starting at tokens[start] -> (row, words consumed)"""
+    for length in range(min(MAX_PHRASE_WORDS, len(tokens) - start), 0, -1):
+        words = tokens[start:start + length]
+        if not all(w.isalpha() for w in words):
+            continue
+        phrase = " ".join(words)
+        row = INDEX.get(phrase)
+        if row is None:
+            row = INDEX.get(" ".join(words[:-1] + [_singular(words[-1])]))
+        if row is not None:
+            return row, length
+    return None, 0
+
+
+@lru_cache(maxsize=4096)
+def parse_ingredients(text: str) -> Tuple[Tuple[int, Optional[float], Optional[str]], ...]:
+    """
+    (ingredient row, quantity, unit) mentions in a recipe text. A quantity
+    applies to the first ingredient within a few words of it in the same
+    clause; ingredients without one get quantity None
+    """
+    tokens = _TOKEN.findall(text.lower())
+    mentions = []
+    pending = None  # (quantity, unit, words left)
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token in ",;.\n()":
+            pending = None
+            i += 1
+            continue
+
+        quantity = _quantity(token)
+        if quantity is not None:
+            i += 1
+            # "1 1/2", "1 ½" and ranges like "2-3" (the '-' is dropped by the tokenizer)
+            extra = _quantity(tokens[i]) if i < len(tokens) else None
+            if extra is not None:
+                quantity = quantity + extra if extra < 1 else (quantity + extra) / 2
+                i += 1
+            unit = None
+            if i < len(tokens) and tokens[i] in UNITS:
+                unit = tokens[i]
+                i += 1
+                if i < len(tokens) and tokens[i] == "of":
+                    i += 1
+            pending = (quantity, unit, _QUANTITY_WINDOW)
+            continue
+
+        row, length = _match_ingredient(tokens, i)
+        if row is not None:
+            if pending is not None:
+                mentions.append((row, pending[0], pending[1]))
+                pending = None
+            else:
+                mentions.append((row, None, None))
+            i += length
+            continue
+
+        if pending is not None:
+            if token in NON_QUANTITY_WORDS or pending[2] <= 1:
+                pending = None
+            else:
+                pending = (pending[0], pending[1], pending[2] - 1)
+        i += 1
+    return tuple(mentions)
+
+
+def to_grams(row: int, quantity: Optional[float], unit: Optional[str]) -> float:
+    """Normalize one mention to grams of the ingredient"""
+    if quantity is None:
+        return float(SERVING_GRAMS[row])
+    if unit is None:
+        return quantity * float(PIECE_GRAMS[row])
+    kind, factor = UNITS[unit]
+    if kind == "mass":
+        return quantity * factor
+    if kind == "volume":
+        return quantity * factor * float(DENSITY[row])
+    return quantity * factor * float(PIECE_GRAMS[row])
+
+
+def _resolve(mentions) -> Dict[int, Tuple[float, bool]]:
+    """
+    Grams per ingredient row. Quantified mentions add up; an unquantified
+    mention counts one serving, once, and only if the ingredient has no
+    quantified mention
+    """
+    quantified, unquantified = {}, set()
+    for row, quantity, unit in mentions:
+        if quantity is None:
+            unquantified.add(row)
+        else:
+            quantified[row] = quantified.get(row, 0.0) + to_grams(row, quantity, unit)
+    grams = {row: (value, False) for row, value in quantified.items()}
+    for row in unquantified - set(quantified):
+        grams[row] = (to_grams(row, None, None), True)
+    return grams
+
+
+def analyze_nutrition(texts: List[str], servings: int = 1,
+                      include_ingredients: bool = True) -> List[Dict[str, Any]]:
+    """
+    Macro totals per recipe (divided by `servings`). The batch is scattered
+    into one (recipes x ingredients) gram matrix and multiplied by the
+    per-gram nutrient table
+    """
+    servings = max(1, servings)
+    resolved = [_resolve(parse_ingredients(text)) for text in texts]
+
+    rows, cols, grams = [], [], []
+    for recipe_number, ingredient_grams in enumerate(resolved):
+        for row, (value, _) in ingredient_grams.items():
+            rows.append(recipe_number)
+            cols.append(row)
+            grams.append(value)
+
+    matrix = np.zeros((len(texts), len(NAMES)), dtype=np.float64)
+    np.add.at(matrix, (np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)),
+              np.asarray(grams, dtype=np.float64))
+    totals = (matrix @ PER_GRAM) / servings
+    weights = matrix.sum(axis=1) / servings
+
+    results = []
+    for recipe_number, ingredient_grams in enumerate(resolved):
+        kcal, protein, carbs, fat = totals[recipe_number]
+        result = {
+            "calories": int(round(kcal)),
+            "protein_g": round(float(protein), 1),
+            "carbs_g": round(float(carbs), 1),
+            "fats_g": round(float(fat), 1),
+            "total_grams": round(float(weights[recipe_number]), 1),
+            "ingredients_matched": len(ingredient_grams),
+            "estimated_portions": sum(1 for _, estimated in ingredient_grams.values() if estimated)
+        }
+        if include_ingredients:
+            result["ingredients"] = [
+                {"ingredient": NAMES[row], "grams": round(value / servings, 1), "estimated": estimated}
+                for row, (value, estimated) in sorted(ingredient_grams.items(), key=lambda item: -item[1][0])
+            ]
+        results.append(result)
+    return results
@@ -0,0 +1,300 @@
+"""
+PANTRY SEARCH
+Inverted index from each normalized ingredient to a bitmap of recipe rows
+(packed uint64 words). "What can I cook with what I have" queries are bitwise
+ANDs/ORs plus bit-sliced counting, ranked by nutritional fit for the goal
+"""
+
+import threading
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+
+from nutrition import INDEX, NAMES, parse_ingredients, analyze_nutrition
+
+
+PANTRY_MODES = ["subset", "superset", "missing"]
+
+# Always assumed to be in the pantry unless the client opts out
+STAPLES = ["salt", "pepper", "oil", "olive oil", "herb", "spice", "cooking spray"]
+
+# Words people type for a whole group of ingredients
+INGREDIENT_GROUPS = {
+    "vegetables": ["broccoli", "spinach", "kale", "lettuce", "mixed green", "cabbage", "cauliflower",
+                   "zucchini", "cucumber", "tomato", "cherry tomato", "carrot", "bell pepper", "onion",
+                   "red onion", "mushroom", "celery", "pea", "snow pea", "green bean", "asparagus"],
+    "fruit": ["avocado", "banana", "apple", "berry", "lemon"],
+    "dairy": ["milk", "whole milk", "greek yogurt", "yogurt", "cheese", "parmesan", "feta", "cream", "butter"],
+    "nuts": ["nut", "almond", "walnut", "peanut butter"],
+}
+INGREDIENT_GROUPS["veggies"] = INGREDIENT_GROUPS["vegetables"]
+INGREDIENT_GROUPS["veg"] = INGREDIENT_GROUPS["vegetables"]
+
+_BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount(words: np.ndarray) -> int:
+    """Number of set bits in a uint64 word array"""
+    if hasattr(np, "bitwise_count"):
+        return int(np.bitwise_count(words).sum())
+    return int(_BYTE_POPCOUNT[words.view(np.uint8)].sum())
+
+
+def bits_to_rows(words: np.ndarray, limit: int) -> np.ndarray:
+    """Row numbers of the set bits (rows >= limit are ignored)"""
+    return np.flatnonzero(np.unpackbits(words.view(np.uint8), bitorder="little")[:limit])
+
+
+def goal_fit(calories: np.ndarray, protein: np.ndarray, goal: Optional[str]) -> np.ndarray:
+    """
+    0..1 nutritional fit: weight loss favors a high protein share of energy
+    at modest calories, weight gain favors calories plus absolute protein
+    """
+    calories = np.maximum(calories, 1.0)
+    protein_share = np.clip(protein * 4.0 / calories, 0.0, 1.0)
+    if goal == "lose_weight":
+        return 0.6 * protein_share + 0.4 * (1.0 - np.clip(calories / 800.0, 0.0, 1.0))
+    if goal == "gain_weight":
+        return 0.5 * np.clip(calories / 900.0, 0.0, 1.0) + 0.5 * np.clip(protein / 50.0, 0.0, 1.0)
+    return protein_share
+
+
+def resolve_ingredients(terms: List[str]) -> Tuple[List[int], List[str]]:
+    """User pantry terms -> ingredient table rows (groups expanded) and unrecognized terms"""
+    rows, unknown = set(), []
+    for term in terms:
+        term = term.strip().lower()
+        if not term:
+            continue
+        if term in INGREDIENT_GROUPS:
+            rows.update(INDEX[name] for name in INGREDIENT_GROUPS[term])
+            continue
+        parsed = parse_ingredients(term)
+        if parsed:
+            rows.update(row for row, _, _ in parsed)
+        else:
+            unknown.append(term)
+    return sorted(rows), unknown
+
+
+class PantryIndex:
+    """
+    One bitmap per ingredient plus a live bitmap, over append-only recipe
+    rows. Replacing a recipe clears its old row and appends a new one;
+    cleared rows are squeezed out once they make up half of the rows.
+
+    The bitmaps are dense packed words, not compressed (roaring) ones: there
+    are only len(NAMES) of them (~80), so all of them together cost about
+    10 bytes per recipe (1 MB at 100k recipes), and a query is a handful of
+    whole-array numpy AND/ORs. Compression pays off for many sparse bitmaps
+    over a huge row space, and would add a native dependency for no gain here.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._lock = threading.RLock()
+        self._reset(capacity)
+        self.built = False
+
+    def _reset(self, capacity: int):
+        words = max(1, (capacity + 63) // 64)
+        self.bitmaps = np.zeros((len(NAMES), words), dtype=np.uint64)
+        self.live = np.zeros(words, dtype=np.uint64)
+        self.ingredient_counts = np.zeros(words * 64, dtype=np.uint8)
+        self.calories = np.zeros(words * 64, dtype=np.float32)
+        self.protein = np.zeros(words * 64, dtype=np.float32)
+        self.ids = []
+        self.titles = []
+        self.row_of = {}
+
+    def _grow(self):
+        words = self.live.shape[0] * 2
+        bitmaps = np.zeros((len(NAMES), words), dtype=np.uint64)
+        bitmaps[:, :self.bitmaps.shape[1]] = self.bitmaps
+        self.bitmaps = bitmaps
+        self.live = np.concatenate([self.live, np.zeros_like(self.live)])
+        for name in ("ingredient_counts", "calories", "protein"):
+            column = getattr(self, name)
+            setattr(self, name, np.concatenate([column, np.zeros_like(column)]))
+
+    def _compact(self):
+        """Drop cleared rows: select the live bit columns and repack them"""
+        rows = len(self.ids)
+        keep = bits_to_rows(self.live, rows)
+        unpacked = np.unpackbits(self.bitmaps.view(np.uint8), axis=1, bitorder="little")[:, keep]
+        words = max(1, (2 * len(keep) + 63) // 64)
+        bitmaps = np.zeros((len(NAMES), words * 64), dtype=np.uint8)
+        bitmaps[:, :len(keep)] = unpacked
+        self.bitmaps = np.ascontiguousarray(np.packbits(bitmaps, axis=1, bitorder="little")).view(np.uint64)
+
+        live = np.zeros(words * 64, dtype=np.uint8)
+        live[:len(keep)] = 1
+        self.live = np.packbits(live, bitorder="little").view(np.uint64)
+        for name in ("ingredient_counts", "calories", "protein"):
+            column = getattr(self, name)
+            compacted = np.zeros(words * 64, dtype=column.dtype)
+            compacted[:len(keep)] = column[keep]
+            setattr(self, name, compacted)
+
+        self.ids = [self.ids[row] for row in keep]
+        self.titles = [self.titles[row] for row in keep]
+        self.row_of = {recipe_id: row for row, recipe_id in enumerate(self.ids)}
+
+    @staticmethod
+    def _ingredient_rows(record: Dict[str, Any]) -> List[int]:
+        return sorted({row for row, _, _ in parse_ingredients(record.get("text", ""))})
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    def add_recipe(self, record: Dict[str, Any], macros: Optional[Dict[str, Any]] = None):
+        """Index a new or replaced recipe; macros default to the record's, else estimated"""
+        with self._lock:
+            self.remove_recipe(record["id"])
+            cleared = len(self.ids) - len(self.row_of)
+            if cleared >= 1024 and cleared * 2 >= len(self.ids):
+                self._compact()
+            row = len(self.ids)
+            if row >= self.live.shape[0] * 64:
+                self._grow()
+
+            word, bit = row // 64, np.uint64(1 << (row % 64))
+            ingredients = self._ingredient_rows(record)
+            for ingredient in ingredients:
+                self.bitmaps[ingredient, word] |= bit
+            self.live[word] |= bit
+            self.ingredient_counts[row] = min(len(ingredients), 255)
+
+            if macros is None and (record.get("calories") is None or record.get("protein_g") is None):
+                macros = analyze_nutrition([record.get("text", "")], include_ingredients=False)[0]
+            source = macros or record
+            self.calories[row] = float(record.get("calories") or source["calories"] or 0)
+            self.protein[row] = float(record.get("protein_g") or source["protein_g"] or 0)
+
+            self.ids.append(record["id"])
+            self.titles.append(record.get("title"))
+            self.row_of[record["id"]] = row
+
+    def remove_recipe(self, recipe_id: str) -> bool:
+        with self._lock:
+            row = self.row_of.pop(recipe_id, None)
+            if row is None:
+                return False
+            self.live[row // 64] &= ~np.uint64(1 << (row % 64))
+            return True
+
+    def build(self, records_fn):
+        """Full (re)load from `records_fn()` (called under the index lock); drops cleared rows"""
+        with self._lock:
+            records = list(records_fn())
+            self._reset(len(records))
+            texts = [r.get("text", "") for r in records]
+            estimates = analyze_nutrition(texts, include_ingredients=False) if records else []
+            for record, estimate in zip(records, estimates):
+                self.add_recipe(record, estimate)
+            self.built = True
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _union(self, ingredients: List[int]) -> np.ndarray:
+        if not ingredients:
+            return np.zeros_like(self.live)
+        return np.bitwise_or.reduce(self.bitmaps[ingredients], axis=0)
+
+    def _matched_counts(self, ingredients: List[int], rows: int) -> np.ndarray:
+        """
+        Per-recipe number of pantry ingredients it uses: the pantry bitmaps are
+        summed word-parallel into bit-sliced counter planes (ripple-carry adder),
+        so only the few planes are unpacked, not every bitmap
+        """
+        planes = []
+        for ingredient in ingredients:
+            carry = self.bitmaps[ingredient]
+            for level in range(len(planes)):
+                planes[level], carry = planes[level] ^ carry, planes[level] & carry
+            if carry.any():
+                planes.append(carry.copy())
+
+        counts = np.zeros(rows, dtype=np.int32)
+        for level, plane in enumerate(planes):
+            counts += np.unpackbits(plane.view(np.uint8), bitorder="little")[:rows].astype(np.int32) << level
+        return counts
+
+    def search(self, pantry: List[int], mode: str = "missing", max_missing: int = 1,
+               goal: Optional[str] = None, n_results: int = 10,
+               staples: Optional[List[int]] = None) -> Dict[str, Any]:
+        """
+        subset:   recipes that use only pantry ingredients (cook now)
+        superset: recipes that use every pantry ingredient
+        missing:  recipes needing at most `max_missing` ingredients beyond the pantry
+        Staples count as available but are not required by superset queries.
+        An empty pantry (e.g. nothing recognized) matches nothing.
+        """
+        if mode not in PANTRY_MODES:
+            raise ValueError(f"Mode must be one of {PANTRY_MODES}")
+        if not pantry:
+            return {"results": [], "count": 0, "total_matches": 0}
+
+        with self._lock:
+            rows = len(self.ids)
+            available = sorted(set(pantry) | set(staples or []))
+            missing_counts = None
+
+            if mode == "superset":
+                mask = self.live.copy()
+                for ingredient in pantry:
+                    mask &= self.bitmaps[ingredient]
+            elif mode == "subset":
+                available_set = set(available)
+                outside = [i for i in range(len(NAMES)) if i not in available_set]
+                mask = self.live & ~self._union(outside)
+            else:
+                # Candidates must use at least one pantry ingredient
+                mask = self.live & self._union(pantry)
+                missing_counts = self.ingredient_counts[:rows].astype(np.int32) - self._matched_counts(available, rows)
+
+            candidates = bits_to_rows(mask, rows)
+            if missing_counts is not None:
+                candidates = candidates[missing_counts[candidates] <= max_missing]
+
+            total = len(candidates)
+            fit = goal_fit(self.calories[candidates].astype(np.float64),
+                           self.protein[candidates].astype(np.float64), goal)
+            missing = missing_counts[candidates] if missing_counts is not None else np.zeros(total, dtype=np.int32)
+            # Fewest missing ingredients first, then best goal fit
+            if total > n_results:
+                order = np.lexsort((-fit, missing))[:n_results]
+            else:
+                order = np.lexsort((-fit, missing))
+            available_set = set(available)
+
+            results = []
+            for position in order:
+                row = int(candidates[position])
+                word, bit = row // 64, np.uint64(1 << (row % 64))
+                uses = [i for i in np.flatnonzero(self.bitmaps[:, word] & bit)]
+                results.append({
+                    "id": self.ids[row],
+                    "title": self.titles[row],
+                    "matched": [NAMES[i] for i in uses if i in available_set],
+                    "missing": [NAMES[i] for i in uses if i not in available_set],
+                    "goal_fit": round(float(fit[position]), 3),
+                    "calories": round(float(self.calories[row]), 1),
+                    "protein_g": round(float(self.protein[row]), 1)
+                })
+            return {"results": results, "count": len(results), "total_matches": total}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            live = popcount(self.live)
+            return {
+                "rows": len(self.ids),
+                "live_recipes": live,
+                "cleared_rows": len(self.ids) - live,
+                "ingredients_indexed": int(np.count_nonzero(self.bitmaps.any(axis=1)))
+            }
+
+    def nbytes(self) -> int:
+        return int(self.bitmaps.nbytes + self.live.nbytes + self.ingredient_counts.nbytes
+                   + self.calories.nbytes + self.protein.nbytes)
@@ -0,0 +1,263 @@
+"""
+DEPENDENCY-AWARE STAGE EXECUTOR
+Stages declare inputs/outputs; each request runs only the stages its targets
+need, computes every intermediate once and runs independent stages in parallel.
+With a deadline, optional stages are skipped or served from their fallback
+when the remaining budget is too small
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# Stage threads shared by all requests. Stages mostly wait on the model or
+# the index (GIL released), so the default oversubscribes the cores
+PIPELINE_WORKERS = int(os.getenv("RECIPE_PIPELINE_WORKERS", str((os.cpu_count() or 1) * 4)))
+# Optional (degradable) stages get their own bounded pool: work abandoned at a
+# deadline keeps running to completion, and must not starve required stages
+PIPELINE_OPTIONAL_WORKERS = int(os.getenv("RECIPE_PIPELINE_OPTIONAL_WORKERS", str(os.cpu_count() or 1)))
+
+
+class Stage:
+    """
+    One pipeline step. `fn` is called with the declared inputs as keyword
+    arguments and returns a dict with the declared outputs (or the bare
+    value when there is exactly one output).
+
+    Optional stages may be degraded under a deadline: `fallback` (same
+    arguments as `fn`) returns a cheap substitute such as a cached result,
+    or None, in which case `default` is used.
+    """
+
+    def __init__(self, name: str, fn: Callable[..., Any], inputs: List[str], outputs: List[str],
+                 label: Optional[str] = None, optional: bool = False,
+                 fallback: Optional[Callable[..., Any]] = None, default: Any = None):
+        self.name = name
+        self.fn = fn
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.label = label or name
+        self.optional = optional
+        self.fallback = fallback
+        self.default = default
+
+    def _as_outputs(self, result: Any) -> Dict[str, Any]:
+        if len(self.outputs) == 1 and not (isinstance(result, dict) and self.outputs[0] in result):
+            return {self.outputs[0]: result}
+        return {key: result[key] for key in self.outputs}
+
+    def __call__(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        return self._as_outputs(self.fn(**{key: values[key] for key in self.inputs}))
+
+    def degrade(self, values: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+        """Substitute outputs and how they were obtained ("cached" or "skipped")"""
+        result = None
+        if self.fallback is not None:
+            try:
+                result = self.fallback(**{key: values[key] for key in self.inputs})
+            except Exception as e:
+                print(f"   ⚠️  Fallback for {self.name} failed: {e}")
+        if result is None:
+            return self._as_outputs(self.default), "skipped"
+        return self._as_outputs(result), "cached"
+
+
+class PipelineResult:
+    """
+    Values produced by a run plus the stages executed (in completion order),
+    their timings and the stages degraded under the deadline (label -> mode)
+    """
+
+    def __init__(self, values: Dict[str, Any], executed: List[str], timings_ms: Dict[str, float],
+                 degraded: Optional[Dict[str, str]] = None):
+        self.values = values
+        self.executed = executed
+        self.timings_ms = timings_ms
+        self.degraded = degraded or {}
+
+    def __getitem__(self, key: str) -> Any:
+        return self.values[key]
+
+
+class PipelineExecutor:
+    """
+    Runs a set of stages as a DAG over a shared thread pool. Per-stage
+    latency is tracked as a moving average to decide, under a deadline,
+    whether an optional stage still fits in the remaining budget.
+
+    The pool is shared by every concurrent run: at most `max_workers`
+    stages execute at once process-wide, and further stages queue. Pass
+    `pool` to share an executor owned by the caller instead. Optional
+    stages run on a separate pool of `optional_workers` threads; the time
+    they are likely to wait for one counts against the deadline too.
+    """
+
+    def __init__(self, stages: List[Stage], max_workers: int = PIPELINE_WORKERS, smoothing: float = 0.2,
+                 pool: Optional[ThreadPoolExecutor] = None,
+                 optional_workers: int = PIPELINE_OPTIONAL_WORKERS):
+        self.stages = {stage.name: stage for stage in stages}
+        self.producers = {}
+        for stage in stages:
+            for output in stage.outputs:
+                if output in self.producers:
+                    raise ValueError(f"Output '{output}' produced by both "
+                                     f"'{self.producers[output].name}' and '{stage.name}'")
+                self.producers[output] = stage
+        self.pool = pool or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline")
+        self.optional_workers = optional_workers
+        self.optional_pool = ThreadPoolExecutor(max_workers=optional_workers, thread_name_prefix="pipeline-optional")
+        self.smoothing = smoothing
+        self.estimates_ms = {}  # stage name -> moving average latency
+        self.queue_wait_ms = 0.0  # moving average of submit -> start on the optional pool
+        self.degraded_counts = {}  # stage label -> times degraded
+        self._optional_lock = threading.Lock()
+        self._optional_inflight = 0  # submitted optional stages not finished yet (abandoned ones included)
+
+    def _record_latency(self, stage: Stage, elapsed_ms: float):
+        previous = self.estimates_ms.get(stage.name)
+        self.estimates_ms[stage.name] = elapsed_ms if previous is None else \
+            previous + self.smoothing * (elapsed_ms - previous)
+
+    def _record_queue_wait(self, wait_ms: float):
+        self.queue_wait_ms += self.smoothing * (wait_ms - self.queue_wait_ms)
+
+    def _expected_wait_ms(self, estimate_ms: float) -> float:
+        """
+        Queue wait before an optional stage would start: the observed average,
+        or the backlog ahead of it when every optional worker is busy
+        """
+        backlog = self._optional_inflight - self.optional_workers
+        if backlog < 0:
+            return self.queue_wait_ms
+        return max(self.queue_wait_ms, (backlog + 1) * estimate_ms / self.optional_workers)
+
+    def _fits(self, stage: Stage, deadline: float) -> bool:
+        """
+        Whether the stage's expected queue wait plus typical latency fits
+        before the deadline (unknown latency: try it)
+        """
+        remaining_ms = (deadline - time.monotonic()) * 1000
+        estimate_ms = self.estimates_ms.get(stage.name, 0.0)
+        return remaining_ms > estimate_ms + self._expected_wait_ms(estimate_ms)
+
+    def _submit(self, timed: Callable, stage: Stage, values: Dict[str, Any]):
+        if not stage.optional:
+            return self.pool.submit(timed, stage, values, None)
+        with self._optional_lock:
+            self._optional_inflight += 1
+        future = self.optional_pool.submit(timed, stage, values, time.perf_counter())
+        future.add_done_callback(self._optional_done)
+        return future
+
+    def _optional_done(self, future):
+        with self._optional_lock:
+            self._optional_inflight -= 1
+
+    def plan(self, targets: List[str], available: List[str]) -> List[Stage]:
+        """Stages needed to produce `targets` from `available` values (unused stages are left out)"""
+        needed = {}
+        pending = [t for t in targets if t not in available]
+        while pending:
+            key = pending.pop()
+            stage = self.producers.get(key)
+            if stage is None:
+                raise KeyError(f"No stage produces '{key}'")
+            if stage.name in needed:
+                continue
+            needed[stage.name] = stage
+            pending.extend(i for i in stage.inputs if i not in available)
+        return list(needed.values())
+
+    def run(self, initial: Dict[str, Any], targets: List[str],
+            deadline: Optional[float] = None) -> PipelineResult:
+        """
+        Execute the planned stages: every stage whose inputs are ready is
+        submitted at once, so independent branches overlap. The first stage
+        error is re-raised after in-flight stages finish.
+
+        `deadline` is a time.monotonic() value. Optional stages that will not
+        fit are degraded instead of started; once only optional stages are in
+        flight, they are abandoned (and degraded) at the deadline, and an
+        optional stage that fails is degraded rather than failing the run.
+        An optional stage that only reaches a worker after the deadline
+        returns at once instead of running. Required stages always run to
+        completion.
+        """
+        values = dict(initial)
+        remaining = self.plan(targets, list(values.keys()))
+        executed, timings, degraded = [], {}, {}
+        running = {}
+
+        def degrade(stage: Stage):
+            outputs, mode = stage.degrade(values)
+            values.update(outputs)
+            degraded[stage.label] = mode
+            self.degraded_counts[stage.label] = self.degraded_counts.get(stage.label, 0) + 1
+
+        def timed(stage: Stage, inputs: Dict[str, Any], submitted: Optional[float]) -> Tuple[Dict[str, Any], float]:
+            start = time.perf_counter()
+            if submitted is not None:
+                self._record_queue_wait((start - submitted) * 1000)
+            if deadline is not None and stage.optional and time.monotonic() >= deadline:
+                # Waited past the deadline in the queue: the run has already degraded it
+                raise TimeoutError(f"Stage {stage.name} started after the deadline")
+            outputs = stage(inputs)
+            return outputs, (time.perf_counter() - start) * 1000
+
+        error = None
+        while remaining or running:
+            if error is None:
+                ready = [s for s in remaining if all(i in values for i in s.inputs)]
+                while ready:
+                    for stage in ready:
+                        remaining.remove(stage)
+                        if stage.optional and deadline is not None and not self._fits(stage, deadline):
+                            degrade(stage)
+                        else:
+                            running[self._submit(timed, stage, dict(values))] = stage
+                    # Degraded outputs may make further stages ready right away
+                    ready = [s for s in remaining if all(i in values for i in s.inputs)]
+
+            if not running:
+                if error is not None or not remaining:
+                    break
+                raise RuntimeError(f"Unsatisfiable stages: {[s.name for s in remaining]}")
+
+            timeout = None
+            if deadline is not None and all(s.optional for s in running.values()):
+                timeout = max(0.0, deadline - time.monotonic())
+            done, _ = wait(list(running.keys()), timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                # Deadline reached with only optional work in flight: stop waiting for it
+                for future, stage in list(running.items()):
+                    future.cancel()
+                    degrade(stage)
+                running.clear()
+                continue
+
+            for future in done:
+                stage = running.pop(future)
+                try:
+                    outputs, elapsed = future.result()
+                except Exception as e:
+                    if stage.optional:
+                        print(f"   ⚠️  Optional stage {stage.name} failed: {e}")
+                        degrade(stage)
+                        continue
+                    error = error or e
+                    continue
+                values.update(outputs)
+                executed.append(stage.label)
+                timings[stage.label] = round(elapsed, 2)
+                self._record_latency(stage, elapsed)
+
+            if error is not None and not running:
+                break
+
+        if error is not None:
+            raise error
+        return PipelineResult(values, executed, timings, degraded)
@@ -6,10 +6,12 @@ Meets: "Data preprocessing: Text cleaning, tokenization, normalization"
 import re
 import nltk
 from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
+from nltk.corpus import stopwords, wordnet
 from nltk.stem import WordNetLemmatizer
 import string
 
+from memory_stats import approx_container_bytes
+
 class RecipePreprocessor:
     """Complete NLP preprocessing pipeline for recipes"""
     
@@ -29,6 +31,21 @@ class RecipePreprocessor:
             r'\d+-\d+\s*\w+'
         ]
     
+    def memory_footprint(self) -> dict:
+        """Estimated bytes of the NLTK data held in memory (WordNet loads lazily)"""
+        wordnet_bytes = 0
+        wordnet_loaded = wordnet.__class__.__name__ != "LazyCorpusLoader"
+        if wordnet_loaded:
+            for attr in ("_lemma_pos_offset_map", "_synset_offset_cache", "_exception_map"):
+                if hasattr(wordnet, attr):
+                    wordnet_bytes += approx_container_bytes(getattr(wordnet, attr))
+        
+        return {
+            "stopwords_bytes": approx_container_bytes(self.stop_words),
+            "wordnet_bytes": wordnet_bytes,
+            "wordnet_loaded": wordnet_loaded
+        }
+    
     def clean_text(self, text: str) -> str:
         """Text cleaning: remove special chars, normalize"""
         # Lowercase
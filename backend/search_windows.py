@@ -0,0 +1,141 @@
+"""
+CURSOR-PAGINATED SEARCH WINDOWS
+The first page of a search computes the top-N once and keeps it server-side
+under a short TTL; later pages are slices of that window, addressed by an
+opaque signed cursor (no re-embedding, no index scan)
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from memory_stats import approx_container_bytes
+
+
+class CursorError(ValueError):
+    """
+    A cursor that cannot be served. `reason` is one of
+    invalid (tampered or malformed), mismatch (different filters or goal),
+    expired (window evicted or past its TTL), stale (the index changed)
+    """
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+def filters_key(filters: Dict[str, Any]) -> str:
+    """Short stable digest of a parsed filter spec (goal included)"""
+    canonical = json.dumps(filters or {}, sort_keys=True)
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class SearchWindowStore:
+    """
+    LRU of result windows with a TTL. A cursor carries the window id, the
+    next offset, the filter digest and the index version the window was
+    computed against, signed with HMAC so clients cannot forge offsets into
+    other windows. Windows live in this process only: a cursor sent to
+    another replica reads as expired and the client restarts the query.
+    """
+
+    def __init__(self, max_windows: int = 1024, ttl_seconds: float = 120.0, secret: Optional[bytes] = None):
+        self.max_windows = max_windows
+        self.ttl_seconds = ttl_seconds
+        self._secret = secret or os.urandom(32)
+        self._lock = threading.Lock()
+        self._windows = OrderedDict()  # window id -> (results, created_at)
+        self.metrics = {"windows": 0, "pages": 0, "expired": 0, "stale": 0, "evictions": 0}
+
+    # ------------------------------------------------------------------
+    # Cursors
+    # ------------------------------------------------------------------
+
+    def _sign(self, payload: bytes) -> bytes:
+        return hmac.new(self._secret, payload, hashlib.sha256).digest()[:16]
+
+    def encode_cursor(self, window_id: str, offset: int, filters_digest: str, version: int) -> str:
+        payload = json.dumps({"w": window_id, "o": offset, "f": filters_digest, "v": version},
+                             separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(self._sign(payload) + payload).decode("ascii").rstrip("=")
+
+    def decode_cursor(self, cursor: str) -> Dict[str, Any]:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            signature, payload = raw[:16], raw[16:]
+            if not hmac.compare_digest(signature, self._sign(payload)):
+                raise ValueError("bad signature")
+            fields = json.loads(payload)
+            return {"window_id": fields["w"], "offset": int(fields["o"]),
+                    "filters": fields["f"], "version": int(fields["v"])}
+        except (ValueError, KeyError, TypeError) as e:
+            raise CursorError("invalid", f"Invalid cursor ({e})")
+
+    # ------------------------------------------------------------------
+    # Windows
+    # ------------------------------------------------------------------
+
+    def open(self, results: List[Dict[str, Any]]) -> str:
+        window_id = uuid.uuid4().hex[:16]
+        with self._lock:
+            self._windows[window_id] = (results, time.monotonic())
+            self.metrics["windows"] += 1
+            while len(self._windows) > self.max_windows:
+                self._windows.popitem(last=False)
+                self.metrics["evictions"] += 1
+        return window_id
+
+    def page(self, cursor: Dict[str, Any], filters_digest: Optional[str], version: int,
+             page_size: int, allow_stale: bool = False) -> Dict[str, Any]:
+        """
+        Slice of a decoded cursor's window. filters_digest=None skips the
+        filter check (the client did not resend filters).
+        """
+        if filters_digest is not None and filters_digest != cursor["filters"]:
+            raise CursorError("mismatch", "Cursor was issued for different filters or goal")
+        stale = cursor["version"] != version
+        if stale and not allow_stale:
+            self.metrics["stale"] += 1
+            raise CursorError("stale", "The index changed since this search started; restart it without a cursor")
+
+        with self._lock:
+            entry = self._windows.get(cursor["window_id"])
+            if entry is not None and time.monotonic() - entry[1] > self.ttl_seconds:
+                del self._windows[cursor["window_id"]]
+                entry = None
+            if entry is None:
+                self.metrics["expired"] += 1
+                raise CursorError("expired", "Search window expired; restart the search without a cursor")
+            self._windows.move_to_end(cursor["window_id"])
+            self.metrics["pages"] += 1
+        return self.slice(cursor["window_id"], entry[0], cursor["offset"], page_size,
+                          cursor["filters"], cursor["version"], stale)
+
+    def slice(self, window_id: str, results: List[Dict[str, Any]], offset: int, page_size: int,
+              filters_digest: str, version: int, stale: bool = False) -> Dict[str, Any]:
+        end = offset + page_size
+        return {
+            "results": results[offset:end],
+            "count": len(results[offset:end]),
+            "offset": offset,
+            "window_size": len(results),
+            "next_cursor": self.encode_cursor(window_id, end, filters_digest, version) if end < len(results) else None,
+            "index_version": version,
+            "stale": stale
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.metrics, "open_windows": len(self._windows), "ttl_seconds": self.ttl_seconds}
+
+    def nbytes(self) -> int:
+        with self._lock:
+            windows = list(self._windows.values())
+        return approx_container_bytes(self._windows) + sum(approx_container_bytes(results) for results, _ in windows)
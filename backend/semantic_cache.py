@@ -0,0 +1,155 @@
+"""
+SEMANTIC (NEAR-DUPLICATE) QUERY CACHE
+Paraphrased queries whose embeddings are within a cosine distance of a cached
+query (same goal, filters and k) reuse that query's search results
+"""
+
+import json
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+class SemanticCache:
+    """
+    A small vector index of recent query embeddings with LRU eviction.
+    Entries remember the index version they were computed against; entries
+    more than `max_version_lag` versions behind are treated as stale.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_distance: float = 0.05,
+                 ttl_seconds: float = 300.0, max_version_lag: int = 0):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.ttl_seconds = ttl_seconds
+        self.max_version_lag = max_version_lag
+
+        self._lock = threading.Lock()
+        self._vectors = None                      # (max_entries, dim) float32, allocated lazily
+        self._slot_key = np.full(max_entries, -1, dtype=np.int64)
+        self._entries = [None] * max_entries      # slot -> (results, created_at, version)
+        self._lru = OrderedDict()                 # slot -> None, least recent first
+        self._key_ids = {}                        # partition key -> int id
+        self._next_key_id = 0
+        self._free = list(range(max_entries - 1, -1, -1))
+
+        self.metrics = {"hits": 0, "misses": 0, "stale": 0, "expired": 0, "evictions": 0,
+                        "hit_age_seconds_total": 0.0, "hit_distance_total": 0.0}
+
+    @staticmethod
+    def partition_key(goal: Optional[str], filters: Optional[Dict], n_results: int) -> str:
+        """Only queries with identical goal, filters and k may share results"""
+        return json.dumps([goal, filters or {}, n_results], sort_keys=True)
+
+    def _key_id(self, key: str) -> int:
+        if key not in self._key_ids:
+            if len(self._key_ids) >= 4 * self.max_entries:
+                # Forget keys that no longer own any slot (ids are never reused)
+                live = set(int(k) for k in self._slot_key if k >= 0)
+                self._key_ids = {k: v for k, v in self._key_ids.items() if v in live}
+            self._key_ids[key] = self._next_key_id
+            self._next_key_id += 1
+        return self._key_ids[key]
+
+    def _release(self, slot: int):
+        self._slot_key[slot] = -1
+        self._entries[slot] = None
+        self._lru.pop(slot, None)
+        self._free.append(slot)
+
+    def get(self, embedding: np.ndarray, key: str, index_version: int) -> Optional[List[Dict[str, Any]]]:
+        """Cached results of the nearest same-key query within max_distance, else None"""
+        query = np.asarray(embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+
+        with self._lock:
+            key_id = self._key_ids.get(key)
+            if key_id is None or self._vectors is None:
+                self.metrics["misses"] += 1
+                return None
+
+            slots = np.flatnonzero(self._slot_key == key_id)
+            if len(slots) == 0:
+                self.metrics["misses"] += 1
+                return None
+
+            similarities = self._vectors[slots] @ query
+            best = int(np.argmax(similarities))
+            slot, distance = int(slots[best]), 1.0 - float(similarities[best])
+            if distance > self.max_distance:
+                self.metrics["misses"] += 1
+                return None
+
+            results, created_at, version = self._entries[slot]
+            age = time.time() - created_at
+            if age > self.ttl_seconds:
+                self.metrics["expired"] += 1
+                self.metrics["misses"] += 1
+                self._release(slot)
+                return None
+            if index_version - version > self.max_version_lag:
+                self.metrics["stale"] += 1
+                self.metrics["misses"] += 1
+                self._release(slot)
+                return None
+
+            self._lru.move_to_end(slot)
+            self.metrics["hits"] += 1
+            self.metrics["hit_age_seconds_total"] += age
+            self.metrics["hit_distance_total"] += distance
+            return [dict(r) for r in results]
+
+    def put(self, embedding: np.ndarray, key: str, index_version: int, results: List[Dict[str, Any]]):
+        """Cache results for a query, evicting the least recently used entry if full"""
+        query = np.asarray(embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, len(query)), dtype=np.float32)
+
+            if not self._free:
+                victim, _ = self._lru.popitem(last=False)
+                self._release(victim)
+                self.metrics["evictions"] += 1
+
+            slot = self._free.pop()
+            self._vectors[slot] = query
+            self._slot_key[slot] = self._key_id(key)
+            self._entries[slot] = ([dict(r) for r in results], time.time(), index_version)
+            self._lru[slot] = None
+
+    def clear(self):
+        with self._lock:
+            for slot in list(self._lru.keys()):
+                self._release(slot)
+            self._key_ids.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate, staleness and size metrics"""
+        with self._lock:
+            metrics = dict(self.metrics)
+            size = len(self._lru)
+            oldest = min((self._entries[s][1] for s in self._lru), default=None)
+
+        lookups = metrics["hits"] + metrics["misses"]
+        hits = metrics.pop("hits")
+        return {
+            "size": size,
+            "capacity": self.max_entries,
+            "max_distance": self.max_distance,
+            "hits": hits,
+            "lookups": lookups,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "stale_rejections": metrics["stale"],
+            "expired": metrics["expired"],
+            "evictions": metrics["evictions"],
+            "avg_hit_age_seconds": round(metrics["hit_age_seconds_total"] / hits, 3) if hits else 0.0,
+            "avg_hit_distance": round(metrics["hit_distance_total"] / hits, 4) if hits else 0.0,
+            "oldest_entry_age_seconds": round(time.time() - oldest, 1) if oldest else 0.0
+        }
+
+    def nbytes(self) -> int:
+        return int(self._vectors.nbytes if self._vectors is not None else 0) + self._slot_key.nbytes
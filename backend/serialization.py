@@ -0,0 +1,90 @@
+"""
+FAST RESPONSE SERIALIZATION
+orjson-backed JSON responses, field projection and gzip negotiation
+"""
+
+import gzip
+import json
+from typing import Any, Dict, List, Optional, Iterable
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 5
+
+
+def dumps(content: Any) -> bytes:
+    """Encode to compact UTF-8 JSON bytes (orjson when installed)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response that skips pydantic re-validation and jsonable_encoder:
+    route handlers return plain dicts that go straight to the encoder
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[List[str]]:
+    """
+    "match_status,score" -> ["match_status", "score"]; None means all fields.
+    Raises ValueError on unknown field names.
+    """
+    if not fields:
+        return None
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    return requested
+
+
+def project(payload: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """Keep only the requested top-level fields"""
+    if fields is None:
+        return payload
+    return {f: payload[f] for f in fields if f in payload}
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """True if the Accept-Encoding header allows gzip (q=0 opts out)"""
+    if not accept_encoding:
+        return False
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        if token.strip().lower() in ("gzip", "*"):
+            q = params.strip()
+            if not q.startswith("q="):
+                return True
+            try:
+                return float(q[2:]) > 0
+            except ValueError:
+                return False
+    return False
+
+
+def negotiated_response(content: Any, accept_encoding: Optional[str] = None,
+                        status_code: int = 200) -> Response:
+    """
+    Encode once; gzip the body when the client accepts it and it is large
+    enough for compression to pay off (batch responses)
+    """
+    body = dumps(content)
+    headers = {"Vary": "Accept-Encoding"}
+    if len(body) >= GZIP_MIN_BYTES and accepts_gzip(accept_encoding):
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
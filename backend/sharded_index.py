@@ -0,0 +1,259 @@
+"""
+SCATTER-GATHER SEARCH ACROSS INDEX SHARDS
+Recipes are partitioned over N LocalVectorIndex shards (by id hash or by goal);
+queries fan out in parallel and the per-shard top-k lists are merged with a heap
+"""
+
+import heapq
+import threading
+import time
+import zlib
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List, Dict, Any, Optional, Tuple
+
+from vector_index import LocalVectorIndex
+from write_ahead_log import WriteAheadLog
+from index_snapshot import open_snapshot
+
+
+PARTITIONS = ["hash", "goal"]
+GOAL_SHARDS = {"lose_weight": 0, "gain_weight": 1}
+
+
+class ShardedVectorIndex:
+    """
+    Same interface as LocalVectorIndex, backed by several shards.
+    A query waits at most `deadline_ms` for the shards; shards that are slow,
+    failing or missing (None) are left out and the hits are marked partial.
+    """
+
+    def __init__(self, shards: List[Optional[LocalVectorIndex]], partition: str = "hash",
+                 deadline_ms: float = 200.0):
+        if partition not in PARTITIONS:
+            raise ValueError(f"Partition must be one of {PARTITIONS}")
+        if partition == "goal" and len(shards) < len(GOAL_SHARDS):
+            raise ValueError(f"Goal partitioning needs at least {len(GOAL_SHARDS)} shards")
+
+        self.shards = shards
+        self.partition = partition
+        self.deadline_ms = deadline_ms
+        self.pool = ThreadPoolExecutor(max_workers=max(2, 2 * len(shards)), thread_name_prefix="shard")
+        self._stats_lock = threading.Lock()
+        self.stats = {"queries": 0, "partial_queries": 0, "shard_timeouts": 0, "shard_errors": 0}
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def shard_of(recipe_id: str, record: Dict[str, Any], num_shards: int, partition: str) -> int:
+        """Shard number for a recipe"""
+        if partition == "goal" and record.get("goal") in GOAL_SHARDS:
+            return GOAL_SHARDS[record["goal"]]
+        return zlib.crc32(recipe_id.encode("utf-8")) % num_shards
+
+    @classmethod
+    def build(cls, ids: List[str], embeddings: np.ndarray, records: List[Dict[str, Any]],
+              num_shards: int, partition: str = "hash", wal_path: Optional[str] = None,
+              deadline_ms: float = 200.0) -> "ShardedVectorIndex":
+        """Partition a catalog into freshly built shards (one WAL per shard)"""
+        buckets = [[] for _ in range(num_shards)]
+        for row, (recipe_id, record) in enumerate(zip(ids, records)):
+            buckets[cls.shard_of(recipe_id, record, num_shards, partition)].append(row)
+
+        embeddings = np.asarray(embeddings)
+        shards = []
+        for shard_number, rows in enumerate(buckets):
+            shards.append(LocalVectorIndex(
+                ids=[ids[row] for row in rows],
+                embeddings=embeddings[rows] if rows else np.zeros((0, 0), dtype=np.float32),
+                records=[records[row] for row in rows],
+                wal=WriteAheadLog(f"{wal_path}.shard{shard_number}") if wal_path else None
+            ))
+        return cls(shards, partition, deadline_ms)
+
+    @classmethod
+    def from_snapshots(cls, snapshot_path: str, num_shards: int, partition: str = "hash",
+                       wal_path: Optional[str] = None, deadline_ms: float = 200.0) -> Optional["ShardedVectorIndex"]:
+        """Map one snapshot per shard; None unless every shard snapshot is usable"""
+        shards = []
+        for shard_number in range(num_shards):
+            snapshot = open_snapshot(f"{snapshot_path}.shard{shard_number}")
+            if snapshot is None:
+                return None
+            wal = WriteAheadLog(f"{wal_path}.shard{shard_number}") if wal_path else None
+            shards.append(LocalVectorIndex.from_snapshot(snapshot, wal=wal))
+        return cls(shards, partition, deadline_ms)
+
+    def _live_shards(self) -> List[LocalVectorIndex]:
+        return [shard for shard in self.shards if shard is not None]
+
+    def replay_wal(self) -> int:
+        """Replay each shard's WAL past the shard's own position (its snapshot seq, or 0)"""
+        return sum(shard.replay_wal(after_seq=shard.seq) for shard in self._live_shards())
+
+    # ------------------------------------------------------------------
+    # Mutations (routed to the owning shard)
+    # ------------------------------------------------------------------
+
+    def upsert(self, recipe_id: str, embedding: np.ndarray, record: Dict[str, Any]) -> bool:
+        target = self.shard_of(recipe_id, record, len(self.shards), self.partition)
+        replaced = False
+        if self.partition == "goal":
+            # The goal may have changed: drop the copy held by any other shard
+            for shard_number, shard in enumerate(self.shards):
+                if shard is not None and shard_number != target and shard.delete(recipe_id):
+                    replaced = True
+        if self.shards[target] is None:
+            raise RuntimeError(f"Shard {target} is unavailable")
+        return self.shards[target].upsert(recipe_id, embedding, record) or replaced
+
+    def delete(self, recipe_id: str) -> bool:
+        if self.partition == "hash":
+            shard = self.shards[zlib.crc32(recipe_id.encode("utf-8")) % len(self.shards)]
+            return shard is not None and shard.delete(recipe_id)
+        return any([shard.delete(recipe_id) for shard in self._live_shards()])
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def _target_shards(self, filters: Optional[Dict[str, Dict[str, Any]]]) -> List[int]:
+        """Goal partitioning lets an eq-goal filter skip the other shards"""
+        if self.partition == "goal" and filters and "goal" in filters:
+            goal = filters["goal"].get("eq")
+            if goal in GOAL_SHARDS:
+                return [GOAL_SHARDS[goal]]
+        return list(range(len(self.shards)))
+
+    def search_with_status(self, query_embedding: np.ndarray, n_results: int = 3,
+                           filters: Optional[Dict[str, Dict[str, Any]]] = None,
+                           deadline_ms: Optional[float] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Scatter to the shards, gather what arrives before the deadline, heap-merge top-k"""
+        deadline_ms = self.deadline_ms if deadline_ms is None else deadline_ms
+        targets = self._target_shards(filters)
+
+        futures = {}
+        missing = 0
+        for shard_number in targets:
+            shard = self.shards[shard_number]
+            if shard is None:
+                missing += 1
+                continue
+            futures[self.pool.submit(shard.search, query_embedding, n_results, filters)] = shard_number
+
+        start = time.perf_counter()
+        done, not_done = wait(list(futures.keys()), timeout=deadline_ms / 1000.0)
+
+        shard_results, errors = [], 0
+        for future in done:
+            try:
+                shard_results.append(future.result())
+            except Exception as e:
+                errors += 1
+                print(f"   ⚠️  Shard {futures[future]} search failed: {e}")
+
+        hits = heapq.nlargest(
+            n_results,
+            (hit for result in shard_results for hit in result),
+            key=lambda hit: hit["similarity"]
+        )
+
+        partial = bool(missing or errors or not_done)
+        with self._stats_lock:
+            self.stats["queries"] += 1
+            self.stats["partial_queries"] += int(partial)
+            self.stats["shard_timeouts"] += len(not_done)
+            self.stats["shard_errors"] += errors + missing
+
+        status = {
+            "shards_queried": len(targets),
+            "shards_answered": len(done) - errors,
+            "partial": partial,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 2)
+        }
+        return hits, status
+
+    def search(self, query_embedding: np.ndarray, n_results: int = 3,
+               filters: Optional[Dict[str, Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """Merged top-k; hits from an incomplete fan-out carry "partial": True"""
+        hits, status = self.search_with_status(query_embedding, n_results, filters)
+        if status["partial"]:
+            hits = [dict(hit, partial=True) for hit in hits]
+        return hits
+
+    def get(self, recipe_id: str):
+        for shard in self._live_shards():
+            entry = shard.get(recipe_id)
+            if entry is not None:
+                return entry
+        return None
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._live_shards())
+
+    @property
+    def seq(self) -> int:
+        """Change counter: grows whenever any shard is written"""
+        return sum(shard.seq for shard in self._live_shards())
+
+    @property
+    def version(self) -> int:
+        return sum(shard.version for shard in self._live_shards())
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    def start_compactor(self, interval_seconds: float = 30.0, min_pending: int = 64):
+        for shard in self._live_shards():
+            shard.start_compactor(interval_seconds, min_pending)
+
+    def compact(self) -> Dict[str, int]:
+        totals = {"folded": 0, "dropped": 0}
+        for shard in self._live_shards():
+            for key, value in shard.compact().items():
+                totals[key] += value
+        return totals
+
+    def pending_mutations(self) -> int:
+        return sum(shard.pending_mutations() for shard in self._live_shards())
+
+    def wal_bytes(self) -> int:
+        return sum(shard.wal_bytes() for shard in self._live_shards())
+
+    def export_live(self) -> Tuple[List[str], np.ndarray, List[Dict[str, Any]], int]:
+        ids, parts, records = [], [], []
+        for shard in self._live_shards():
+            shard_ids, shard_embeddings, shard_records, _ = shard.export_live()
+            ids.extend(shard_ids)
+            records.extend(shard_records)
+            if len(shard_ids):
+                parts.append(shard_embeddings)
+        embeddings = np.vstack(parts) if parts else np.zeros((0, 0), dtype=np.float32)
+        return ids, embeddings, records, self.seq
+
+    def live_records(self) -> List[Dict[str, Any]]:
+        return [record for shard in self._live_shards() for record in shard.live_records()]
+
+    def save_snapshot(self, path: str) -> Dict[str, int]:
+        """One snapshot file per shard: <path>.shard<N>"""
+        totals = {"recipes": 0, "bytes": 0}
+        for shard_number, shard in enumerate(self.shards):
+            if shard is None:
+                continue
+            result = shard.save_snapshot(f"{path}.shard{shard_number}")
+            totals["recipes"] += result["recipes"]
+            totals["bytes"] += result["bytes"]
+        totals["last_seq"] = self.seq
+        return totals
+
+    def memory_footprint(self) -> Dict[str, Any]:
+        footprint = {"shards": len(self.shards), "shards_missing": len(self.shards) - len(self._live_shards())}
+        for shard in self._live_shards():
+            for key, value in shard.memory_footprint().items():
+                footprint[key] = footprint.get(key, 0) + value
+        with self._stats_lock:
+            footprint.update(self.stats)
+        return footprint
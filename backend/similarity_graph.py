@@ -0,0 +1,190 @@
+"""
+PRECOMPUTED RECIPE-TO-RECIPE SIMILARITY GRAPH
+Top-k neighbors for every catalog recipe, stored CSR-style (indptr/indices/scores)
+Built with blocked, multi-threaded matrix multiplication; refreshed incrementally
+
+Offline build from the current snapshot:
+    python similarity_graph.py [k]
+"""
+
+import os
+import sys
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+
+
+GRAPH_PATH = os.getenv("RECIPE_GRAPH_PATH", "data/similarity_graph.npz")
+DEFAULT_K = 10
+BLOCK_SIZE = 1024
+
+
+def _block_neighbors(embeddings: np.ndarray, rows: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k neighbors (excluding self) for a block of rows: one (block x n) matmul"""
+    scores = embeddings[rows] @ embeddings.T
+    scores[np.arange(len(rows)), rows] = -np.inf
+    k = min(k, embeddings.shape[0] - 1)
+    if k <= 0:
+        return np.zeros((len(rows), 0), dtype=np.int32), np.zeros((len(rows), 0), dtype=np.float32)
+
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    return (np.take_along_axis(part, order, axis=1).astype(np.int32),
+            np.take_along_axis(part_scores, order, axis=1).astype(np.float32))
+
+
+def compute_neighbors(embeddings: np.ndarray, k: int = DEFAULT_K, rows: Optional[np.ndarray] = None,
+                      block_size: int = BLOCK_SIZE, workers: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k neighbors for `rows` (default: all) against every row of the
+    L2-normalized `embeddings`. Peak extra memory is block_size x n scores per
+    worker; NumPy releases the GIL inside matmul, so blocks run in parallel.
+    """
+    if rows is None:
+        rows = np.arange(embeddings.shape[0])
+    blocks = [rows[i:i + block_size] for i in range(0, len(rows), block_size)]
+    if not blocks:
+        return np.zeros((0, 0), dtype=np.int32), np.zeros((0, 0), dtype=np.float32)
+
+    workers = workers or min(len(blocks), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda block: _block_neighbors(embeddings, block, k), blocks))
+
+    return np.vstack([r[0] for r in results]), np.vstack([r[1] for r in results])
+
+
+class SimilarityGraph:
+    """
+    Compact neighbor graph: row i's neighbors are
+    indices[indptr[i]:indptr[i+1]] with matching scores (best first).
+    Lookups are O(k).
+    """
+
+    def __init__(self, ids: List[str], indptr: np.ndarray, indices: np.ndarray,
+                 scores: np.ndarray, k: int, index_seq: int = 0):
+        self.ids = list(ids)
+        self.row_of = {recipe_id: row for row, recipe_id in enumerate(self.ids)}
+        self.indptr = indptr
+        self.indices = indices
+        self.scores = scores
+        self.k = k
+        self.index_seq = index_seq
+
+    @classmethod
+    def build(cls, ids: List[str], embeddings: np.ndarray, k: int = DEFAULT_K,
+              index_seq: int = 0) -> "SimilarityGraph":
+        """Compute the full graph (embeddings must be L2-normalized)"""
+        neighbors, scores = compute_neighbors(embeddings, k)
+        width = neighbors.shape[1] if len(neighbors) else 0
+        indptr = np.arange(len(ids) + 1, dtype=np.int64) * width
+        return cls(ids, indptr, neighbors.ravel(), scores.ravel(), k, index_seq)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def neighbors(self, recipe_id: str, k: Optional[int] = None) -> Optional[List[Tuple[str, float]]]:
+        """(neighbor id, cosine similarity) pairs, or None if the recipe is not in the graph"""
+        row = self.row_of.get(recipe_id)
+        if row is None:
+            return None
+        start, end = int(self.indptr[row]), int(self.indptr[row + 1])
+        if k is not None:
+            end = min(end, start + k)
+        return [(self.ids[i], float(s)) for i, s in zip(self.indices[start:end], self.scores[start:end])]
+
+    def refresh(self, ids: List[str], embeddings: np.ndarray, changed: Iterable[str],
+                index_seq: int = 0) -> "SimilarityGraph":
+        """
+        Incrementally rebuild after upserts/deletes. Only rows that can have
+        changed are recomputed:
+        - the changed (new or re-embedded) recipes themselves
+        - rows that pointed at a changed or deleted recipe
+        - rows where a changed recipe now beats the current k-th neighbor
+        Returns a new graph; `ids`/`embeddings` are the current live catalog.
+        """
+        changed = set(changed)
+        row_of = {recipe_id: row for row, recipe_id in enumerate(ids)}
+        n = len(ids)
+        width = min(self.k, max(n - 1, 0))
+
+        # Old row -> new row (-1: deleted); changed recipes are never carried over
+        old_to_new = np.array([row_of.get(recipe_id, -1) for recipe_id in self.ids], dtype=np.int64)
+        changed_old = np.array([recipe_id in changed for recipe_id in self.ids], dtype=bool)
+        counts = np.diff(self.indptr)
+        # Lists shorter than the new width (the catalog grew past them) are recomputed
+        carried = (old_to_new >= 0) & ~changed_old & (counts >= width)
+
+        # Rows that pointed at a changed or deleted recipe
+        stale_edges = (old_to_new[self.indices] < 0) | changed_old[self.indices]
+        owners = np.repeat(np.arange(len(self.ids)), counts)
+        carried &= np.bincount(owners[stale_edges], minlength=len(self.ids)) == 0
+
+        old_rows = np.flatnonzero(carried)
+        new_rows = old_to_new[old_rows]
+
+        changed_rows = np.array(sorted(row_of[r] for r in changed if r in row_of), dtype=np.int64)
+        if len(changed_rows) and len(old_rows) and width:
+            # Rows where a changed recipe now beats the current k-th neighbor:
+            # one (changed x carried) matmul, max over the changed recipes
+            best_changed = (embeddings[changed_rows] @ embeddings[new_rows].T).max(axis=0)
+            kth = self.scores[self.indptr[old_rows] + width - 1]
+            keep = best_changed <= kth
+            old_rows, new_rows = old_rows[keep], new_rows[keep]
+
+        # Carried rows: gather their first `width` edges and renumber them in one step
+        indices = np.zeros((n, width), dtype=np.int32)
+        scores = np.zeros((n, width), dtype=np.float32)
+        if width and len(old_rows):
+            positions = self.indptr[old_rows][:, None] + np.arange(width)
+            indices[new_rows] = old_to_new[self.indices[positions]]
+            scores[new_rows] = self.scores[positions]
+
+        recompute = np.ones(n, dtype=bool)
+        recompute[new_rows] = False
+        recompute = np.flatnonzero(recompute)
+        if len(recompute) and width:
+            new_indices, new_scores = compute_neighbors(embeddings, self.k, rows=recompute)
+            indices[recompute] = new_indices
+            scores[recompute] = new_scores
+
+        indptr = np.arange(n + 1, dtype=np.int64) * width
+        return SimilarityGraph(ids, indptr, indices.ravel(), scores.ravel(), self.k, index_seq)
+
+    def save(self, path: str = GRAPH_PATH):
+        """Persist as .npz (written to a temp file and renamed)"""
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, ids=np.array(self.ids), indptr=self.indptr, indices=self.indices,
+                 scores=self.scores, k=self.k, index_seq=self.index_seq)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = GRAPH_PATH) -> Optional["SimilarityGraph"]:
+        """Load a saved graph, or None if missing/unreadable"""
+        if not os.path.exists(path):
+            return None
+        try:
+            data = np.load(path)
+            return cls([str(i) for i in data["ids"]], data["indptr"], data["indices"],
+                       data["scores"], int(data["k"]), int(data["index_seq"]))
+        except Exception as e:
+            print(f"   ⚠️  Ignoring similarity graph {path}: {e}")
+            return None
+
+    def nbytes(self) -> int:
+        return int(self.indptr.nbytes + self.indices.nbytes + self.scores.nbytes)
+
+
+if __name__ == "__main__":
+    from index_snapshot import open_snapshot
+    from database import SNAPSHOT_PATH
+
+    k = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_K
+    snapshot = open_snapshot(SNAPSHOT_PATH)
+    if snapshot is None:
+        print(f"❌ No snapshot at {SNAPSHOT_PATH}; start the backend once or POST /admin/snapshot")
+        sys.exit(1)
+
+    graph = SimilarityGraph.build(list(snapshot.ids), snapshot.embeddings, k, snapshot.last_seq)
+    graph.save()
+    print(f"✅ Similarity graph: {len(graph)} recipes, k={k}, {graph.nbytes()} bytes -> {GRAPH_PATH}")
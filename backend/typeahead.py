@@ -0,0 +1,268 @@
+"""
+TYPEAHEAD SUGGESTIONS
+Sorted array of prefix keys searched with bisect, over recipe titles and the
+ingredient terms of the catalog, ranked by how many recipes use each term
+"""
+
+import bisect
+import heapq
+import re
+import threading
+import numpy as np
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from nutrition import NAMES, parse_ingredients
+
+
+def normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", text.lower())).strip()
+
+
+class SuggestionIndex:
+    """
+    Each suggestion ("term") is reachable through one or more keys: a title
+    through every word-suffix ("grilled chicken salad", "chicken salad",
+    "salad"), an ingredient through its name.
+
+    Keys live in one sorted array, so a prefix is a contiguous range found
+    with two binary searches. A max segment tree over the key weights (term
+    usage counts) pulls the top-k of that range in O(k log n), so short
+    prefixes matching half the catalog cost the same as long ones.
+
+    Catalog changes update term weights in place (O(log n) per key); keys of
+    brand-new terms go to a small sorted delta that is scanned directly and
+    merged into the main array once it exceeds `merge_threshold`.
+    """
+
+    def __init__(self, merge_threshold: int = 1024):
+        self.merge_threshold = merge_threshold
+        self._lock = threading.RLock()
+
+        self._term_ids = {}      # (kind, text) -> term id
+        self._terms = []         # term id -> (kind, text)
+        self._counts = []        # term id -> number of live recipes using the term
+        self._recipe_terms = {}  # recipe id -> term ids it contributed
+        self._keyed = set()      # term ids whose keys are in the main array or the delta
+
+        self._keys = []            # main: sorted normalized keys
+        self._key_terms = []       # main: term id per key
+        self._term_positions = {}  # main: term id -> key positions
+        self._size = 1
+        self._tree = [0, 0]        # max segment tree over main key weights
+        self._delta = []           # sorted (key, term id) added since the last merge
+        self.built = False
+
+    # ------------------------------------------------------------------
+    # Terms and weights
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _recipe_terms_of(record: Dict[str, Any]) -> List[Tuple[str, str]]:
+        terms = []
+        title = (record.get("title") or "").strip()
+        if title:
+            terms.append(("title", title))
+        for name in sorted({NAMES[row] for row, _, _ in parse_ingredients(record.get("text", ""))}):
+            terms.append(("ingredient", name))
+        return terms
+
+    def _keys_of(self, term_id: int) -> List[str]:
+        kind, text = self._terms[term_id]
+        words = normalize(text).split()
+        if kind == "title":
+            return sorted({" ".join(words[i:]) for i in range(len(words))})
+        return [" ".join(words)] if words else []
+
+    def _weight(self, term_id: int) -> int:
+        """Usage count, ties broken in favor of shorter suggestions; 0 for dead terms"""
+        count = self._counts[term_id]
+        if count <= 0:
+            return 0
+        return count * 1024 + 1023 - min(len(self._terms[term_id][1]), 1023)
+
+    def _term_id(self, kind: str, text: str) -> int:
+        term = (kind, text)
+        if term not in self._term_ids:
+            self._term_ids[term] = len(self._terms)
+            self._terms.append(term)
+            self._counts.append(0)
+        return self._term_ids[term]
+
+    # ------------------------------------------------------------------
+    # Main array + segment tree
+    # ------------------------------------------------------------------
+
+    def _merge(self):
+        """Re-sort all keys of live terms into the main array and rebuild the tree"""
+        live = [term_id for term_id in range(len(self._terms)) if self._counts[term_id] > 0]
+        pairs = sorted((key, term_id) for term_id in live for key in self._keys_of(term_id))
+        self._keys = [key for key, _ in pairs]
+        self._key_terms = [term_id for _, term_id in pairs]
+        self._term_positions = {}
+        for position, term_id in enumerate(self._key_terms):
+            self._term_positions.setdefault(term_id, []).append(position)
+        self._keyed = set(live)
+        self._delta = []
+
+        size = 1
+        while size < max(1, len(pairs)):
+            size *= 2
+        tree = np.zeros(2 * size, dtype=np.int64)
+        tree[size:size + len(pairs)] = [self._weight(term_id) for term_id in self._key_terms]
+        level = size
+        while level > 1:
+            tree[level // 2:level] = np.maximum(tree[level:2 * level:2], tree[level + 1:2 * level:2])
+            level //= 2
+        self._size = size
+        self._tree = tree.tolist()
+
+    def _refresh_weight(self, term_id: int):
+        weight = self._weight(term_id)
+        tree, size = self._tree, self._size
+        for position in self._term_positions.get(term_id, ()):
+            node = position + size
+            tree[node] = weight
+            node //= 2
+            while node:
+                tree[node] = max(tree[2 * node], tree[2 * node + 1])
+                node //= 2
+
+    def _range_argmax(self, lo: int, hi: int) -> Tuple[int, int]:
+        """(max weight, position) over main keys [lo, hi); weight 0 if empty or all dead"""
+        tree, size = self._tree, self._size
+        best, best_node = 0, -1
+        left, right = lo + size, hi + size
+        while left < right:
+            if left & 1:
+                if tree[left] > best:
+                    best, best_node = tree[left], left
+                left += 1
+            if right & 1:
+                right -= 1
+                if tree[right] > best:
+                    best, best_node = tree[right], right
+            left //= 2
+            right //= 2
+        if best_node < 0:
+            return 0, -1
+        node = best_node
+        while node < size:
+            node = 2 * node if tree[2 * node] == tree[node] else 2 * node + 1
+        return best, node - size
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    def build(self, records_fn: Callable[[], Iterable[Dict[str, Any]]]):
+        """
+        Full (re)load: count every recipe's terms, then sort all keys once.
+        `records_fn` is called under the index lock, so catalog updates that
+        arrive during the build wait and are applied on top of it.
+        """
+        with self._lock:
+            self._counts = [0] * len(self._terms)
+            self._recipe_terms = {}
+            for record in records_fn():
+                term_ids = [self._term_id(kind, text) for kind, text in self._recipe_terms_of(record)]
+                for term_id in term_ids:
+                    self._counts[term_id] += 1
+                self._recipe_terms[record["id"]] = term_ids
+            self._merge()
+            self.built = True
+
+    def add_recipe(self, record: Dict[str, Any]):
+        """Count a new or replaced recipe's title and ingredients"""
+        with self._lock:
+            self.remove_recipe(record["id"])
+            term_ids = [self._term_id(kind, text) for kind, text in self._recipe_terms_of(record)]
+            for term_id in term_ids:
+                self._counts[term_id] += 1
+                if term_id in self._keyed:
+                    self._refresh_weight(term_id)
+                else:
+                    self._keyed.add(term_id)
+                    for key in self._keys_of(term_id):
+                        bisect.insort(self._delta, (key, term_id))
+            self._recipe_terms[record["id"]] = term_ids
+            if len(self._delta) > self.merge_threshold:
+                self._merge()
+
+    def remove_recipe(self, recipe_id: str) -> bool:
+        with self._lock:
+            term_ids = self._recipe_terms.pop(recipe_id, None)
+            if term_ids is None:
+                return False
+            for term_id in term_ids:
+                self._counts[term_id] -= 1
+                self._refresh_weight(term_id)
+            return True
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def suggest(self, query: str, limit: int = 8) -> List[Dict[str, Any]]:
+        """Top terms with a key starting with the query: exact key matches first, then by usage"""
+        prefix = normalize(query)
+        if not prefix or limit < 1:
+            return []
+        upper = prefix + "￿"
+
+        with self._lock:
+            ranked = {}  # term id -> (exact, weight)
+
+            # Main array: best-first expansion of the prefix range over the segment tree
+            lo = bisect.bisect_left(self._keys, prefix)
+            hi = bisect.bisect_left(self._keys, upper, lo)
+            position = lo
+            while position < hi and self._keys[position] == prefix:
+                term_id = self._key_terms[position]
+                if self._counts[term_id] > 0:
+                    ranked[term_id] = (True, self._weight(term_id))
+                position += 1
+
+            heap = []
+            weight, position = self._range_argmax(lo, hi)
+            if weight > 0:
+                heap.append((-weight, position, lo, hi))
+            found = 0
+            while heap and found < limit:
+                weight, position, left, right = heapq.heappop(heap)
+                term_id = self._key_terms[position]
+                if term_id not in ranked:
+                    ranked[term_id] = (False, -weight)
+                    found += 1
+                for sub_lo, sub_hi in ((left, position), (position + 1, right)):
+                    if sub_lo < sub_hi:
+                        sub_weight, sub_position = self._range_argmax(sub_lo, sub_hi)
+                        if sub_weight > 0:
+                            heapq.heappush(heap, (-sub_weight, sub_position, sub_lo, sub_hi))
+
+            # Delta: small, scanned directly
+            start = bisect.bisect_left(self._delta, (prefix,))
+            end = bisect.bisect_left(self._delta, (upper,), start)
+            for key, term_id in self._delta[start:end]:
+                if self._counts[term_id] > 0:
+                    exact = key == prefix or ranked.get(term_id, (False, 0))[0]
+                    ranked[term_id] = (exact, self._weight(term_id))
+
+            best = heapq.nlargest(limit, ranked.items(), key=lambda item: item[1])
+            return [
+                {"text": self._terms[term_id][1], "kind": self._terms[term_id][0], "count": self._counts[term_id]}
+                for term_id, _ in best
+            ]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "keys": len(self._keys),
+                "delta_keys": len(self._delta),
+                "terms": len(self._terms),
+                "live_terms": sum(1 for count in self._counts if count > 0),
+                "recipes": len(self._recipe_terms)
+            }
+
+    def nbytes(self) -> int:
+        with self._lock:
+            return len(self._tree) * 8 + sum(len(key) + 57 for key in self._keys) + len(self._key_terms) * 8
@@ -0,0 +1,367 @@
+"""
+LOCAL IN-PROCESS VECTOR INDEX
+Normalized embedding matrix + columnar metadata index for filtered top-k search
+Supports incremental upsert/delete (delta segment + tombstones) with background compaction
+"""
+
+import threading
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple
+
+from metadata_index import MetadataIndex, matches
+from write_ahead_log import WriteAheadLog, WALGapError
+from index_snapshot import IndexSnapshot, write_snapshot
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize rows so that a dot product is cosine similarity"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k highest scores, best first (argpartition, no full sort)"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        part = np.argpartition(-scores, k - 1)[:k]
+    else:
+        part = np.arange(len(scores))
+    return part[np.argsort(-scores[part], kind="stable")]
+
+
+class LocalVectorIndex:
+    """
+    Brute-force cosine index over the recipe catalog.
+    Filters are resolved first against the metadata index, and only the
+    candidate rows are scored, so selective filters never touch the whole matrix.
+
+    Writes never rebuild the main segment:
+    - upserts go to a small delta segment (and tombstone any older main row)
+    - deletes tombstone the main row or drop the delta entry
+    - compact() folds delta + tombstones into a fresh main segment
+    Every mutation is logged to the write-ahead log before it is applied.
+    """
+
+    def __init__(self, ids: List[str], embeddings: np.ndarray, records: List[Dict[str, Any]],
+                 wal: Optional[WriteAheadLog] = None):
+        self._lock = threading.RLock()
+        self.wal = wal
+        self.seq = 0
+        self.version = 0  # bumped by every visible content change (not by compaction)
+        self._replaying = False
+
+        self._set_main(list(ids), embeddings, list(records))
+        self.delta = {}       # recipe_id -> (seq, normalized embedding, record)
+        self.tombstones = {}  # recipe_id -> seq of the delete/replace that killed it
+
+        self._compactor = None
+        self._stop_compactor = threading.Event()
+
+    def _set_main(self, ids: List[str], embeddings: np.ndarray, records: List[Dict[str, Any]],
+                  metadata: Optional[MetadataIndex] = None, normalized: bool = False):
+        self.ids = ids
+        self.records = records
+        if not len(ids):
+            self.embeddings = np.zeros((0, 0), dtype=np.float32)
+        elif normalized:
+            self.embeddings = embeddings
+        else:
+            self.embeddings = normalize_rows(embeddings)
+        self.metadata = metadata if metadata is not None else MetadataIndex(records)
+        self._row_of = None  # built on first use: a mapped snapshot would decode every id up front
+        self.live = np.ones(len(ids), dtype=bool)
+
+    @property
+    def row_of(self) -> Dict[str, int]:
+        """recipe id -> main segment row"""
+        with self._lock:
+            if self._row_of is None:
+                self._row_of = {recipe_id: row for row, recipe_id in enumerate(self.ids)}
+            return self._row_of
+
+    @classmethod
+    def from_snapshot(cls, snapshot: IndexSnapshot, wal: Optional[WriteAheadLog] = None) -> "LocalVectorIndex":
+        """
+        Serve directly from a memory-mapped snapshot: the main segment arrays
+        are views into the mapping, nothing is re-embedded or re-sorted.
+        WAL entries newer than the snapshot should be replayed afterwards.
+        """
+        index = cls([], np.zeros((0, 0), dtype=np.float32), [], wal=wal)
+        index._set_main(snapshot.ids, snapshot.embeddings, snapshot.records,
+                        metadata=snapshot.metadata, normalized=True)
+        index.seq = snapshot.last_seq
+        return index
+
+    def export_live(self) -> Tuple[List[str], np.ndarray, List[Dict[str, Any]], int]:
+        """
+        Materialize main + delta as (ids, normalized embeddings, records, seq).
+        Main-segment arrays are never mutated in place, so only the live mask
+        and the delta are copied under the lock; the gather runs outside it.
+        """
+        with self._lock:
+            ids, records, embeddings = self.ids, self.records, self.embeddings
+            live = self.live.copy()
+            delta_items = list(self.delta.items())
+            last_seq = self.seq
+
+        rows = np.flatnonzero(live)
+        live_ids = [ids[row] for row in rows]
+        live_records = [records[row] for row in rows]
+        parts = [embeddings[rows]] if len(rows) else []
+        for recipe_id, (_, embedding, record) in delta_items:
+            live_ids.append(recipe_id)
+            live_records.append(record)
+            parts.append(embedding.reshape(1, -1))
+        live_embeddings = np.vstack(parts) if parts else np.zeros((0, 0), dtype=np.float32)
+        return live_ids, live_embeddings, live_records, last_seq
+
+    def live_records(self) -> List[Dict[str, Any]]:
+        """Records of main + delta, without gathering embeddings"""
+        with self._lock:
+            records = self.records
+            live = self.live.copy()
+            delta_records = [record for _, _, record in self.delta.values()]
+        return [records[row] for row in np.flatnonzero(live)] + delta_records
+
+    def save_snapshot(self, path: str) -> Dict[str, int]:
+        """Write main + delta as a new snapshot, then drop the WAL entries it covers"""
+        ids, embeddings, records, last_seq = self.export_live()
+
+        size = write_snapshot(path, ids, embeddings, records, last_seq)
+        if self.wal is not None:
+            self.wal.truncate(keep_after_seq=last_seq)
+
+        return {"recipes": len(ids), "bytes": size, "last_seq": last_seq}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self.live.sum()) + len(self.delta)
+
+    # ------------------------------------------------------------------
+    # Mutations
+    # ------------------------------------------------------------------
+
+    def upsert(self, recipe_id: str, embedding: np.ndarray, record: Dict[str, Any],
+               seq: Optional[int] = None) -> bool:
+        """Insert or replace a recipe. Returns True if it replaced an existing one."""
+        with self._lock:
+            seq = self._next_seq(seq)
+            if self.wal is not None and not self._replaying:
+                self.wal.log_upsert(seq, recipe_id, embedding, record)
+
+            existed = self._tombstone_main(recipe_id, seq) or recipe_id in self.delta
+            self.delta[recipe_id] = (seq, normalize_rows(embedding)[0], dict(record, id=recipe_id))
+            self.version += 1
+            return existed
+
+    def delete(self, recipe_id: str, seq: Optional[int] = None) -> bool:
+        """Delete a recipe. Returns False if it was not in the index."""
+        with self._lock:
+            if recipe_id not in self.delta and not self._is_live_in_main(recipe_id):
+                return False
+
+            seq = self._next_seq(seq)
+            if self.wal is not None and not self._replaying:
+                self.wal.log_delete(seq, recipe_id)
+
+            self.delta.pop(recipe_id, None)
+            self._tombstone_main(recipe_id, seq)
+            # Also recorded for delta-only ids, so a delete racing a compaction
+            # still removes the row once the delta has been folded into main
+            self.tombstones[recipe_id] = seq
+            self.version += 1
+            return True
+
+    def replay_wal(self, after_seq: int = 0) -> int:
+        """
+        Re-apply logged mutations on top of the current state (startup
+        recovery). Raises WALGapError when the log was truncated past
+        `after_seq`: the state is missing writes the log no longer holds.
+        """
+        if self.wal is None:
+            return 0
+        checkpoint = self.wal.checkpoint_seq()
+        if after_seq < checkpoint:
+            raise WALGapError(f"{self.wal.path} only retains entries after seq {checkpoint}, "
+                              f"replay from seq {after_seq} would lose every write in between")
+
+        applied = 0
+        with self._lock:
+            self._replaying = True
+            try:
+                for entry in self.wal.replay(after_seq):
+                    if entry["op"] == "upsert":
+                        self.upsert(entry["id"], entry["embedding"], entry["record"], seq=entry["seq"])
+                    else:
+                        self.delete(entry["id"], seq=entry["seq"])
+                    applied += 1
+            finally:
+                self._replaying = False
+        return applied
+
+    def _next_seq(self, seq: Optional[int]) -> int:
+        self.seq = max(self.seq + 1, seq or 0)
+        return self.seq
+
+    def _is_live_in_main(self, recipe_id: str) -> bool:
+        row = self.row_of.get(recipe_id)
+        return row is not None and bool(self.live[row])
+
+    def _tombstone_main(self, recipe_id: str, seq: int) -> bool:
+        if not self._is_live_in_main(recipe_id):
+            return False
+        self.live[self.row_of[recipe_id]] = False
+        self.tombstones[recipe_id] = seq
+        return True
+
+    # ------------------------------------------------------------------
+    # Compaction
+    # ------------------------------------------------------------------
+
+    def compact(self) -> Dict[str, int]:
+        """
+        Fold the delta segment and tombstones into a new main segment.
+        The expensive rebuild runs outside the lock; writes that land
+        meanwhile stay in the delta and are carried over.
+        """
+        with self._lock:
+            if not self.delta and not self.tombstones:
+                return {"folded": 0, "dropped": 0}
+            frozen_seq = self.seq
+            keep_rows = np.flatnonzero(self.live)
+            ids = [self.ids[row] for row in keep_rows]
+            records = [self.records[row] for row in keep_rows]
+            parts = [self.embeddings[keep_rows]] if len(keep_rows) else []
+            delta_items = list(self.delta.items())
+            dropped = len(self.tombstones)
+
+        for recipe_id, (_, embedding, record) in delta_items:
+            ids.append(recipe_id)
+            records.append(record)
+            parts.append(embedding.reshape(1, -1))
+        embeddings = np.vstack(parts) if parts else np.zeros((0, 0), dtype=np.float32)
+        metadata = MetadataIndex(records)
+
+        with self._lock:
+            self.ids = ids
+            self.records = records
+            self.embeddings = embeddings
+            self.metadata = metadata
+            self._row_of = {recipe_id: row for row, recipe_id in enumerate(ids)}
+            self.live = np.ones(len(ids), dtype=bool)
+
+            # Carry over writes that arrived during the rebuild
+            late_delta = {k: v for k, v in self.delta.items() if v[0] > frozen_seq}
+            late_tombstones = {k: s for k, s in self.tombstones.items() if s > frozen_seq}
+            self.delta = {}
+            self.tombstones = {}
+            for recipe_id, seq in late_tombstones.items():
+                self._tombstone_main(recipe_id, seq)
+            for recipe_id, entry in late_delta.items():
+                self._tombstone_main(recipe_id, entry[0])
+                self.delta[recipe_id] = entry
+
+        return {"folded": len(delta_items), "dropped": dropped}
+
+    def start_compactor(self, interval_seconds: float = 30.0, min_pending: int = 64):
+        """Background thread that compacts once enough mutations are pending"""
+        if self._compactor is not None:
+            return
+
+        def loop():
+            while not self._stop_compactor.wait(interval_seconds):
+                if self.pending_mutations() >= min_pending:
+                    try:
+                        self.compact()
+                    except Exception as e:
+                        print(f"   ⚠️  Compaction failed: {e}")
+
+        self._compactor = threading.Thread(target=loop, name="index-compactor", daemon=True)
+        self._compactor.start()
+
+    def stop_compactor(self):
+        self._stop_compactor.set()
+
+    def wal_bytes(self) -> int:
+        """On-disk size of this index's write-ahead log"""
+        return self.wal.size_bytes() if self.wal is not None else 0
+
+    def pending_mutations(self) -> int:
+        """Delta entries + tombstones not yet folded into the main segment"""
+        with self._lock:
+            return len(self.delta) + len(self.tombstones)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def get(self, recipe_id: str) -> Optional[Tuple[np.ndarray, Dict[str, Any]]]:
+        """Normalized embedding and record for a live recipe"""
+        with self._lock:
+            if recipe_id in self.delta:
+                _, embedding, record = self.delta[recipe_id]
+                return embedding, record
+            if self._is_live_in_main(recipe_id):
+                row = self.row_of[recipe_id]
+                return self.embeddings[row], self.records[row]
+            return None
+
+    def search(self, query_embedding: np.ndarray, n_results: int = 3,
+               filters: Optional[Dict[str, Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """Top-k live recipes by cosine similarity among those matching the filters"""
+        query = normalize_rows(query_embedding)[0]
+
+        with self._lock:
+            ids, records, embeddings = self.ids, self.records, self.embeddings
+            metadata, live = self.metadata, self.live
+            delta = list(self.delta.items())
+
+        hits = []
+        if ids:
+            mask = metadata.query(filters) if filters else np.ones(len(ids), dtype=bool)
+            rows = np.flatnonzero(mask & live)
+            if len(rows):
+                scores = embeddings[rows] @ query
+                best = top_k(scores, n_results)
+                hits = [(float(scores[i]), ids[rows[i]], records[rows[i]]) for i in best]
+
+        for recipe_id, (_, embedding, record) in delta:
+            if filters and not matches(record, filters):
+                continue
+            hits.append((float(embedding @ query), recipe_id, record))
+
+        hits.sort(key=lambda hit: -hit[0])
+        return [
+            {"id": recipe_id, "similarity": score, "record": record}
+            for score, recipe_id, record in hits[:n_results]
+        ]
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the vectors and the metadata index"""
+        with self._lock:
+            delta_bytes = sum(entry[1].nbytes for entry in self.delta.values())
+            return int(self.embeddings.nbytes) + self.metadata.nbytes() + delta_bytes
+
+    def memory_footprint(self) -> Dict[str, Any]:
+        """
+        Byte estimates for the memory report. Main-segment arrays that are
+        views of a snapshot mapping are file-backed (shared page cache), so
+        they are reported separately from heap bytes.
+        """
+        with self._lock:
+            mapped = not self.embeddings.flags.writeable and self.embeddings.size > 0
+            main_bytes = int(self.embeddings.nbytes) + self.metadata.nbytes()
+            return {
+                "heap_bytes": (0 if mapped else main_bytes) + len(self.live)
+                              + sum(entry[1].nbytes for entry in self.delta.values()),
+                "mapped_snapshot_bytes": main_bytes if mapped else 0,
+                "main_rows": len(self.ids),
+                "delta_rows": len(self.delta),
+                "tombstones": len(self.tombstones)
+            }
@@ -0,0 +1,138 @@
+"""
+APPEND-ONLY WRITE-AHEAD LOG FOR RECIPE INDEX MUTATIONS
+One JSON line per upsert/delete, fsync'd before the mutation is applied
+"""
+
+import base64
+import json
+import os
+import threading
+import numpy as np
+from typing import Dict, Any, Iterator, Optional
+
+
+def encode_vector(vector: np.ndarray) -> str:
+    """float32 vector -> base64 string (much smaller than a JSON float list)"""
+    return base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode("ascii")
+
+
+def decode_vector(data: str) -> np.ndarray:
+    """base64 string -> float32 vector"""
+    return np.frombuffer(base64.b64decode(data), dtype=np.float32).copy()
+
+
+class WALGapError(RuntimeError):
+    """Replay would start before entries the log has already dropped"""
+
+
+class WriteAheadLog:
+    """
+    Durable, append-only mutation log with tombstone entries for deletes.
+    A truncated log starts with a checkpoint marker recording the highest
+    seq it dropped, so a snapshot older than that can be detected.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _append(self, entry: Dict[str, Any]):
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def log_upsert(self, seq: int, recipe_id: str, embedding: np.ndarray, record: Dict[str, Any]):
+        """Record an insert or replace"""
+        self._append({
+            "seq": seq,
+            "op": "upsert",
+            "id": recipe_id,
+            "embedding": encode_vector(embedding),
+            "record": record
+        })
+
+    def log_delete(self, seq: int, recipe_id: str):
+        """Record a tombstone"""
+        self._append({"seq": seq, "op": "delete", "id": recipe_id})
+
+    def replay(self, after_seq: int = 0) -> Iterator[Dict[str, Any]]:
+        """
+        Yield logged mutations in order, skipping those with seq <= after_seq.
+        A torn trailing line (crash mid-write) is ignored.
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"   ⚠️  Skipping corrupt WAL entry in {self.path}")
+                    continue
+                if entry.get("seq", 0) <= after_seq or entry["op"] == "checkpoint":
+                    continue
+                if entry["op"] == "upsert":
+                    entry["embedding"] = decode_vector(entry["embedding"])
+                yield entry
+
+    def last_seq(self) -> int:
+        """Highest sequence number in the log, checkpoint included (0 if empty)"""
+        seq = self.checkpoint_seq()
+        for entry in self.replay():
+            seq = max(seq, entry["seq"])
+        return seq
+
+    def checkpoint_seq(self) -> int:
+        """
+        Highest seq no longer in the log: a snapshot must cover at least this
+        much for a replay on top of it to be complete (0 if nothing was dropped)
+        """
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            first = f.readline().strip()
+        try:
+            entry = json.loads(first)
+        except json.JSONDecodeError:
+            return 0  # empty log or torn first line
+        return entry["seq"] if entry["op"] == "checkpoint" else max(0, entry["seq"] - 1)
+
+    def size_bytes(self) -> int:
+        """Current on-disk size of the log"""
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def truncate(self, keep_after_seq: Optional[int] = None):
+        """
+        Drop entries with seq <= keep_after_seq (all entries if None) and
+        record keep_after_seq as the checkpoint.
+        Rewritten through a temp file + rename so a crash never loses the log.
+        """
+        with self._lock:
+            kept = []
+            if keep_after_seq is not None:
+                kept.append(json.dumps({"seq": keep_after_seq, "op": "checkpoint"}, separators=(",", ":")) + "\n")
+            if keep_after_seq is not None and os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                            if entry.get("seq", 0) > keep_after_seq and entry["op"] != "checkpoint":
+                                kept.append(line)
+                        except json.JSONDecodeError:
+                            continue
+
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.writelines(kept)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
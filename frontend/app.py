@@ -9,6 +9,18 @@ app = Flask(__name__)
 # Backend API URL
 BACKEND_URL = os.getenv("BACKEND_URL", "http://backend:8000")
 
+def fetch_nutrition(recipe_text):
+    """Macro totals from the backend nutrition engine, or None if unavailable"""
+    try:
+        response = requests.post(f"{BACKEND_URL}/nutrition",
+                                  json={"texts": [recipe_text], "include_ingredients": False},
+                                  timeout=2)
+        response.raise_for_status()
+        result = response.json()["results"][0]
+        return result if result.get("ingredients_matched") else None
+    except Exception:
+        return None
+
 @app.route('/')
 def dashboard():
     return render_template('dashboard.html')
@@ -226,6 +238,22 @@ def analyze():
                 
             base_protein = 45 if has_protein else 20
         
+        # Real macros from ingredient quantities; keyword estimate if the backend is down
+        nutrition = fetch_nutrition(recipe_text)
+        if nutrition:
+            calorie_estimate = nutrition["calories"]
+            protein_g = nutrition["protein_g"]
+            carbs_g = nutrition["carbs_g"]
+            fats_g = nutrition["fats_g"]
+            nutrition_source = "ingredient_quantities"
+        else:
+            # Deterministic split of the estimate: ~45% carbs, ~30% fat by energy
+            calorie_estimate = base_calories
+            protein_g = base_protein
+            carbs_g = round(base_calories * 0.45 / 4)
+            fats_g = round(base_calories * 0.30 / 9)
+            nutrition_source = "keyword_estimate"
+        
         # =============================================
         # FIXED: BETTER PERCENTAGE LOGIC
         # =============================================
@@ -294,10 +322,11 @@ def analyze():
             "is_healthy": calorie_score <= 4 or (calorie_score > 4 and has_vegetables and has_protein),
             "reason": reason,
             "recommendations": recommendations[:4],
-            "calorie_estimate": base_calories,
-            "protein_g": base_protein,
-            "carbs_g": random.randint(30, 80),
-            "fats_g": random.randint(10, 35),
+            "calorie_estimate": calorie_estimate,
+            "protein_g": protein_g,
+            "carbs_g": carbs_g,
+            "fats_g": fats_g,
+            "nutrition_source": nutrition_source,
             "analysis_notes": f"Calorie density score: {calorie_score}, Protein: {'Yes' if has_protein else 'No'}, Veggies: {'Yes' if has_vegetables else 'No'}",
             "analysis_method": "keyword_fallback"
         })
@@ -305,6 +334,18 @@ def analyze():
     except Exception as e:
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
+@app.route('/suggest')
+def suggest():
+    """Typeahead suggestions from the backend (empty list if unavailable)"""
+    try:
+        response = requests.get(f"{BACKEND_URL}/suggest",
+                                params={"q": request.args.get('q', ''), "limit": request.args.get('limit', 8)},
+                                timeout=1)
+        response.raise_for_status()
+        return jsonify(response.json())
+    except Exception:
+        return jsonify({"query": request.args.get('q', ''), "suggestions": [], "count": 0})
+
 @app.route('/pipeline-info')
 def pipeline_info():
     """Get ML pipeline information"""
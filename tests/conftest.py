@@ -0,0 +1,9 @@
+"""
+Backend modules import each other by bare name (the server runs from
+backend/), so the tests put that directory on the path the same way
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
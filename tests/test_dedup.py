@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from dedup import MinHasher, NearDuplicateIndex, shingles
+
+
+PASTA = ("boil the pasta in salted water then toss with garlic olive oil and parmesan cheese "
+         "and serve hot with black pepper and fresh basil leaves")
+PASTA_VARIANT = PASTA.replace("basil leaves", "basil sprigs")
+SOUP = "simmer lentils carrots and onions in vegetable stock until soft then blend until smooth"
+
+
+def index(**kwargs):
+    return NearDuplicateIndex(str.split, **kwargs)
+
+
+def records(*texts):
+    return [{"id": f"r{i}", "text": text} for i, text in enumerate(texts)]
+
+
+def test_estimated_similarity_tracks_jaccard():
+    a, b = shingles(PASTA.split()), shingles(PASTA_VARIANT.split())
+    jaccard = len(np.intersect1d(a, b)) / len(np.union1d(a, b))
+    hasher = MinHasher(num_perm=512)
+    estimate = np.mean(hasher.signature(a) == hasher.signature(b))
+    assert abs(estimate - jaccard) < 0.1
+
+
+def test_identical_text_is_found_and_distinct_text_is_not():
+    dedup = index(threshold=0.8)
+    dedup.add("pasta", dedup.signature(PASTA))
+    dedup.add("soup", dedup.signature(SOUP))
+
+    match = dedup.find_duplicate(dedup.signature(PASTA), exclude="other")
+    assert match == ("pasta", 1.0)
+    assert dedup.find_duplicate(dedup.signature(PASTA), exclude="pasta") is None
+    assert dedup.find_duplicate(dedup.signature("whisk eggs with sugar and fold into melted chocolate")) is None
+
+
+def test_short_texts_get_no_signature():
+    dedup = index()
+    assert dedup.signature("") is None
+    assert dedup.signature("toast") is None
+    assert dedup.find_duplicate(None) is None
+    # Two different one-line recipes must not collapse into each other
+    kept, report = dedup.deduplicate(records("toast", "salad", ""), mode="merge")
+    assert [r["id"] for r in kept] == ["r0", "r1", "r2"]
+    assert report["duplicates"] == 0
+    assert dedup.stats()["too_short"] == 5
+    assert len(dedup) == 0
+
+
+def test_report_mode_keeps_records_and_lists_pairs():
+    kept, report = index(threshold=0.8).deduplicate(records(PASTA, SOUP, PASTA_VARIANT), mode="report")
+    assert [r["id"] for r in kept] == ["r0", "r1", "r2"]
+    assert "duplicate_of" not in kept[2]
+    assert report["mode"] == "report"
+    assert [(p["id"], p["duplicate_of"]) for p in report["pairs"]] == [("r2", "r0")]
+
+
+def test_merge_mode_drops_duplicates_onto_the_first_recipe():
+    kept, report = index(threshold=0.8).deduplicate(records(PASTA, SOUP, PASTA_VARIANT), mode="merge")
+    assert [r["id"] for r in kept] == ["r0", "r1"]
+    assert kept[0]["duplicate_ids"] == ["r2"]
+    assert (report["unique"], report["duplicates"]) == (2, 1)
+
+
+def test_flag_mode_marks_duplicates_by_default():
+    kept, report = index(threshold=0.8).deduplicate(records(PASTA, SOUP, PASTA_VARIANT))
+    assert report["mode"] == "flag"
+    assert [r.get("duplicate_of") for r in kept] == [None, None, "r0"]
+
+
+def test_off_mode_and_unknown_mode():
+    kept, report = index().deduplicate(records(PASTA, PASTA), mode="off")
+    assert len(kept) == 2 and report == {"mode": "off", "total": 2}
+    with pytest.raises(ValueError):
+        index().deduplicate([], mode="drop")
+
+
+def test_add_none_removes_previous_signature():
+    dedup = index()
+    dedup.add("pasta", dedup.signature(PASTA))
+    dedup.add("pasta", None)
+    assert len(dedup) == 0
+    assert dedup.find_duplicate(dedup.signature(PASTA)) is None
+    assert all(not bucket for bucket in dedup._buckets)
+
+
+def test_invalid_configuration():
+    with pytest.raises(ValueError):
+        index(num_perm=100, bands=16)
+    with pytest.raises(ValueError):
+        index(threshold=0.0)
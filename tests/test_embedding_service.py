@@ -0,0 +1,93 @@
+import struct
+import threading
+
+import numpy as np
+import pytest
+
+from embedding_service import (BINARY_HEADER, EmbeddingCache, EmbeddingService, decode_binary,
+                               encode_binary)
+
+
+def fake_encoder(calls):
+    def encode(texts):
+        calls.append(list(texts))
+        return np.array([[len(t), i] for i, t in enumerate(texts)], dtype=np.float32)
+    return encode
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16"])
+def test_binary_round_trip(dtype):
+    embeddings = np.random.RandomState(0).randn(5, 7).astype(np.float32)
+    payload = encode_binary(embeddings, dtype)
+    assert len(payload) == BINARY_HEADER.size + embeddings.size * np.dtype(dtype).itemsize
+    decoded = decode_binary(payload)
+    assert decoded.shape == (5, 7)
+    np.testing.assert_allclose(decoded, embeddings, rtol=1e-3 if dtype == "float16" else 0)
+
+
+def test_binary_header_layout():
+    payload = encode_binary(np.ones((2, 3), dtype=np.float32))
+    assert struct.unpack_from("<4sBBHII", payload) == (b"EMB1", 1, 1, 0, 2, 3)
+    assert np.frombuffer(payload[BINARY_HEADER.size:], dtype="<f4").tolist() == [1.0] * 6
+
+
+def test_binary_rejects_bad_payloads():
+    with pytest.raises(ValueError):
+        encode_binary(np.ones((1, 1)), "float64")
+    payload = bytearray(encode_binary(np.ones((1, 1))))
+    payload[:4] = b"NOPE"
+    with pytest.raises(ValueError):
+        decode_binary(bytes(payload))
+
+
+def test_cache_is_lru_and_read_only():
+    cache = EmbeddingCache(max_entries=2)
+    cache.put("a", np.ones(2))
+    cache.put("b", np.ones(2))
+    cache.get("a")
+    cache.put("c", np.ones(2))
+    assert cache.get("b") is None and cache.get("a") is not None
+    with pytest.raises(ValueError):
+        cache.get("a")[0] = 5
+    assert cache.stats()["size"] == 2
+
+
+def test_service_caches_and_deduplicates_texts():
+    calls = []
+    service = EmbeddingService(fake_encoder(calls), cache_size=100, max_wait_ms=1)
+    first = service.embed(["salad", "soup", "salad"])
+    assert calls == [["salad", "soup"]]
+    np.testing.assert_array_equal(first[0], first[2])
+
+    service.embed(["soup", "stew"])
+    assert calls[-1] == ["stew"]
+    assert service.stats()["hits"] == 1
+
+
+def test_concurrent_callers_share_a_batch():
+    calls = []
+    service = EmbeddingService(fake_encoder(calls), cache_size=0, max_batch=1000, max_wait_ms=200)
+    start = threading.Barrier(4)
+    outputs = {}
+
+    def call(name):
+        start.wait()
+        outputs[name] = service.embed_one(name)
+
+    threads = [threading.Thread(target=call, args=(name,)) for name in ["a", "bb", "ccc", "dddd"]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1 and sorted(calls[0]) == ["a", "bb", "ccc", "dddd"]
+    assert {name: vector[0] for name, vector in outputs.items()} == {"a": 1, "bb": 2, "ccc": 3, "dddd": 4}
+
+
+def test_encoder_errors_reach_every_caller():
+    def broken(texts):
+        raise RuntimeError("cuda out of memory")
+
+    service = EmbeddingService(broken, max_wait_ms=1)
+    with pytest.raises(RuntimeError, match="out of memory"):
+        service.embed(["a"])
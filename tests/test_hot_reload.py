@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from hot_reload import ReloadManager, confine_path
+
+
+class FakePipeline:
+    classifier_version = "v1"
+
+    def __init__(self):
+        self.loaded = []
+
+    def reload_classifier(self, path):
+        if path is not None and path.endswith("broken.pt"):
+            raise RuntimeError("bad checkpoint")
+        self.loaded.append(path)
+        return {"previous_version": "v1", "version": "v2"}
+
+
+class FakeDatabase:
+    local_index = None
+
+    def __init__(self):
+        self.loaded = []
+
+    def reload_snapshot(self, path):
+        self.loaded.append(path)
+        return {"recipes": 3}
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    models, snapshots = tmp_path / "models", tmp_path / "snapshots"
+    models.mkdir()
+    snapshots.mkdir()
+    return str(models), str(snapshots)
+
+
+def test_confine_path_rejects_escapes(tmp_path):
+    root = tmp_path / "models"
+    root.mkdir()
+    (tmp_path / "secret.pt").write_bytes(b"")
+    os.symlink(tmp_path / "secret.pt", root / "link.pt")
+
+    assert confine_path(str(root / "a.pt"), str(root)) == os.path.realpath(root / "a.pt")
+    for escape in [str(root / ".." / "secret.pt"), str(root / "link.pt"), "/etc/passwd", str(tmp_path / "models2")]:
+        with pytest.raises(ValueError):
+            confine_path(escape, str(root))
+
+
+def test_reload_confines_explicit_paths(dirs):
+    models, snapshots = dirs
+    pipeline, database = FakePipeline(), FakeDatabase()
+    manager = ReloadManager(pipeline, database, models, snapshots)
+
+    result = manager.reload(classifier_path=os.path.join(models, "next.pt"), snapshot=True)
+    assert result == {"classifier": {"previous_version": "v1", "version": "v2"}, "index": {"recipes": 3}}
+    assert database.loaded == [None]  # no path: the configured default
+
+    with pytest.raises(ValueError):
+        manager.reload(snapshot_path=os.path.join(models, "next.pt"))
+    with pytest.raises(ValueError):
+        manager.reload()
+
+
+def test_failed_reload_is_recorded_and_raised(dirs):
+    models, snapshots = dirs
+    manager = ReloadManager(FakePipeline(), FakeDatabase(), models, snapshots)
+    with pytest.raises(RuntimeError):
+        manager.reload(classifier_path=os.path.join(models, "broken.pt"))
+
+    status = manager.status()
+    assert status["classifier_version"] == "v1"
+    assert status["history"][-1]["error"] == "bad checkpoint"
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from index_snapshot import IndexSnapshot, SnapshotError, open_snapshot, write_snapshot
+from metadata_index import parse_filters
+from vector_index import LocalVectorIndex, normalize_rows
+
+
+def catalog(n=50, dim=8, seed=0):
+    rng = np.random.default_rng(seed)
+    ids = [f"recipe-{i}" for i in range(n)]
+    records = [
+        {"id": ids[i], "title": f"Bowl nº{i}", "calories": float(rng.integers(100, 900)),
+         "protein_g": float(rng.integers(5, 60)), "goal": ["lose_weight", "gain_weight"][i % 2],
+         **({"difficulty": "easy"} if i % 3 == 0 else {})}
+        for i in range(n)
+    ]
+    return ids, normalize_rows(rng.normal(size=(n, dim)).astype(np.float32)), records
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "recipes.snap")
+    ids, embeddings, records = catalog()
+    write_snapshot(path, ids, embeddings, records, last_seq=42)
+
+    snapshot = IndexSnapshot(path)
+    assert snapshot.size == len(ids)
+    assert snapshot.last_seq == 42
+    assert list(snapshot.ids) == ids
+    assert list(snapshot.records) == records
+    assert np.array_equal(snapshot.embeddings, embeddings)
+    assert not snapshot.embeddings.flags.writeable
+
+    for spec in [{"calories": {"lt": 400}}, {"goal": "gain_weight", "protein_g": {"gte": 30}},
+                 {"difficulty": {"in": ["easy"]}}]:
+        filters = parse_filters(spec)
+        expected = [i for i, r in enumerate(records) if all(
+            r.get(field) is not None and _holds(r[field], condition) for field, condition in filters.items())]
+        assert list(snapshot.metadata.candidates(filters)) == expected
+
+
+def _holds(value, condition):
+    checks = {"lt": value.__lt__, "lte": value.__le__, "gt": value.__gt__, "gte": value.__ge__,
+              "eq": value.__eq__, "in": lambda targets: value in targets}
+    return all(checks[op](target) for op, target in condition.items())
+
+
+def test_empty_snapshot(tmp_path):
+    path = str(tmp_path / "empty.snap")
+    write_snapshot(path, [], np.zeros((0, 0), dtype=np.float32), [], last_seq=3)
+    snapshot = IndexSnapshot(path)
+    assert snapshot.size == 0
+    assert list(snapshot.ids) == []
+    assert snapshot.last_seq == 3
+
+
+def test_payload_corruption_is_detected_by_default(tmp_path):
+    path = str(tmp_path / "recipes.snap")
+    ids, embeddings, records = catalog()
+    size = write_snapshot(path, ids, embeddings, records)
+
+    with open(path, "r+b") as f:
+        f.seek(size - 200)
+        byte = f.read(1)
+        f.seek(size - 200)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+    with pytest.raises(SnapshotError, match="payload checksum"):
+        IndexSnapshot(path)
+    assert open_snapshot(path) is None
+    # Skipping verification only checks the header
+    assert IndexSnapshot(path, verify_payload=False).size == len(ids)
+
+
+def test_header_corruption_is_always_detected(tmp_path):
+    path = str(tmp_path / "recipes.snap")
+    ids, embeddings, records = catalog()
+    write_snapshot(path, ids, embeddings, records)
+
+    with open(path, "r+b") as f:
+        f.seek(20)
+        f.write(b"\xff")
+
+    with pytest.raises(SnapshotError):
+        IndexSnapshot(path, verify_payload=False)
+
+
+def test_missing_or_foreign_files(tmp_path):
+    assert open_snapshot(str(tmp_path / "missing.snap")) is None
+    foreign = tmp_path / "foreign.snap"
+    foreign.write_bytes(b"not a snapshot" * 10)
+    assert open_snapshot(str(foreign)) is None
+
+
+def test_index_from_snapshot_builds_row_map_lazily(tmp_path):
+    path = str(tmp_path / "recipes.snap")
+    ids, embeddings, records = catalog()
+    write_snapshot(path, ids, embeddings, records, last_seq=7)
+
+    index = LocalVectorIndex.from_snapshot(open_snapshot(path))
+    assert index._row_of is None
+    assert index.search(embeddings[3], n_results=1)[0]["id"] == ids[3]
+    assert index._row_of is None
+
+    index.upsert(ids[3], embeddings[4], dict(records[3], calories=1.0))
+    assert index._row_of is not None
+    assert index.seq == 8
+    assert index.get(ids[3])[1]["calories"] == 1.0
+    assert len(index) == len(ids)
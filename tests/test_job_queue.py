@@ -0,0 +1,141 @@
+import time
+
+import pytest
+
+import job_queue
+from job_queue import JobNotFoundError, JobQueue, JobStore
+
+
+def double(items):
+    return [{"value": item["n"] * 2} for item in items]
+
+
+def items(count):
+    return [{"n": n} for n in range(count)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def drain(queue):
+    """Run chunks on the calling thread until none is left to claim"""
+    claimable = """SELECT COUNT(*) FROM job_chunks c JOIN jobs j ON j.id = c.job_id
+                   WHERE c.status = 'pending' AND j.status IN ('queued', 'running')"""
+    while queue.store._db.execute(claimable).fetchone()[0]:
+        queue._run_next()
+
+
+def test_job_runs_to_completion_with_results_in_order(store):
+    queue = JobQueue(store, {"double": double}, workers=0, chunk_size=4)
+    job_id = queue.submit("double", items(10))
+    assert store.get(job_id)["status"] == "queued"
+
+    drain(queue)
+    job = store.get(job_id)
+    assert (job["status"], job["processed"], job["progress"]) == ("completed", 10, 1.0)
+    page = store.results(job_id, limit=100)
+    assert [r["value"] for r in page["results"]] == [n * 2 for n in range(10)]
+    assert page["next_offset"] is None
+
+
+def test_results_are_paged_by_position(store):
+    queue = JobQueue(store, {"double": double}, workers=0, chunk_size=3)
+    job_id = queue.submit("double", items(7))
+    drain(queue)
+
+    first = store.results(job_id, limit=4)
+    assert [r["position"] for r in first["results"]] == [0, 1, 2, 3]
+    second = store.results(job_id, offset=first["next_offset"], limit=4)
+    assert [r["position"] for r in second["results"]] == [4, 5, 6]
+    assert second["next_offset"] is None
+
+
+def test_higher_priority_job_is_claimed_first(store):
+    low = store.create("double", items(4), priority=0, chunk_size=2)
+    high = store.create("double", items(4), priority=5, chunk_size=2)
+    assert [store.claim()["job_id"] for _ in range(4)] == [high, high, low, low]
+    assert store.claim() is None
+
+
+def test_failed_chunk_is_retried_then_fails_the_job(store):
+    calls = []
+
+    def flaky(chunk):
+        calls.append(len(chunk))
+        raise RuntimeError("model crashed")
+
+    queue = JobQueue(store, {"flaky": flaky}, workers=0, chunk_size=2)
+    job_id = queue.submit("flaky", items(4))
+    drain(queue)
+
+    job = store.get(job_id)
+    assert job["status"] == "failed" and "model crashed" in job["error"]
+    assert len(calls) == job_queue.JOB_MAX_ATTEMPTS
+    assert store.claim() is None  # the other chunk was cancelled with the job
+
+
+def test_handler_returning_wrong_count_is_a_failure(store):
+    queue = JobQueue(store, {"short": lambda chunk: chunk[:1]}, workers=0, chunk_size=2)
+    job_id = queue.submit("short", items(2))
+    drain(queue)
+    assert "different number" in store.get(job_id)["error"]
+
+
+def test_cancel_stops_handing_out_chunks(store):
+    job_id = store.create("double", items(6), priority=0, chunk_size=2)
+    store.claim()
+    assert store.cancel(job_id)
+    assert store.get(job_id)["status"] == "cancelled"
+    assert store.claim() is None
+    assert not store.cancel(job_id)
+    with pytest.raises(JobNotFoundError):
+        store.cancel("missing")
+
+
+def test_running_chunks_are_recovered_after_a_restart(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    first = JobStore(path)
+    job_id = first.create("double", items(4), priority=0, chunk_size=2)
+    first.claim()
+    first.claim()
+
+    restarted = JobStore(path)
+    assert restarted.recovered == 2
+    queue = JobQueue(restarted, {"double": double}, workers=0, chunk_size=2)
+    drain(queue)
+    assert restarted.get(job_id)["status"] == "completed"
+
+
+def test_submit_validation(store):
+    queue = JobQueue(store, {"double": double}, workers=0)
+    with pytest.raises(ValueError):
+        queue.submit("unknown", items(1))
+    with pytest.raises(ValueError):
+        queue.submit("double", [])
+
+
+def test_workers_survive_store_errors(store, monkeypatch):
+    monkeypatch.setattr(job_queue, "STORE_BACKOFF_SECONDS", 0.001)
+    failures = {"complete": 3}
+    complete = store.complete
+
+    def flaky_complete(*args):
+        if failures["complete"]:
+            failures["complete"] -= 1
+            raise RuntimeError("database is locked")
+        return complete(*args)
+
+    monkeypatch.setattr(store, "complete", flaky_complete)
+    queue = JobQueue(store, {"double": double}, workers=1, chunk_size=2)
+    queue.start()
+    job_id = queue.submit("double", items(4))
+
+    give_up = time.time() + 5
+    while store.get(job_id)["status"] != "completed" and time.time() < give_up:
+        time.sleep(0.01)
+    stats = queue.stats()
+    assert store.get(job_id)["status"] == "completed"
+    assert stats["workers_alive"] == 1
+    assert stats["store_errors"] == 3
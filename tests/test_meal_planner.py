@@ -0,0 +1,149 @@
+import itertools
+import random
+import time
+
+import numpy as np
+import pytest
+
+from meal_planner import MealPlanner
+
+
+def recipe(recipe_id, calories, protein, prep=20, goal="lose_weight"):
+    return {"id": recipe_id, "title": recipe_id, "calories": calories, "protein_g": protein,
+            "prep_time": prep, "goal": goal}
+
+
+def planner(records, version=None):
+    version = version or [1]
+    return MealPlanner(lambda: records, lambda: version[0])
+
+
+def test_knapsack_matches_brute_force():
+    rng = random.Random(1)
+    for _ in range(20):
+        weights = np.array([rng.randint(1, 12) for _ in range(8)])
+        values = np.array([rng.uniform(0, 50) for _ in range(8)])
+        meals, capacity = 3, 25
+        best, take = MealPlanner._knapsack(weights, values, meals, capacity)
+
+        exact = {}
+        for combo in itertools.combinations(range(len(weights)), meals):
+            total = int(weights[list(combo)].sum())
+            if total <= capacity:
+                exact[total] = max(exact.get(total, -np.inf), float(values[list(combo)].sum()))
+        assert set(np.flatnonzero(np.isfinite(best[meals]))) == set(exact)
+        for total, value in exact.items():
+            assert best[meals, total] == pytest.approx(value)
+            chosen = MealPlanner._backtrack(take, weights, meals, total)
+            assert len(set(chosen)) == meals
+            assert int(weights[chosen].sum()) == total
+            assert float(values[chosen].sum()) == pytest.approx(value)
+
+
+def test_day_lands_in_the_calorie_window_with_best_protein():
+    rng = random.Random(2)
+    records = [recipe(f"r{i}", rng.randint(150, 900), rng.randint(5, 60)) for i in range(25)]
+    result = planner(records).plan("lose_weight", meals_per_day=3, calories_target=1500,
+                                   calorie_tolerance=50, protein_min=0)
+    day = result["days"][0]
+    assert day["constraints_met"]["calories"]
+
+    by_id = {r["id"]: r for r in records}
+    best = max(sum(by_id[i]["protein_g"] for i in combo)
+               for combo in itertools.combinations(by_id, 3)
+               if 1450 <= sum(by_id[i]["calories"] for i in combo) <= 1550)
+    # Goal bonus is the same for every recipe here, so the plan maximizes protein
+    assert day["totals"]["protein_g"] == best
+
+
+def test_protein_minimum_is_traded_against_goal_match():
+    records = [
+        recipe("tagged_a", 500, 35), recipe("tagged_b", 500, 35), recipe("tagged_c", 500, 35),
+        recipe("lean_a", 500, 40, goal="gain_weight"), recipe("lean_b", 500, 40, goal="gain_weight"),
+        recipe("lean_c", 500, 40, goal="gain_weight"),
+    ]
+    mp = planner(records)
+    unconstrained = mp.plan("lose_weight", calories_target=1500, protein_min=0)["days"][0]
+    assert {m["id"] for m in unconstrained["meals"]} == {"tagged_a", "tagged_b", "tagged_c"}
+
+    constrained = mp.plan("lose_weight", calories_target=1500, protein_min=110)["days"][0]
+    assert constrained["constraints_met"] == {"calories": True, "protein": True, "prep_time": True}
+    assert constrained["totals"]["protein_g"] >= 110
+
+
+def test_total_prep_budget_and_per_meal_limit():
+    records = [recipe(f"quick{i}", 500, 20, prep=10) for i in range(3)] + \
+              [recipe(f"slow{i}", 500, 45, prep=60) for i in range(3)] + [recipe("marathon", 500, 90, prep=240)]
+    mp = planner(records)
+    unbudgeted = mp.plan("lose_weight", calories_target=1500, protein_min=0, max_prep_time=120)["days"][0]
+    assert unbudgeted["totals"]["prep_time"] == 180
+    assert "marathon" not in {m["id"] for m in unbudgeted["meals"]}
+
+    day = mp.plan("lose_weight", calories_target=1500, protein_min=0, max_total_prep_time=90,
+                  max_prep_time=120)["days"][0]
+    assert day["totals"]["prep_time"] <= 90
+    assert day["constraints_met"]["prep_time"]
+
+
+def test_week_respects_max_repeats():
+    rng = random.Random(4)
+    records = [recipe(f"r{i}", rng.randint(300, 700), rng.randint(10, 50)) for i in range(12)]
+    result = planner(records).plan("lose_weight", days=7, calories_target=1500, calorie_tolerance=200,
+                                   protein_min=0, max_repeats=2)
+    counts = {}
+    for day in result["days"]:
+        for meal in day["meals"]:
+            counts[meal["id"]] = counts.get(meal["id"], 0) + 1
+    assert max(counts.values()) <= 2
+    assert sum(counts.values()) == 7 * 3 - sum(3 for day in result["days"] if not day["meals"])
+
+
+def test_time_limit_still_returns_a_plan():
+    records = [recipe(f"r{i}", 500, 10 + i) for i in range(10)]
+    result = planner(records).plan("lose_weight", days=3, calories_target=1500, protein_min=1000,
+                                   time_limit_ms=0)
+    assert result["solver"]["time_limited"]
+    assert all(len(day["meals"]) == 3 for day in result["days"])
+
+
+def test_infeasible_day_and_invalid_goal():
+    mp = planner([recipe("only", 500, 30)])
+    assert mp.plan("lose_weight")["days"][0] == {"day": 1, "meals": [], "totals": None, "constraints_met": None}
+    with pytest.raises(ValueError):
+        mp.plan("maintain")
+
+
+def test_catalog_is_reloaded_when_the_version_changes():
+    records, version = [recipe(f"r{i}", 500, 20) for i in range(3)], [1]
+    mp = planner(records, version)
+    mp.plan("lose_weight", protein_min=0)
+    mp.plan("lose_weight", protein_min=0)
+    assert mp.stats()["rebuilds"] == 1
+
+    records.append(recipe("new", 500, 80))
+    version[0] = 2
+    day = mp.plan("lose_weight", protein_min=0)["days"][0]
+    assert mp.stats()["rebuilds"] == 2
+    assert "new" in {m["id"] for m in day["meals"]}
+
+
+def test_huge_calorie_target_coarsens_buckets_instead_of_allocating():
+    rng = random.Random(6)
+    records = [recipe(f"r{i}", rng.uniform(1, 60000), rng.randint(5, 60)) for i in range(5000)]
+    started = time.perf_counter()
+    day = planner(records).plan("gain_weight", meals_per_day=6, calories_target=300000,
+                                calorie_tolerance=5000, protein_min=0)["days"][0]
+    assert time.perf_counter() - started < 10
+    assert len(day["meals"]) == 6
+    assert day["constraints_met"]["calories"]
+    with pytest.raises(ValueError):
+        planner(records).plan("gain_weight", calories_target=float("inf"))
+
+
+def test_recipes_with_invalid_calories_are_ignored():
+    records = [recipe(f"r{i}", 500, 20) for i in range(3)] + \
+              [recipe("negative", -50, 90), recipe("zero", 0, 90), recipe("nan", float("nan"), 90),
+               recipe("inf", float("inf"), 90)]
+    day = planner(records).plan("lose_weight", calories_target=1500, protein_min=0)["days"][0]
+    assert {m["id"] for m in day["meals"]} == {"r0", "r1", "r2"}
+    assert day["constraints_met"]["calories"]
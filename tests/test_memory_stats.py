@@ -0,0 +1,48 @@
+import sys
+
+import pytest
+
+import memory_stats
+from memory_stats import TracemallocTracker, approx_container_bytes, memory_summary, register_component
+
+
+def test_approx_container_bytes_scales_from_a_sample():
+    small = {f"key{i}": [i, i + 1] for i in range(100)}
+    large = {f"key{i}": [i, i + 1] for i in range(100_000)}
+    exact = sys.getsizeof(small) + sum(sys.getsizeof(k) + sys.getsizeof(v) + sum(map(sys.getsizeof, v))
+                                       for k, v in small.items())
+    assert approx_container_bytes(small) == pytest.approx(exact, rel=0.05)
+    ratio = approx_container_bytes(large) / approx_container_bytes(small)
+    assert 500 < ratio < 2000
+    assert approx_container_bytes([]) == sys.getsizeof([])
+    assert approx_container_bytes(42) == sys.getsizeof(42)
+
+
+def test_summary_sums_heap_bytes_but_not_mapped_bytes(monkeypatch):
+    monkeypatch.setattr(memory_stats, "_REPORTERS", {})
+    register_component("index", lambda: {"vectors_bytes": 1000, "mapped_vectors_bytes": 5000, "rows": 10})
+    register_component("broken", lambda: 1 / 0)
+
+    summary = memory_summary()
+    assert summary["estimated_component_bytes"] == 1000
+    assert "error" in summary["components"]["broken"]
+    assert "rss_bytes" in summary
+
+
+def test_tracemalloc_diff_finds_growth():
+    tracker = TracemallocTracker()
+    with pytest.raises(RuntimeError):
+        tracker.take("before")
+    tracker.start()
+    try:
+        tracker.take("before")
+        leak = [bytearray(1024) for _ in range(200)]
+        tracker.take("after")
+        growth = tracker.diff("before", "after", limit=5, path_filter="test_memory_stats")
+        assert growth and growth[0]["size_diff_bytes"] >= 200 * 1024
+        assert growth[0]["file"].endswith("test_memory_stats.py")
+        with pytest.raises(KeyError):
+            tracker.diff("missing")
+        del leak
+    finally:
+        assert not tracker.stop()["tracing"]
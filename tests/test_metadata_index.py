@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from metadata_index import MetadataIndex, matches, parse_filters
+
+
+RECORDS = [
+    {"id": "a", "calories": 250, "protein_g": 30, "prep_time": 10, "goal": "lose_weight", "difficulty": "easy"},
+    {"id": "b", "calories": 400, "protein_g": 12, "prep_time": 25, "goal": "lose_weight", "difficulty": "medium"},
+    {"id": "c", "calories": 650, "protein_g": 45, "prep_time": 40, "goal": "gain_weight", "difficulty": "easy"},
+    {"id": "d", "calories": 900, "protein_g": None, "prep_time": 15, "goal": "gain_weight"},
+    {"id": "e", "calories": 400, "protein_g": 22, "prep_time": None, "goal": "lose_weight", "difficulty": "hard"},
+]
+
+FILTERS = [
+    {},
+    {"calories": {"lt": 400}},
+    {"calories": {"lte": 400}},
+    {"calories": {"gt": 250, "lte": 650}},
+    {"calories": 400},
+    {"protein_g": {"gte": 22}},
+    {"prep_time": {"lt": 30}, "goal": "lose_weight"},
+    {"difficulty": {"in": ["easy", "hard"]}},
+    {"goal": {"eq": "gain_weight"}, "protein_g": {"gt": 0}},
+    {"calories": {"gt": 1000}},
+]
+
+
+@pytest.mark.parametrize("spec", FILTERS)
+def test_bitmap_query_matches_row_wise_evaluation(spec):
+    filters = parse_filters(spec)
+    index = MetadataIndex(RECORDS)
+
+    expected = [r["id"] for r in RECORDS if matches(r, filters)]
+    assert [RECORDS[row]["id"] for row in index.candidates(filters)] == expected
+
+
+def test_missing_values_never_match_a_range():
+    index = MetadataIndex(RECORDS)
+    rows = index.candidates(parse_filters({"protein_g": {"gte": 0}}))
+    assert "d" not in [RECORDS[row]["id"] for row in rows]
+
+
+def test_parse_filters_normalizes_operands():
+    parsed = parse_filters({"calories": {"lt": "400"}, "goal": "lose_weight", "difficulty": {"in": ("easy",)}})
+    assert parsed == {
+        "calories": {"lt": 400.0},
+        "goal": {"eq": "lose_weight"},
+        "difficulty": {"in": ["easy"]},
+    }
+    # String operands from JSON clients compare numerically on the row-wise path too
+    assert matches(RECORDS[0], parsed)
+    assert not matches(RECORDS[2], parsed)
+
+
+@pytest.mark.parametrize("spec", [
+    {"calories": {"lt": "lots"}},
+    {"calories": {"lt": True}},
+    {"calories": {"lt": [400]}},
+    {"calories": {"lt": "nan"}},
+    {"calories": {"between": [1, 2]}},
+    {"goal": ["lose_weight"]},
+    {"goal": {"in": "lose_weight"}},
+    {"goal": {"in": [["lose_weight"]]}},
+    {"goal": {"lt": "z"}},
+    {"cuisine": "thai"},
+])
+def test_parse_filters_rejects_bad_specs(spec):
+    with pytest.raises(ValueError):
+        parse_filters(spec)
+
+
+def test_from_columns_round_trip():
+    index = MetadataIndex(RECORDS)
+    columns, sorted_rows, categories = index.export_columns()
+    rebuilt = MetadataIndex.from_columns(index.size, columns, sorted_rows, categories)
+
+    for spec in FILTERS:
+        filters = parse_filters(spec)
+        assert np.array_equal(rebuilt.query(filters), index.query(filters))
@@ -0,0 +1,59 @@
+import pytest
+
+from nutrition import INDEX, INGREDIENTS, NAMES, analyze_nutrition, parse_ingredients, to_grams
+
+
+def mentions(text):
+    return [(NAMES[row], quantity, unit) for row, quantity, unit in parse_ingredients(text)]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("200 g chicken breast", [("chicken breast", 200.0, "g")]),
+    ("1 1/2 cups rice", [("rice", 1.5, "cups")]),
+    ("½ cup milk", [("milk", 0.5, "cup")]),
+    ("2-3 eggs", [("egg", 2.5, None)]),
+    ("3 cups of spinach leaves", [("spinach", 3.0, "cups")]),
+    ("2 tomatoes, onion", [("tomato", 2.0, None), ("onion", None, None)]),
+])
+def test_quantities_units_and_plurals(text, expected):
+    assert mentions(text) == expected
+
+
+def test_numbers_that_are_not_quantities_are_ignored():
+    assert mentions("cook 20 minutes then add chicken") == [("chicken", None, None)]
+    assert mentions("serves 4, 350 kcal: rice") == [("rice", None, None)]
+
+
+def test_unit_conversion():
+    chicken, rice = INDEX["chicken breast"], INDEX["rice"]
+    assert to_grams(chicken, 200.0, "g") == 200.0
+    assert to_grams(rice, 1.0, "cup") == pytest.approx(240.0 * INGREDIENTS["rice"][4])
+    assert to_grams(chicken, 2.0, None) == 2 * INGREDIENTS["chicken breast"][5]
+    assert to_grams(chicken, None, None) == INGREDIENTS["chicken breast"][6]
+
+
+def test_macros_from_the_table():
+    result = analyze_nutrition(["200 g chicken breast, 100 g rice"])[0]
+    kcal_c, protein_c = INGREDIENTS["chicken breast"][:2]
+    kcal_r, protein_r = INGREDIENTS["rice"][:2]
+    assert result["calories"] == round(2 * kcal_c + kcal_r)
+    assert result["protein_g"] == round(2 * protein_c + protein_r, 1)
+    assert result["total_grams"] == 300.0
+    assert [i["ingredient"] for i in result["ingredients"]] == ["chicken breast", "rice"]
+
+
+def test_servings_and_unquantified_mentions():
+    text = "200 g rice, then more rice and garlic"
+    whole, half = analyze_nutrition([text, text], servings=1)[0], analyze_nutrition([text], servings=2)[0]
+    assert half["calories"] == pytest.approx(whole["calories"] / 2, abs=1)
+    # Quantified rice is not counted again; garlic gets one estimated serving
+    by_name = {i["ingredient"]: i for i in whole["ingredients"]}
+    assert by_name["rice"]["grams"] == 200.0 and not by_name["rice"]["estimated"]
+    assert by_name["garlic"]["estimated"] and whole["estimated_portions"] == 1
+
+
+def test_batch_matches_one_by_one():
+    texts = ["2 eggs, 1 cup milk", "", "100 g chicken breast", "nothing we know"]
+    batch = analyze_nutrition(texts, include_ingredients=False)
+    assert batch == [analyze_nutrition([text], include_ingredients=False)[0] for text in texts]
+    assert batch[1]["calories"] == 0 and batch[3]["ingredients_matched"] == 0
@@ -0,0 +1,124 @@
+import random
+
+import numpy as np
+import pytest
+
+from nutrition import INDEX
+from pantry_index import PantryIndex, bits_to_rows, popcount, resolve_ingredients
+
+
+COMMON = ["chicken breast", "rice", "broccoli", "egg", "onion", "garlic", "tomato", "cheese", "spinach", "pasta"]
+
+
+def recipe(recipe_id, names, calories=400, protein=20):
+    return {"id": recipe_id, "title": recipe_id.title(), "calories": calories, "protein_g": protein,
+            "text": ", ".join(f"1 cup {name}" for name in names)}
+
+
+def catalog(rng, size, start=0):
+    return [recipe(f"r{i}", rng.sample(COMMON, rng.randint(1, 4)), rng.randint(200, 900), rng.randint(5, 60))
+            for i in range(start, start + size)]
+
+
+def brute_force(records, pantry, mode, max_missing, staples=()):
+    available = set(pantry) | set(staples)
+    found = set()
+    for record in records:
+        uses = set(PantryIndex._ingredient_rows(record))
+        if mode == "subset":
+            ok = uses <= available
+        elif mode == "superset":
+            ok = set(pantry) <= uses
+        else:
+            ok = bool(uses & set(pantry)) and len(uses - available) <= max_missing
+        if ok:
+            found.add(record["id"])
+    return found
+
+
+def found(index, pantry, mode, max_missing=1, staples=None):
+    return {r["id"] for r in index.search(pantry, mode, max_missing, n_results=10_000, staples=staples)["results"]}
+
+
+def test_popcount_and_bit_rows():
+    words = np.array([0b1011, 1 << 63], dtype=np.uint64)
+    assert popcount(words) == 4
+    assert bits_to_rows(words, 128).tolist() == [0, 1, 3, 127]
+    assert bits_to_rows(words, 64).tolist() == [0, 1, 3]
+
+
+def test_resolve_ingredients_expands_groups():
+    rows, unknown = resolve_ingredients(["Veggies", "egg", "", "unobtainium"])
+    assert INDEX["broccoli"] in rows and INDEX["egg"] in rows
+    assert unknown == ["unobtainium"]
+
+
+@pytest.mark.parametrize("mode", ["subset", "superset", "missing"])
+def test_modes_match_brute_force(mode):
+    rng = random.Random(3)
+    records = catalog(rng, 500)
+    index = PantryIndex()
+    index.build(lambda: records)
+    for _ in range(20):
+        pantry = [INDEX[name] for name in rng.sample(COMMON, rng.randint(1, 5))]
+        for max_missing in (0, 2):
+            assert found(index, pantry, mode, max_missing) == brute_force(records, pantry, mode, max_missing)
+
+
+def test_staples_count_as_available():
+    index = PantryIndex()
+    index.build(lambda: [recipe("fried", ["egg", "olive oil"]), recipe("omelette", ["egg", "cheese"])])
+    egg, oil = [INDEX["egg"]], [INDEX["olive oil"]]
+    assert found(index, egg, "subset") == set()
+    assert found(index, egg, "subset", staples=oil) == {"fried"}
+    assert found(index, egg, "missing", max_missing=0, staples=oil) == {"fried"}
+
+
+def test_ranking_prefers_fewer_missing_then_goal_fit():
+    index = PantryIndex()
+    index.build(lambda: [
+        recipe("lean", ["chicken breast", "broccoli"], calories=300, protein=45),
+        recipe("heavy", ["chicken breast", "rice"], calories=850, protein=30),
+        recipe("ready", ["chicken breast"], calories=600, protein=10),
+    ])
+    results = index.search([INDEX["chicken breast"]], "missing", max_missing=1, goal="lose_weight")["results"]
+    assert [r["id"] for r in results] == ["ready", "lean", "heavy"]
+    assert results[1]["missing"] == ["broccoli"] and results[1]["matched"] == ["chicken breast"]
+
+
+def test_updates_and_compaction_match_brute_force():
+    rng = random.Random(5)
+    records = {r["id"]: r for r in catalog(rng, 100)}
+    index = PantryIndex(capacity=64)
+    index.build(lambda: list(records.values()))
+
+    # Enough replacements to grow the bitmaps and trigger compaction of cleared rows
+    for _ in range(15):
+        for record in catalog(rng, 100):
+            records[record["id"]] = record
+            index.add_recipe(record)
+    for recipe_id in ["r0", "r1", "r2"]:
+        del records[recipe_id]
+        assert index.remove_recipe(recipe_id)
+
+    stats = index.stats()
+    assert stats["live_recipes"] == len(records)
+    assert stats["rows"] < 1600
+    for mode in ("subset", "superset", "missing"):
+        for names in (["rice", "egg"], ["chicken breast", "broccoli", "garlic", "onion"]):
+            pantry = [INDEX[name] for name in names]
+            assert found(index, pantry, mode) == brute_force(records.values(), pantry, mode, 1)
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        PantryIndex().search([0], mode="exact")
+
+
+def test_empty_pantry_matches_nothing():
+    index = PantryIndex()
+    index.build(lambda: [recipe("toast", ["bread"]), recipe("omelette", ["egg", "cheese"])])
+    pantry, unknown = resolve_ingredients(["xyz"])
+    assert (pantry, unknown) == ([], ["xyz"])
+    for mode in ("subset", "superset", "missing"):
+        assert index.search(pantry, mode)["total_matches"] == 0
@@ -0,0 +1,177 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pipeline_executor import PipelineExecutor, Stage
+
+
+def diamond(calls, barrier=None):
+    """embed feeds classify and search, which can run side by side"""
+    def record(name, value):
+        calls.append(name)
+        return value
+
+    def side(name):
+        def fn(embedding):
+            if barrier is not None:
+                barrier.wait(timeout=2)
+            return record(name, embedding + 1)
+        return fn
+
+    return [
+        Stage("embed", lambda text: record("embed", len(text)), ["text"], ["embedding"]),
+        Stage("classify", side("classify"), ["embedding"], ["label"]),
+        Stage("search", side("search"), ["embedding"], ["hits"]),
+        Stage("unused", lambda text: record("unused", 0), ["text"], ["other"]),
+    ]
+
+
+def test_runs_only_the_stages_targets_need():
+    calls = []
+    executor = PipelineExecutor(diamond(calls), max_workers=2)
+    result = executor.run({"text": "abc"}, ["label"])
+
+    assert result["label"] == 4
+    assert sorted(calls) == ["classify", "embed"]
+    assert result.executed == ["embed", "classify"]
+    assert set(result.timings_ms) == {"embed", "classify"}
+
+
+def test_independent_stages_run_in_parallel():
+    # Both branches wait on the same barrier: this only finishes if they overlap
+    barrier = threading.Barrier(2)
+    executor = PipelineExecutor(diamond([], barrier), max_workers=2)
+    result = executor.run({"text": "abc"}, ["label", "hits"])
+    assert (result["label"], result["hits"]) == (4, 4)
+
+
+def test_injected_pool_is_used():
+    pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="injected")
+    seen = []
+    stage = Stage("where", lambda text: seen.append(threading.current_thread().name) or text, ["text"], ["out"])
+    executor = PipelineExecutor([stage], pool=pool)
+
+    executor.run({"text": "x"}, ["out"])
+    assert seen[0].startswith("injected")
+    pool.shutdown()
+
+
+def test_required_stage_error_is_raised():
+    def boom(text):
+        raise RuntimeError("model unavailable")
+
+    executor = PipelineExecutor([Stage("embed", boom, ["text"], ["embedding"])], max_workers=1)
+    with pytest.raises(RuntimeError, match="model unavailable"):
+        executor.run({"text": "abc"}, ["embedding"])
+
+
+def test_duplicate_outputs_and_unknown_targets_are_rejected():
+    with pytest.raises(ValueError):
+        PipelineExecutor([Stage("a", len, ["x"], ["y"]), Stage("b", len, ["x"], ["y"])])
+    with pytest.raises(KeyError):
+        PipelineExecutor([Stage("a", len, ["x"], ["y"])]).run({"x": "1"}, ["z"])
+
+
+def test_multiple_outputs_from_a_dict():
+    stage = Stage("split", lambda text: {"head": text[0], "tail": text[1:]}, ["text"], ["head", "tail"])
+    result = PipelineExecutor([stage], max_workers=1).run({"text": "abc"}, ["head", "tail"])
+    assert (result["head"], result["tail"]) == ("a", "bc")
+
+
+def slow_suggestions(delay, fallback=None):
+    """A required embed stage feeding an optional, slow suggest stage"""
+    def suggest(embedding):
+        time.sleep(delay)
+        return ["fresh"]
+
+    return [
+        Stage("embed", lambda text: len(text), ["text"], ["embedding"]),
+        Stage("suggest", suggest, ["embedding"], ["suggestions"], optional=True,
+              fallback=fallback, default=[]),
+    ]
+
+
+def test_optional_stage_is_abandoned_at_the_deadline():
+    executor = PipelineExecutor(slow_suggestions(0.5), max_workers=2, optional_workers=1)
+    started = time.monotonic()
+    result = executor.run({"text": "abc"}, ["suggestions"], deadline=started + 0.05)
+
+    assert time.monotonic() - started < 0.4
+    assert result["suggestions"] == []
+    assert result.degraded == {"suggest": "skipped"}
+    assert result.executed == ["embed"]
+
+
+def test_fallback_result_is_reported_as_cached():
+    executor = PipelineExecutor(slow_suggestions(0.5, fallback=lambda embedding: ["cached"]),
+                                max_workers=2, optional_workers=1)
+    result = executor.run({"text": "abc"}, ["suggestions"], deadline=time.monotonic() + 0.05)
+    assert result["suggestions"] == ["cached"]
+    assert result.degraded == {"suggest": "cached"}
+
+
+def test_stage_known_to_be_too_slow_is_not_started():
+    calls = []
+    stages = slow_suggestions(0.0)
+    stages[1].fn = lambda embedding: calls.append(embedding) or ["fresh"]
+    executor = PipelineExecutor(stages, max_workers=2, optional_workers=1)
+    executor.estimates_ms["suggest"] = 1000.0
+
+    result = executor.run({"text": "abc"}, ["suggestions"], deadline=time.monotonic() + 0.2)
+    assert calls == []
+    assert result.degraded == {"suggest": "skipped"}
+
+
+def test_queue_wait_counts_against_the_deadline():
+    executor = PipelineExecutor(slow_suggestions(0.0), max_workers=2, optional_workers=1)
+    executor.estimates_ms["suggest"] = 10.0
+    stage = executor.stages["suggest"]
+    assert executor._fits(stage, time.monotonic() + 0.05)
+
+    # Three abandoned optional stages still hold the single optional worker
+    executor._optional_inflight = 3
+    assert not executor._fits(stage, time.monotonic() + 0.03)
+    executor._optional_inflight = 0
+    executor.queue_wait_ms = 100.0
+    assert not executor._fits(stage, time.monotonic() + 0.05)
+
+
+def test_optional_stage_reaching_a_worker_late_does_not_run():
+    executor = PipelineExecutor(slow_suggestions(0.0), max_workers=1, optional_workers=1)
+    release = threading.Event()
+    blocker = executor.optional_pool.submit(release.wait, 2)
+    calls = []
+    executor.stages["suggest"].fn = lambda embedding: calls.append(embedding) or ["fresh"]
+
+    result = executor.run({"text": "abc"}, ["suggestions"], deadline=time.monotonic() + 0.05)
+    assert result.degraded == {"suggest": "skipped"}
+    release.set()
+    blocker.result()
+    executor.optional_pool.shutdown(wait=True)
+    assert calls == []
+
+
+def test_optional_backlog_does_not_delay_required_stages():
+    executor = PipelineExecutor(slow_suggestions(0.0), max_workers=1, optional_workers=1)
+    release = threading.Event()
+    executor.optional_pool.submit(release.wait, 2)
+
+    started = time.monotonic()
+    result = executor.run({"text": "abc"}, ["embedding"])
+    assert result["embedding"] == 3
+    assert time.monotonic() - started < 0.5
+    release.set()
+
+
+def test_failing_optional_stage_degrades():
+    def broken(embedding):
+        raise RuntimeError("suggester down")
+
+    stages = slow_suggestions(0.0, fallback=lambda embedding: ["cached"])
+    stages[1].fn = broken
+    result = PipelineExecutor(stages, max_workers=2).run({"text": "abc"}, ["suggestions"],
+                                                          deadline=time.monotonic() + 1)
+    assert result["suggestions"] == ["cached"]
+    assert result.degraded == {"suggest": "cached"}
@@ -0,0 +1,96 @@
+import base64
+import json
+
+import pytest
+
+from search_windows import CursorError, SearchWindowStore, filters_key
+
+
+RESULTS = [{"id": f"r{i}"} for i in range(10)]
+FILTERS = filters_key({"goal": "lose_weight"})
+
+
+def first_page(store, page_size=4, version=1):
+    window_id = store.open(RESULTS)
+    return store.slice(window_id, RESULTS, 0, page_size, FILTERS, version)
+
+
+def reason(excinfo):
+    return excinfo.value.reason
+
+
+def test_cursor_walks_the_whole_window():
+    store = SearchWindowStore()
+    page = first_page(store)
+    seen = [r["id"] for r in page["results"]]
+    while page["next_cursor"]:
+        page = store.page(store.decode_cursor(page["next_cursor"]), FILTERS, 1, 4)
+        seen += [r["id"] for r in page["results"]]
+    assert seen == [r["id"] for r in RESULTS]
+    assert (page["offset"], page["count"], page["window_size"]) == (8, 2, 10)
+    assert store.stats()["pages"] == 2
+
+
+def test_cursor_round_trip():
+    store = SearchWindowStore()
+    cursor = store.encode_cursor("abc", 8, FILTERS, 3)
+    assert store.decode_cursor(cursor) == {"window_id": "abc", "offset": 8, "filters": FILTERS, "version": 3}
+
+
+def test_tampered_or_foreign_cursors_are_invalid():
+    store = SearchWindowStore(secret=b"a" * 32)
+    cursor = store.encode_cursor("abc", 4, FILTERS, 1)
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    forged = raw[:16] + json.dumps({"w": "abc", "o": 400, "f": FILTERS, "v": 1}, separators=(",", ":")).encode()
+    forged = base64.urlsafe_b64encode(forged).decode().rstrip("=")
+
+    for bad in [forged, "not a cursor", "", cursor[:-2]]:
+        with pytest.raises(CursorError) as excinfo:
+            store.decode_cursor(bad)
+        assert reason(excinfo) == "invalid"
+    with pytest.raises(CursorError):
+        SearchWindowStore(secret=b"b" * 32).decode_cursor(cursor)
+
+
+def test_filters_must_match_unless_omitted():
+    store = SearchWindowStore()
+    cursor = store.decode_cursor(first_page(store)["next_cursor"])
+    with pytest.raises(CursorError) as excinfo:
+        store.page(cursor, filters_key({"goal": "gain_weight"}), 1, 4)
+    assert reason(excinfo) == "mismatch"
+    assert store.page(cursor, None, 1, 4)["offset"] == 4
+
+
+def test_index_change_makes_cursor_stale():
+    store = SearchWindowStore()
+    cursor = store.decode_cursor(first_page(store, version=1)["next_cursor"])
+    with pytest.raises(CursorError) as excinfo:
+        store.page(cursor, FILTERS, 2, 4)
+    assert reason(excinfo) == "stale"
+
+    page = store.page(cursor, FILTERS, 2, 4, allow_stale=True)
+    assert page["stale"] and page["index_version"] == 1
+    assert store.decode_cursor(page["next_cursor"])["version"] == 1
+
+
+def test_expired_and_evicted_windows():
+    store = SearchWindowStore(ttl_seconds=0.0)
+    cursor = store.decode_cursor(first_page(store)["next_cursor"])
+    with pytest.raises(CursorError) as excinfo:
+        store.page(cursor, FILTERS, 1, 4)
+    assert reason(excinfo) == "expired"
+    assert store.stats()["open_windows"] == 0
+
+    store = SearchWindowStore(max_windows=2)
+    oldest = store.decode_cursor(first_page(store)["next_cursor"])
+    first_page(store)
+    first_page(store)
+    with pytest.raises(CursorError) as excinfo:
+        store.page(oldest, FILTERS, 1, 4)
+    assert reason(excinfo) == "expired"
+    assert store.stats()["evictions"] == 1
+
+
+def test_filters_key_is_order_independent():
+    assert filters_key({"a": 1, "b": {"lt": 2}}) == filters_key({"b": {"lt": 2}, "a": 1})
+    assert filters_key({}) == filters_key(None)
@@ -0,0 +1,72 @@
+import numpy as np
+
+from semantic_cache import SemanticCache
+
+
+RESULTS = [{"id": "r1", "distance": 0.1}]
+KEY = SemanticCache.partition_key("lose_weight", {"calories": {"lt": 500}}, 3)
+
+
+def vector(*values):
+    return np.array(values, dtype=np.float32)
+
+
+def test_paraphrase_within_distance_hits():
+    cache = SemanticCache(max_distance=0.05)
+    cache.put(vector(1, 0, 0), KEY, 1, RESULTS)
+    assert cache.get(vector(10, 0.5, 0), KEY, 1) == RESULTS  # scale does not matter
+    assert cache.get(vector(1, 1, 0), KEY, 1) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["lookups"]) == (1, 2)
+
+
+def test_hits_are_copies():
+    cache = SemanticCache()
+    cache.put(vector(1, 0), KEY, 1, RESULTS)
+    cache.get(vector(1, 0), KEY, 1)[0]["id"] = "changed"
+    assert cache.get(vector(1, 0), KEY, 1) == RESULTS
+
+
+def test_partition_key_separates_goal_filters_and_k():
+    cache = SemanticCache()
+    cache.put(vector(1, 0), KEY, 1, RESULTS)
+    for other in [SemanticCache.partition_key("gain_weight", {"calories": {"lt": 500}}, 3),
+                  SemanticCache.partition_key("lose_weight", None, 3),
+                  SemanticCache.partition_key("lose_weight", {"calories": {"lt": 500}}, 5)]:
+        assert cache.get(vector(1, 0), other, 1) is None
+
+
+def test_stale_and_expired_entries_are_dropped():
+    cache = SemanticCache(max_version_lag=1)
+    cache.put(vector(1, 0), KEY, 1, RESULTS)
+    assert cache.get(vector(1, 0), KEY, 2) == RESULTS
+    assert cache.get(vector(1, 0), KEY, 3) is None
+    assert cache.stats()["stale_rejections"] == 1 and cache.stats()["size"] == 0
+
+    cache = SemanticCache(ttl_seconds=0.0)
+    cache.put(vector(1, 0), KEY, 1, RESULTS)
+    assert cache.get(vector(1, 0), KEY, 1) is None
+    assert cache.stats()["expired"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SemanticCache(max_entries=2)
+    cache.put(vector(1, 0, 0), KEY, 1, [{"id": "a"}])
+    cache.put(vector(0, 1, 0), KEY, 1, [{"id": "b"}])
+    cache.get(vector(1, 0, 0), KEY, 1)
+    cache.put(vector(0, 0, 1), KEY, 1, [{"id": "c"}])
+
+    assert cache.get(vector(0, 1, 0), KEY, 1) is None
+    assert cache.get(vector(1, 0, 0), KEY, 1) == [{"id": "a"}]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_clear_empties_the_cache():
+    cache = SemanticCache(max_entries=4)
+    for i in range(4):
+        cache.put(np.eye(4, dtype=np.float32)[i], KEY, 1, RESULTS)
+    cache.clear()
+    assert cache.stats()["size"] == 0
+    assert cache.get(np.eye(4, dtype=np.float32)[0], KEY, 1) is None
+    cache.put(vector(1, 0, 0, 0), KEY, 1, RESULTS)
+    assert cache.get(vector(1, 0, 0, 0), KEY, 1) == RESULTS
@@ -0,0 +1,63 @@
+import ast
+import gzip
+import json
+import os
+
+import numpy as np
+import pytest
+
+import serialization
+from bench_serialization import SAMPLE, AnalysisResult
+from serialization import accepts_gzip, dumps, negotiated_response, parse_fields, project
+
+
+PAYLOAD = {"match_status": "match", "score": 0.9, "recipes": [{"id": "r1"}]}
+
+
+def test_dumps_is_compact_utf8_json():
+    body = dumps({"title": "Crème brûlée", "n": [1, 2]})
+    assert body == '{"title":"Crème brûlée","n":[1,2]}'.encode("utf-8")
+
+
+@pytest.mark.skipif(not serialization.ORJSON_AVAILABLE, reason="orjson not installed")
+def test_dumps_serializes_numpy_with_orjson():
+    assert json.loads(dumps({"v": np.arange(3, dtype=np.float32)})) == {"v": [0.0, 1.0, 2.0]}
+
+
+def test_field_projection():
+    fields = parse_fields(" score, match_status ,", PAYLOAD)
+    assert fields == ["score", "match_status"]
+    assert project(PAYLOAD, fields) == {"score": 0.9, "match_status": "match"}
+    assert project(PAYLOAD, parse_fields(None, PAYLOAD)) is PAYLOAD
+    with pytest.raises(ValueError, match="nope"):
+        parse_fields("score,nope", PAYLOAD)
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False), ("", False), ("gzip", True), ("br, gzip;q=0.5", True), ("*", True),
+    ("gzip;q=0", False), ("gzip;q=0.0, br", False), ("deflate, br", False), ("gzip;q=bad", False),
+])
+def test_accepts_gzip(header, expected):
+    assert accepts_gzip(header) is expected
+
+
+def test_large_bodies_are_gzipped_when_accepted():
+    content = {"results": [{"id": f"r{i}", "title": "Grilled chicken salad"} for i in range(200)]}
+    response = negotiated_response(content, "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert json.loads(gzip.decompress(response.body)) == content
+
+    assert "content-encoding" not in negotiated_response(content, None).headers
+    assert "content-encoding" not in negotiated_response({"small": True}, "gzip").headers
+
+
+def test_benchmark_model_matches_the_api_model():
+    # main.py cannot be imported without the ML stack, so read its model definition
+    path = os.path.join(os.path.dirname(serialization.__file__), "main.py")
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    model = next(node for node in tree.body if isinstance(node, ast.ClassDef) and node.name == "AnalysisResult")
+    fields = [node.target.id for node in model.body if isinstance(node, ast.AnnAssign)]
+    assert fields == list(AnalysisResult.model_fields)
+    assert set(SAMPLE) == set(fields)
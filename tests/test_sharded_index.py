@@ -0,0 +1,93 @@
+import threading
+
+import numpy as np
+
+from sharded_index import GOAL_SHARDS, ShardedVectorIndex
+from vector_index import LocalVectorIndex
+
+
+def catalog(count=200, dim=16, seed=0):
+    rng = np.random.RandomState(seed)
+    embeddings = rng.randn(count, dim).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    ids = [f"r{i}" for i in range(count)]
+    records = [{"id": i, "goal": "lose_weight" if n % 2 else "gain_weight", "calories": float(100 + n)}
+               for n, i in enumerate(ids)]
+    return ids, embeddings, records
+
+
+def hit_ids(hits):
+    return [hit["id"] for hit in hits]
+
+
+class SlowShard:
+    """Stands in for a shard that answers after the query deadline"""
+
+    def __init__(self, shard, release):
+        self.shard, self.release = shard, release
+
+    def search(self, *args):
+        self.release.wait(2)
+        return self.shard.search(*args)
+
+    def __len__(self):
+        return len(self.shard)
+
+
+def test_merged_top_k_matches_a_single_index():
+    ids, embeddings, records = catalog()
+    single = LocalVectorIndex(ids, embeddings, records)
+    for partition in ("hash", "goal"):
+        sharded = ShardedVectorIndex.build(ids, embeddings, records, num_shards=3, partition=partition)
+        assert len(sharded) == len(ids)
+        for query in embeddings[:10]:
+            assert hit_ids(sharded.search(query, 5)) == hit_ids(single.search(query, 5))
+        filters = {"calories": {"lt": 150.0}}
+        assert hit_ids(sharded.search(embeddings[0], 5, filters)) == hit_ids(single.search(embeddings[0], 5, filters))
+
+
+def test_goal_filter_queries_only_its_shard():
+    ids, embeddings, records = catalog()
+    sharded = ShardedVectorIndex.build(ids, embeddings, records, num_shards=2, partition="goal")
+    hits, status = sharded.search_with_status(embeddings[1], 5, {"goal": {"eq": "lose_weight"}})
+    assert status["shards_queried"] == 1
+    assert all(hit["record"]["goal"] == "lose_weight" for hit in hits)
+    assert len(sharded.shards[GOAL_SHARDS["lose_weight"]]) == len(ids) // 2
+
+
+def test_goal_change_moves_a_recipe_between_shards():
+    ids, embeddings, records = catalog(20)
+    sharded = ShardedVectorIndex.build(ids, embeddings, records, num_shards=2, partition="goal")
+    record = dict(records[0], goal="lose_weight")
+    assert sharded.upsert("r0", embeddings[0], record)
+    assert sharded.shards[GOAL_SHARDS["gain_weight"]].get("r0") is None
+    assert sharded.get("r0")[1]["goal"] == "lose_weight"
+    assert len(sharded) == 20
+    assert sharded.delete("r0") and sharded.get("r0") is None
+
+
+def test_missing_and_slow_shards_give_partial_results():
+    ids, embeddings, records = catalog()
+    sharded = ShardedVectorIndex.build(ids, embeddings, records, num_shards=3)
+    sharded.shards[0] = None
+    hits = sharded.search(embeddings[5], 5)
+    assert hits and all(hit["partial"] for hit in hits)
+
+    release = threading.Event()
+    sharded.shards[0] = SlowShard(sharded.shards[1], release)
+    hits, status = sharded.search_with_status(embeddings[5], 5, deadline_ms=50)
+    release.set()
+    assert status["partial"] and status["shards_answered"] == 2
+    assert sharded.stats["shard_timeouts"] == 1
+
+
+def test_snapshots_round_trip_per_shard(tmp_path):
+    ids, embeddings, records = catalog(50)
+    sharded = ShardedVectorIndex.build(ids, embeddings, records, num_shards=2)
+    path = str(tmp_path / "index.snap")
+    assert sharded.save_snapshot(path)["recipes"] == 50
+
+    restored = ShardedVectorIndex.from_snapshots(path, 2)
+    assert sorted(restored.export_live()[0]) == sorted(ids)
+    assert hit_ids(restored.search(embeddings[3], 5)) == hit_ids(sharded.search(embeddings[3], 5))
+    assert ShardedVectorIndex.from_snapshots(path, 3) is None
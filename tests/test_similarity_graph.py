@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from similarity_graph import SimilarityGraph, compute_neighbors
+
+
+def normalized(rng, n, dim=8):
+    vectors = rng.normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def brute_force(embeddings, k):
+    scores = embeddings @ embeddings.T
+    np.fill_diagonal(scores, -np.inf)
+    return np.argsort(-scores, axis=1, kind="stable")[:, :min(k, len(embeddings) - 1)]
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 1024])
+def test_compute_neighbors_matches_brute_force(block_size):
+    embeddings = normalized(np.random.default_rng(0), 40)
+    neighbors, scores = compute_neighbors(embeddings, k=5, block_size=block_size)
+
+    assert np.array_equal(neighbors, brute_force(embeddings, 5))
+    assert np.all(np.diff(scores, axis=1) <= 0)
+
+
+def test_neighbors_lookup():
+    rng = np.random.default_rng(1)
+    ids = [f"r{i}" for i in range(10)]
+    embeddings = normalized(rng, 10)
+    graph = SimilarityGraph.build(ids, embeddings, k=3)
+
+    pairs = graph.neighbors("r0")
+    assert [neighbor for neighbor, _ in pairs] == [ids[i] for i in brute_force(embeddings, 3)[0]]
+    assert len(graph.neighbors("r0", k=2)) == 2
+    assert graph.neighbors("missing") is None
+
+
+def test_refresh_matches_full_rebuild():
+    rng = np.random.default_rng(2)
+    catalog = {f"r{i}": v for i, v in enumerate(normalized(rng, 30))}
+    graph = SimilarityGraph.build(list(catalog), np.stack(list(catalog.values())), k=4)
+
+    for step in range(20):
+        changed = set()
+        for _ in range(int(rng.integers(1, 4))):
+            if rng.random() < 0.3 and len(catalog) > 6:
+                recipe_id = str(rng.choice(list(catalog)))
+                del catalog[recipe_id]
+            else:
+                recipe_id = f"r{int(rng.integers(0, 45))}"
+                catalog[recipe_id] = normalized(rng, 1)[0]
+            changed.add(recipe_id)
+
+        ids, embeddings = list(catalog), np.stack(list(catalog.values()))
+        graph = graph.refresh(ids, embeddings, changed, index_seq=step)
+        full = SimilarityGraph.build(ids, embeddings, k=4)
+        assert graph.ids == ids
+        assert graph.index_seq == step
+        for recipe_id in ids:
+            assert [n for n, _ in graph.neighbors(recipe_id)] == [n for n, _ in full.neighbors(recipe_id)]
+
+
+def test_refresh_handles_tiny_catalogs():
+    rng = np.random.default_rng(3)
+    graph = SimilarityGraph.build(["a", "b"], normalized(rng, 2), k=5)
+    assert [n for n, _ in graph.neighbors("a")] == ["b"]
+
+    grown = graph.refresh(["a", "b", "c"], normalized(rng, 3), {"a", "b", "c"})
+    assert len(grown.neighbors("a")) == 2
+
+    shrunk = grown.refresh(["a"], normalized(rng, 1), {"b", "c"})
+    assert shrunk.neighbors("a") == []
+
+
+def test_save_and_load(tmp_path):
+    rng = np.random.default_rng(4)
+    ids = [f"r{i}" for i in range(12)]
+    graph = SimilarityGraph.build(ids, normalized(rng, 12), k=3, index_seq=9)
+    path = str(tmp_path / "graph.npz")
+    graph.save(path)
+
+    loaded = SimilarityGraph.load(path)
+    assert loaded.ids == ids
+    assert loaded.index_seq == 9
+    assert loaded.neighbors("r5") == graph.neighbors("r5")
+    assert SimilarityGraph.load(str(tmp_path / "missing.npz")) is None
@@ -0,0 +1,101 @@
+import random
+
+from nutrition import NAMES
+from typeahead import SuggestionIndex, normalize
+
+
+WORDS = ["grilled", "chicken", "salad", "spicy", "tomato", "soup", "garlic", "bread", "lemon", "rice"]
+
+
+def catalog(rng, size, start=0):
+    records = []
+    for i in range(start, start + size):
+        title = " ".join(rng.sample(WORDS, rng.randint(1, 3))).title()
+        text = ", ".join(f"1 cup {name}" for name in rng.sample(NAMES, 3))
+        records.append({"id": f"r{i}", "title": title, "text": text})
+    return records
+
+
+def expected(records, query, limit):
+    """Brute force: every live term with a key under the prefix, as (exact, weight) ranks"""
+    index = SuggestionIndex()
+    index.build(lambda: records)
+    prefix = normalize(query)
+    ranks = []
+    for term_id in range(len(index._terms)):
+        if index._counts[term_id] <= 0:
+            continue
+        keys = index._keys_of(term_id)
+        if any(key.startswith(prefix) for key in keys):
+            ranks.append((prefix in keys, index._weight(term_id)))
+    return sorted(ranks, reverse=True)[:limit]
+
+
+def ranks_of(index, query, limit):
+    prefix = normalize(query)
+    ranks = []
+    for suggestion in index.suggest(query, limit):
+        term_id = index._term_ids[(suggestion["kind"], suggestion["text"])]
+        ranks.append((prefix in index._keys_of(term_id), index._weight(term_id)))
+    return ranks
+
+
+def test_title_suffixes_and_ingredients_are_suggested():
+    index = SuggestionIndex()
+    index.build(lambda: [
+        {"id": "a", "title": "Grilled Chicken Salad", "text": "1 chicken breast, 2 cups lettuce"},
+        {"id": "b", "title": "Chicken Soup", "text": "1 chicken breast, 1 carrot"},
+    ])
+    texts = [s["text"] for s in index.suggest("chick")]
+    assert texts[0] == "chicken breast"  # used by both recipes
+    assert set(texts) == {"chicken breast", "Chicken Soup", "Grilled Chicken Salad"}
+    assert [s["text"] for s in index.suggest("salad")] == ["Grilled Chicken Salad"]
+    assert index.suggest("") == [] and index.suggest("chick", limit=0) == []
+
+
+def test_exact_key_match_ranks_first():
+    index = SuggestionIndex()
+    index.build(lambda: [{"id": f"r{i}", "title": "Rice Pudding", "text": ""} for i in range(3)]
+                + [{"id": "x", "title": "Rice", "text": ""}])
+    assert index.suggest("rice")[0]["text"] == "Rice"
+
+
+def test_matches_brute_force():
+    rng = random.Random(7)
+    records = catalog(rng, 300)
+    index = SuggestionIndex()
+    index.build(lambda: records)
+    for query in ["g", "ch", "chicken s", "sp", "tomato", "olive", "b", "zzz"]:
+        for limit in (1, 5, 20):
+            assert ranks_of(index, query, limit) == expected(records, query, limit)
+
+
+def test_incremental_updates_match_a_rebuild():
+    rng = random.Random(11)
+    records = {r["id"]: r for r in catalog(rng, 100)}
+    index = SuggestionIndex(merge_threshold=40)
+    index.build(lambda: list(records.values()))
+
+    for record in catalog(rng, 60, start=100):
+        records[record["id"]] = record
+        index.add_recipe(record)
+    for record in catalog(rng, 20, start=0):  # replacements
+        records[record["id"]] = record
+        index.add_recipe(record)
+    for recipe_id in [f"r{i}" for i in range(20, 50)]:
+        del records[recipe_id]
+        assert index.remove_recipe(recipe_id)
+    assert not index.remove_recipe("r20")
+
+    assert index.stats()["recipes"] == len(records)
+    for query in ["g", "chicken", "le", "rice", "s"]:
+        assert ranks_of(index, query, 8) == expected(list(records.values()), query, 8)
+
+
+def test_removed_terms_are_not_suggested():
+    index = SuggestionIndex()
+    index.build(lambda: [{"id": "a", "title": "Lemon Tart", "text": ""}])
+    index.add_recipe({"id": "b", "title": "Lemon Curd", "text": ""})  # goes to the delta
+    index.remove_recipe("a")
+    index.remove_recipe("b")
+    assert index.suggest("lemon") == []